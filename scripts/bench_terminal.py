@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency benchmark for the /ws/terminal bridge.
+
+Starts a fake rc-car-nav CLI (echo, optionally flooding ANSI-heavy output),
+runs the web server on localhost against it, opens N WebSocket viewers and
+reports keystroke round-trip percentiles, output throughput, frame rate and
+the server's CPU / RSS / thread count.
+
+    # one run
+    python3 scripts/bench_terminal.py --clients 10 --flood-rate 200000
+    # sweep, results appended as JSON lines for comparison between commits
+    python3 scripts/bench_terminal.py --clients 1,5,20 --flood-rate 0,500000 --json bench.jsonl
+    # plain vs compressed terminal output (RC_CAR_TERMINAL_COMPRESS_MIN_BYTES tunes the threshold)
+    python3 scripts/bench_terminal.py --flood-rate 200000 --compress none,deflate
+
+Each viewer takes two workers of the server's session pool, so the pool is
+sized from --clients unless RC_CAR_EXEC_SESSION_WORKERS is set; viewers the
+server turns away anyway are reported as refused, not as lost.
+
+Needs the server's own dependencies (flask, flask-sock; simple-websocket is
+pulled in by flask-sock and is used here as the client).
+"""
+import argparse
+import importlib.util
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import zlib
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# A redraw-heavy chunk of CLI output: colours, cursor moves and a table row
+FLOOD_LINE = (
+    "\x1b[2K\x1b[1G\x1b[36mnav\x1b[0m \x1b[1;32mOK\x1b[0m "
+    "| speed \x1b[33m{:6.2f}\x1b[0m m/s | heading \x1b[33m{:6.1f}\x1b[0m deg | \x1b[2mtick {}\x1b[0m\r\n"
+)
+
+
+class FakeCli:
+    """TCP stand-in for the CLI: echoes input and optionally floods output at `rate` bytes/s."""
+
+    def __init__(self, rate : float):
+        self.rate = rate
+        self.srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.srv.bind(("127.0.0.1", 0))
+        self.srv.listen()
+        self.port = self.srv.getsockname()[1]
+        self.bytes_flooded = 0
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+
+    def __accept(self) -> None:
+        while True:
+            conn, _ = self.srv.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            lock = threading.Lock()
+            threading.Thread(target=self.__echo, args=(conn, lock), daemon=True).start()
+            if self.rate > 0:
+                threading.Thread(target=self.__flood, args=(conn, lock), daemon=True).start()
+
+
+    def __echo(self, conn, lock) -> None:
+        while True:
+            try:
+                data = conn.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            with lock:
+                conn.sendall(data)
+
+
+    def __flood(self, conn, lock) -> None:
+        tick = 0
+        started = time.monotonic()
+        sent = 0
+        while True:
+            chunk = "".join(FLOOD_LINE.format(tick * 0.01 % 10, tick * 1.7 % 360, tick + i) for i in range(8)).encode()
+            tick += 8
+            try:
+                with lock:
+                    conn.sendall(chunk)
+            except OSError:
+                return
+            sent += len(chunk)
+            self.bytes_flooded += len(chunk)
+            ahead = sent / self.rate - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+class Viewer:
+    """One browser-like WebSocket client sending marker keystrokes and timing their echo."""
+
+    def __init__(self, url : str, index : int, compress : bool = False):
+        from simple_websocket import Client
+        self.ws = Client.connect(url + ("?compress=deflate" if compress else ""))
+        self.index = index
+        self.sent : dict = {}
+        self.rtts : list = []
+        self.bytes = 0
+        self.wire_bytes = 0
+        self.frames = 0
+        self.closed = False
+        self.refused = False
+        self.__tail = ""
+        self.__inflate = zlib.decompressobj(-15)
+        threading.Thread(target=self.__reader, daemon=True).start()
+
+
+    def __reader(self) -> None:
+        while True:
+            try:
+                msg = self.ws.receive()
+            except Exception:
+                break
+            if msg is None:
+                break
+            now = time.perf_counter()
+            if isinstance(msg, str):
+                text = msg
+                self.wire_bytes += len(msg.encode("utf-8"))
+            else:
+                # DeflateFramer: 0x00 raw / 0x01 + u32 length + deflate
+                self.wire_bytes += len(msg)
+                body = msg[1:] if msg[0] == 0 else self.__inflate.decompress(msg[5:])
+                text = body.decode("utf-8", "replace")
+            self.bytes += len(text)
+            self.frames += 1
+            if self.frames == 1 and "Terminal unavailable" in text:
+                self.refused = True
+
+            # Markers look like "~c<viewer>k<seq>~" and may straddle frames
+            buf = self.__tail + text
+            start = 0
+            while True:
+                i = buf.find("~c", start)
+                if i < 0:
+                    break
+                j = buf.find("~", i + 2)
+                if j < 0:
+                    break
+                key = buf[i:j + 1]
+                t0 = self.sent.pop(key, None)
+                if t0 is not None:
+                    self.rtts.append(now - t0)
+                start = j + 1
+            self.__tail = buf[-32:]
+        self.closed = True
+
+
+    def key(self, seq : int) -> None:
+        marker = f"~c{self.index}k{seq}~"
+        self.sent[marker] = time.perf_counter()
+        self.ws.send(marker)
+
+
+    def close(self) -> None:
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+def proc_stats(pid : int) -> dict:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    stats = {"cpu_s": (int(fields[11]) + int(fields[12])) / ticks}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                stats["rss_mb"] = int(line.split()[1]) / 1024
+            elif line.startswith("Threads:"):
+                stats["threads"] = int(line.split()[1])
+    return stats
+
+
+def percentile(values : list, pct : float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def serve_app(port : int) -> None:
+    """Child-process entry point: run the web server on localhost."""
+    spec = importlib.util.spec_from_file_location("rc_config_server", os.path.join(SRC_DIR, "rc-config-server.py"))
+    sys.path.insert(0, SRC_DIR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.app.run(host="127.0.0.1", port=port, threaded=True, debug=False, use_reloader=False)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_once(clients : int, flood_rate : float, duration : float, key_rate : float, compress : bool = False) -> dict:
+    cli = FakeCli(flood_rate)
+    web_port = free_port()
+    env = dict(os.environ, RC_CAR_CLI_PORT=str(cli.port), RC_CAR_LOG_PATH=os.devnull)
+    # Two session workers per viewer (CLI and input readers) plus room for the event channel
+    env.setdefault("RC_CAR_EXEC_SESSION_WORKERS", str(2 * clients + 4))
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve-app", str(web_port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{web_port}"
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(base + "/api/terminal/sessions", timeout=1).read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("web server did not start")
+
+        viewers = [Viewer(f"ws://127.0.0.1:{web_port}/ws/terminal", i, compress) for i in range(clients)]
+        time.sleep(0.5)
+        before = proc_stats(server.pid)
+        started = time.perf_counter()
+        for v in viewers:
+            v.bytes = v.wire_bytes = v.frames = 0
+
+        seq = 0
+        peak_threads = before.get("threads", 0)
+        while time.perf_counter() - started < duration:
+            for v in viewers:
+                if not v.closed:
+                    v.key(seq)
+            seq += 1
+            peak_threads = max(peak_threads, proc_stats(server.pid).get("threads", 0))
+            time.sleep(1.0 / key_rate)
+
+        time.sleep(0.5)
+        elapsed = time.perf_counter() - started
+        after = proc_stats(server.pid)
+        sessions = json.loads(urllib.request.urlopen(base + "/api/terminal/sessions", timeout=5).read())["sessions"]
+        refused = sum(v.refused for v in viewers)
+        lost = sum(v.closed and not v.refused for v in viewers)
+        for v in viewers:
+            v.close()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    rtts = [r * 1000 for v in viewers for r in v.rtts]
+    sent = seq * (clients - refused)
+    codec = [s["compression"] for s in sessions if s.get("compression")]
+    codec_in = sum(c["bytes_in"] for c in codec)
+    codec_out = sum(c["bytes_out"] for c in codec)
+    return {
+        "clients": clients,
+        "flood_rate": flood_rate,
+        "compress": "deflate" if compress else "none",
+        "duration_s": round(elapsed, 2),
+        "keys_sent": sent,
+        "keys_echoed": len(rtts),
+        "rtt_ms_p50": percentile(rtts, 50),
+        "rtt_ms_p95": percentile(rtts, 95),
+        "rtt_ms_p99": percentile(rtts, 99),
+        "rtt_ms_mean": statistics.fmean(rtts) if rtts else None,
+        "throughput_kBps": sum(v.bytes for v in viewers) / elapsed / 1000,
+        "wire_kBps": sum(v.wire_bytes for v in viewers) / elapsed / 1000,
+        "compress_ratio": codec_in / codec_out if codec_out else None,
+        "compress_cpu_ms": sum(c["cpu_ms"] for c in codec) if codec else None,
+        "frames_per_s": sum(v.frames for v in viewers) / elapsed,
+        "viewers_disconnected": lost,
+        "viewers_refused": refused,
+        "session_workers": int(env["RC_CAR_EXEC_SESSION_WORKERS"]),
+        "dropped_bytes": sum(s.get("dropped_bytes", 0) for s in sessions),
+        "server_cpu_pct": 100 * (after["cpu_s"] - before["cpu_s"]) / elapsed,
+        "server_rss_mb": after.get("rss_mb"),
+        "server_threads_peak": peak_threads,
+    }
+
+
+def print_result(res : dict) -> None:
+    def fmt(v):
+        return "-" if v is None else (f"{v:.2f}" if isinstance(v, float) else str(v))
+    print(
+        f"clients={res['clients']:<3} flood={res['flood_rate']:>9.0f} B/s {res['compress']:<7} | "
+        f"rtt p50/p95/p99 {fmt(res['rtt_ms_p50'])}/{fmt(res['rtt_ms_p95'])}/{fmt(res['rtt_ms_p99'])} ms "
+        f"({res['keys_echoed']}/{res['keys_sent']}) | "
+        f"{res['throughput_kBps']:.1f} kB/s ({res['wire_kBps']:.1f} on the wire, ratio {fmt(res['compress_ratio'])}, "
+        f"deflate {fmt(res['compress_cpu_ms'])} ms cpu) {res['frames_per_s']:.0f} fps | "
+        f"drops {res['dropped_bytes']} B, lost viewers {res['viewers_disconnected']}, "
+        f"refused {res['viewers_refused']} (session workers {res['session_workers']}) | "
+        f"cpu {res['server_cpu_pct']:.0f}% rss {fmt(res['server_rss_mb'])} MB threads {res['server_threads_peak']}"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--serve-app":
+        serve_app(int(sys.argv[2]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1", help="comma-separated viewer counts to sweep")
+    parser.add_argument("--flood-rate", default="0", help="comma-separated CLI output rates in bytes/s (0 = echo only)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--key-rate", type=float, default=20.0, help="keystrokes per second per viewer")
+    parser.add_argument("--compress", default="none", help="comma-separated terminal codecs to sweep: none, deflate")
+    parser.add_argument("--json", help="append each result as a JSON line to this file")
+    args = parser.parse_args()
+
+    for clients in [int(c) for c in args.clients.split(",")]:
+        for rate in [float(r) for r in args.flood_rate.split(",")]:
+            for codec in args.compress.split(","):
+                res = run_once(clients, rate, args.duration, args.key_rate, compress=(codec == "deflate"))
+                print_result(res)
+                if args.json:
+                    with open(args.json, "a") as f:
+                        f.write(json.dumps({"time": time.time(), **res}) + "\n")
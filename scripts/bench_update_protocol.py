@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compare the JSON and binary UpdatePipe protocols.
+
+Micro-benchmarks time serialising a READ_PROGRESS request and parsing its
+reply in-process; the end-to-end run polls read_state() against the fake
+updater daemon over loopback for each protocol.
+
+    python3 scripts/bench_update_protocol.py --polls 20000
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from connection_manager import UpdatePipe
+from fake_updater import FakeUpdater
+
+
+def micro(number : int) -> None:
+    cmds = UpdatePipe.commands
+    message = "Installing image: 42%"
+    json_reply = json.dumps({"status": True, "update_status": 1, "message": message}).encode("utf-8")
+    body = message.encode("utf-8")
+    binary_reply_changed = UpdatePipe.REPLY_HEADER.pack(1, 1, UpdatePipe.FLAG_MESSAGE, len(body)) + body
+    binary_reply_same = UpdatePipe.REPLY_HEADER.pack(1, 1, 0, 0)
+    header_size = UpdatePipe.REPLY_HEADER.size
+
+    def json_request():
+        json.dumps({"port": 5000, "command": cmds.READ_PROGRESS.value}).encode("utf-8")
+
+    def json_parse():
+        reply = json.loads(json_reply.decode("utf-8"))
+        return reply["update_status"], reply["message"]
+
+    def binary_request():
+        UpdatePipe.encode_request(cmds.READ_PROGRESS)
+
+    def binary_parse_changed():
+        _, state, flags, length = UpdatePipe.REPLY_HEADER.unpack_from(binary_reply_changed)
+        return state, binary_reply_changed[header_size:header_size + length].decode("utf-8")
+
+    def binary_parse_same():
+        _, state, flags, length = UpdatePipe.REPLY_HEADER.unpack_from(binary_reply_same)
+        return state, message
+
+    print(f"{'case':<34}{'ns/op':>10}{'bytes':>8}")
+    rows = [
+        ("json request (serialised per poll)", json_request, len(json.dumps({"port": 5000, "command": 1}))),
+        ("binary request (built per poll)", binary_request, UpdatePipe.REQUEST_HEADER.size),
+        ("json reply parse", json_parse, len(json_reply)),
+        ("binary reply parse, new message", binary_parse_changed, len(binary_reply_changed)),
+        ("binary reply parse, same message", binary_parse_same, len(binary_reply_same)),
+    ]
+    for name, fn, size in rows:
+        ns = min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+        print(f"{name:<34}{ns:>10.0f}{size:>8}")
+
+
+def end_to_end(polls : int) -> None:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    daemon = FakeUpdater("127.0.0.1", port, rate=0)
+    daemon.set_state(1, "Installing image: 42%")
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    time.sleep(0.2)
+
+    print()
+    for mode in ("json", "auto"):
+        UpdatePipe.PROTOCOL_MODE = mode
+        pipe = UpdatePipe(updater_port=port)
+        if not pipe.init_connection():
+            sys.exit("cannot reach fake updater")
+        seconds = timeit.timeit(pipe.read_state, number=polls)
+        name = "binary" if pipe.protocol == UpdatePipe.PROTOCOL_BINARY else "json"
+        print(f"read_state over loopback ({name:<6}): {polls / seconds:>9.0f} polls/s, {seconds / polls * 1e6:6.1f} us/poll")
+        pipe.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200000, help="iterations per micro-benchmark")
+    parser.add_argument("--polls", type=int, default=20000, help="read_state calls per end-to-end run")
+    args = parser.parse_args()
+
+    micro(args.number)
+    end_to_end(args.polls)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the rc-car-nav CLI on CLI_PORT.
+
+Prints a banner and a prompt, then answers a few line commands against an
+in-memory settings table, so /api/cli/exec and the xterm bridge can be
+exercised on a workstation:
+
+    python3 scripts/fake_cli.py --port 8001 --rtt 20
+    RC_CAR_CLI_PORT=8001 python3 src/rc-config-server.py
+    curl -s localhost:5000/api/cli/exec -H 'Content-Type: application/json' \\
+         -d '{"commands": ["get speed.max", "get steer.trim", "list"]}'
+
+--rtt delays the handling of every chunk read from a client, like a slow link
+would; a pipelined batch then costs about one delay instead of one per command.
+"""
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+
+SETTINGS = {
+    "speed.max": "2.5",
+    "speed.accel": "1.2",
+    "steer.trim": "0.00",
+    "steer.rate": "4.0",
+    "lidar.enabled": "true",
+    "camera.fps": "30",
+}
+
+HELP = """commands:
+  get <key>          show a setting
+  set <key> <value>  change a setting
+  list               show all settings
+  echo <text>        print text
+  sleep <ms>         wait, then print done
+  help               this text"""
+
+
+class FakeCli:
+    def __init__(self, host : str, port : int, prompt : str, rtt : float, echo : bool):
+        self.prompt = prompt
+        self.rtt = rtt
+        self.echo = echo
+        self.settings = dict(SETTINGS)
+        self.lock = threading.Lock()
+        self.server = socket.create_server((host, port))
+        logging.info("Fake CLI listening on %s:%s", host, self.server.getsockname()[1])
+
+
+    def execute(self, line : str) -> str:
+        parts = line.split()
+        if not parts:
+            return ""
+        cmd, args = parts[0], parts[1:]
+        with self.lock:
+            if cmd == "help":
+                return HELP
+            if cmd == "list":
+                return "\n".join(f"{k} = {v}" for k, v in sorted(self.settings.items()))
+            if cmd == "get" and len(args) == 1:
+                return f"{args[0]} = {self.settings[args[0]]}" if args[0] in self.settings else f"error: unknown key {args[0]}"
+            if cmd == "set" and len(args) == 2:
+                if args[0] not in self.settings:
+                    return f"error: unknown key {args[0]}"
+                self.settings[args[0]] = args[1]
+                return f"{args[0]} = {args[1]}"
+        if cmd == "echo":
+            return line.partition(" ")[2]
+        if cmd == "sleep" and len(args) == 1:
+            time.sleep(float(args[0]) / 1000)
+            return "done"
+        return f"error: unknown command '{cmd}' (try help)"
+
+
+    def handle(self, conn : socket.socket) -> None:
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        buf = b""
+        try:
+            conn.sendall(f"rc-car-nav fake CLI\r\n{self.prompt}".encode())
+            while True:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                if self.rtt:
+                    time.sleep(self.rtt)
+                buf += chunk
+                out = []
+                while b"\n" in buf:
+                    raw, buf = buf.split(b"\n", 1)
+                    line = raw.decode("utf-8", "replace").strip("\r")
+                    reply = self.execute(line)
+                    if self.echo:
+                        out.append(f"{line}\r\n")
+                    if reply:
+                        out.append(reply.replace("\n", "\r\n") + "\r\n")
+                    out.append(self.prompt)
+                if out:
+                    conn.sendall("".join(out).encode())
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+
+    def serve_forever(self) -> None:
+        while True:
+            conn, addr = self.server.accept()
+            logging.info("Client %s:%s", *addr)
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("RC_CAR_CLI_PORT", "8001")))
+    parser.add_argument("--prompt", default="rc-car> ")
+    parser.add_argument("--rtt", type=float, default=0.0, help="simulated round-trip delay in ms")
+    parser.add_argument("--echo", action="store_true", help="echo each command line back, like a tty")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    FakeCli(args.host, args.port, args.prompt, args.rtt / 1000, args.echo).serve_forever()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for NetworkManager's D-Bus API.
+
+Implements just the objects the D-Bus Wi-Fi backend talks to (one Wi-Fi and
+one Ethernet device, a few access points, saved connection profiles) on the
+session bus, so the backend can be exercised on a workstation:
+
+    dbus-run-session -- sh -c '
+        python3 scripts/fake_networkmanager.py &
+        RC_CAR_WIFI_BACKEND=dbus RC_CAR_WIFI_DBUS_BUS=session python3 src/rc-config-server.py'
+
+Activations complete immediately and emit the same PropertiesChanged /
+StateChanged signals as the real daemon. "garage" is served by two access
+points; set an AP's Strength over D-Bus (Properties.Set) to try roaming.
+Needs jeepney.
+"""
+import argparse
+import logging
+
+from jeepney import DBusAddress, HeaderFields, MessageType, new_error, new_method_return, new_signal
+from jeepney.bus_messages import message_bus
+from jeepney.io.blocking import open_dbus_connection
+
+NM = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+PROPERTIES = "org.freedesktop.DBus.Properties"
+DEVICE = NM + ".Device"
+WIRELESS = NM + ".Device.Wireless"
+AP = NM + ".AccessPoint"
+ACTIVE = NM + ".Connection.Active"
+IP4 = NM + ".IP4Config"
+SETTINGS_PATH = NM_PATH + "/Settings"
+SETTINGS = NM + ".Settings"
+CONNECTION = NM + ".Settings.Connection"
+
+WIFI_DEV = NM_PATH + "/Devices/1"
+ETH_DEV = NM_PATH + "/Devices/2"
+ACTIVE_PATH = NM_PATH + "/ActiveConnection/1"
+IP4_PATH = NM_PATH + "/IP4Config/1"
+
+STATE_DISCONNECTED = 30
+STATE_ACTIVATED = 100
+NM_STATE_DISCONNECTED = 20
+NM_STATE_CONNECTED_GLOBAL = 70
+
+ACCESS_POINTS = [
+    # (ssid, strength, flags, wpa_flags, rsn_flags, bssid, frequency)
+    ("garage", 82, 0x1, 0x0, 0x188, "AA:BB:CC:00:00:01", 5180),
+    ("track-side", 55, 0x1, 0x0, 0x488, "AA:BB:CC:00:00:02", 2437),
+    ("open-guest", 31, 0x0, 0x0, 0x0, "AA:BB:CC:00:00:03", 2412),
+    ("garage", 40, 0x1, 0x0, 0x188, "AA:BB:CC:00:00:04", 5500),
+]
+
+
+class FakeNetworkManager:
+    def __init__(self, conn, connected : bool, psk : str):
+        self.conn = conn
+        self.psk = psk
+        self.objects : dict = {}
+        self.profiles : dict = {}   # path -> (settings, secrets)
+        self.next_profile = 1
+
+        self.objects[NM_PATH] = {NM: {
+            "Version": ("s", "1.46.0-fake"),
+            "WirelessEnabled": ("b", True),
+            "State": ("u", NM_STATE_DISCONNECTED),
+            "Devices": ("ao", [WIFI_DEV, ETH_DEV]),
+        }}
+        self.objects[ETH_DEV] = {DEVICE: {
+            "Interface": ("s", "enP8p1s0"), "DeviceType": ("u", 1), "State": ("u", STATE_ACTIVATED),
+            "ActiveConnection": ("o", "/"), "Ip4Config": ("o", "/"), "StateReason": ("(uu)", (STATE_ACTIVATED, 0)),
+        }}
+        self.objects[WIFI_DEV] = {
+            DEVICE: {
+                "Interface": ("s", "wlan0"), "DeviceType": ("u", 2), "State": ("u", STATE_DISCONNECTED),
+                "ActiveConnection": ("o", "/"), "Ip4Config": ("o", "/"), "StateReason": ("(uu)", (STATE_DISCONNECTED, 0)),
+            },
+            WIRELESS: {"ActiveAccessPoint": ("o", "/"), "Bitrate": ("u", 0)},
+        }
+        for i, (ssid, strength, flags, wpa, rsn, bssid, freq) in enumerate(ACCESS_POINTS, 1):
+            self.objects[f"{NM_PATH}/AccessPoint/{i}"] = {AP: {
+                "Ssid": ("ay", ssid.encode()), "Strength": ("y", strength), "Flags": ("u", flags),
+                "WpaFlags": ("u", wpa), "RsnFlags": ("u", rsn), "HwAddress": ("s", bssid),
+                "Frequency": ("u", freq), "MaxBitrate": ("u", 866700 if freq > 5000 else 144400),
+            }}
+        self.objects[IP4_PATH] = {IP4: {
+            "AddressData": ("aa{sv}", [{"address": ("s", "192.168.1.20"), "prefix": ("u", 24)}]),
+        }}
+
+        path = self.add_profile("garage", "garage", psk)
+        if connected:
+            self.activate(path)
+
+
+    # -- state ------------------------------------------------------------------
+
+    def add_profile(self, conn_id : str, ssid : str, psk : str | None) -> str:
+        path = f"{SETTINGS_PATH}/{self.next_profile}"
+        self.next_profile += 1
+        settings = {
+            "connection": {"id": ("s", conn_id), "type": ("s", "802-11-wireless"), "autoconnect": ("b", False)},
+            "802-11-wireless": {"ssid": ("ay", ssid.encode()), "mode": ("s", "infrastructure")},
+        }
+        secrets = {}
+        if psk:
+            settings["802-11-wireless-security"] = {"key-mgmt": ("s", "wpa-psk")}
+            secrets["802-11-wireless-security"] = {"psk": ("s", psk)}
+        self.profiles[path] = (settings, secrets)
+        return path
+
+
+    def set_props(self, path : str, iface : str, **props) -> None:
+        changed = {}
+        for name, value in props.items():
+            sig = self.objects[path][iface][name][0]
+            self.objects[path][iface][name] = (sig, value)
+            changed[name] = (sig, value)
+        self.conn.send(new_signal(DBusAddress(path, interface=PROPERTIES), "PropertiesChanged",
+                                  "sa{sv}as", (iface, changed, [])))
+
+
+    def activate(self, profile : str, ap : str = "/") -> str:
+        settings, _ = self.profiles[profile]
+        ssid = bytes(settings["802-11-wireless"]["ssid"][1])
+        if ap == "/":
+            # Like NM: the strongest access point for the SSID
+            aps = [p for p, o in self.objects.items() if AP in o and o[AP]["Ssid"][1] == ssid]
+            ap = max(aps, key=lambda p: self.objects[p][AP]["Strength"][1], default="/")
+        self.objects[ACTIVE_PATH] = {ACTIVE: {
+            "Id": ("s", settings["connection"]["id"][1]), "Connection": ("o", profile), "State": ("u", 2),
+        }}
+        self.set_props(WIFI_DEV, DEVICE, State=STATE_ACTIVATED, ActiveConnection=ACTIVE_PATH, Ip4Config=IP4_PATH)
+        bitrate = self.objects[ap][AP]["MaxBitrate"][1] * self.objects[ap][AP]["Strength"][1] // 100 if ap != "/" else 0
+        self.set_props(WIFI_DEV, WIRELESS, ActiveAccessPoint=ap, Bitrate=bitrate)
+        self.set_props(NM_PATH, NM, State=NM_STATE_CONNECTED_GLOBAL)
+        self.conn.send(new_signal(DBusAddress(NM_PATH, interface=NM), "StateChanged", "u", (NM_STATE_CONNECTED_GLOBAL,)))
+        logging.info("Activated %s (%s) via %s", settings["connection"]["id"][1], ssid.decode(), ap)
+        return ACTIVE_PATH
+
+
+    # -- method dispatch --------------------------------------------------------
+
+    def handle(self, path : str, iface : str, member : str, body : tuple):
+        """Returns (signature, body) for the reply; raises KeyError/ValueError for errors."""
+        if iface == PROPERTIES:
+            if member == "Get":
+                return "v", (self.objects[path][body[0]][body[1]],)
+            if member == "GetAll":
+                return "a{sv}", (dict(self.objects[path].get(body[0], {})),)
+            if member == "Set":
+                self.set_props(path, body[0], **{body[1]: body[2][1]})
+                return None, ()
+
+        if path == NM_PATH and iface == NM:
+            if member == "GetDevices":
+                return "ao", (self.objects[NM_PATH][NM]["Devices"][1],)
+            if member == "ActivateConnection":
+                if body[0] not in self.profiles:
+                    raise KeyError(f"Unknown connection {body[0]}")
+                if body[2] != "/" and AP not in self.objects.get(body[2], {}):
+                    raise KeyError(f"Unknown access point {body[2]}")
+                return "o", (self.activate(body[0], body[2]),)
+            if member == "AddAndActivateConnection":
+                settings = body[0]
+                psk = settings.get("802-11-wireless-security", {}).get("psk", ("s", None))[1]
+                if psk is not None and psk != self.psk:
+                    raise ValueError("Secrets were required, but not provided")
+                ssid = bytes(settings["802-11-wireless"]["ssid"][1]).decode()
+                profile = self.add_profile(settings["connection"]["id"][1], ssid, psk)
+                self.profiles[profile][0]["connection"]["autoconnect"] = ("b", True)
+                return "oo", (profile, self.activate(profile))
+
+        if path == WIFI_DEV and iface == WIRELESS:
+            if member == "RequestScan":
+                return None, ()
+            if member == "GetAllAccessPoints":
+                return "ao", ([p for p, o in self.objects.items() if AP in o],)
+
+        if path == SETTINGS_PATH and iface == SETTINGS and member == "ListConnections":
+            return "ao", (list(self.profiles),)
+
+        if path in self.profiles and iface == CONNECTION:
+            settings, secrets = self.profiles[path]
+            if member == "GetSettings":
+                return "a{sa{sv}}", (settings,)
+            if member == "GetSecrets":
+                return "a{sa{sv}}", ({k: v for k, v in secrets.items() if k == body[0]},)
+            if member == "Update":
+                new = {k: dict(v) for k, v in body[0].items()}
+                psk = new.get("802-11-wireless-security", {}).pop("psk", None)
+                if psk:
+                    secrets["802-11-wireless-security"] = {"psk": psk}
+                self.profiles[path] = (new, secrets)
+                return None, ()
+            if member == "Delete":
+                del self.profiles[path]
+                return None, ()
+
+        raise NotImplementedError(f"{iface}.{member} on {path}")
+
+
+    def serve_forever(self) -> None:
+        while True:
+            try:
+                msg = self.conn.receive()
+            except ConnectionError:
+                logging.info("Bus connection closed")
+                return
+            if msg.header.message_type != MessageType.method_call:
+                continue
+            fields = msg.header.fields
+            path = fields.get(HeaderFields.path)
+            iface = fields.get(HeaderFields.interface)
+            member = fields.get(HeaderFields.member)
+            try:
+                signature, body = self.handle(path, iface, member, msg.body)
+                reply = new_method_return(msg, signature, body)
+            except NotImplementedError as e:
+                reply = new_error(msg, "org.freedesktop.DBus.Error.UnknownMethod", "s", (str(e),))
+            except (KeyError, ValueError) as e:
+                reply = new_error(msg, NM + ".Error.Failed", "s", (str(e),))
+            self.conn.send(reply)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bus", default="SESSION", help="SESSION, SYSTEM or a bus address")
+    parser.add_argument("--connected", action="store_true", help="start with the 'garage' profile active")
+    parser.add_argument("--psk", default="hunter22", help="password the fake access points accept")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    conn = open_dbus_connection(bus=args.bus)
+    conn.send_and_get_reply(message_bus.RequestName(NM))
+    logging.info("Fake NetworkManager on %s bus as %s", args.bus.lower(), conn.unique_name)
+    FakeNetworkManager(conn, args.connected, args.psk).serve_forever()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the on-device updater daemon.
+
+Speaks the same JSON command protocol as UpdatePipe so the web server can be
+exercised end to end on a workstation:
+
+    python3 scripts/fake_updater.py --port 5001
+    RC_CAR_UPDATER_PORT=5001 python3 src/rc-config-server.py
+
+Staged installs (INIT_UPDATE) read the image back from disk; streamed installs
+(INIT_STREAM_UPDATE) accept the image on a one-shot data port. Either way the
+image is consumed at --rate bytes/s so progress can be watched in the UI.
+
+Clients that send NEGOTIATE are switched to the binary framing described in
+UpdatePipe; --json-only behaves like an older daemon and refuses it.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+
+INIT_UPDATE        = 0
+READ_PROGRESS      = 1
+END_PROGRESS       = 2
+INIT_STREAM_UPDATE = 3
+NEGOTIATE          = 4
+
+PROTOCOL_JSON   = 1
+PROTOCOL_BINARY = 2
+REQUEST_HEADER  = struct.Struct("!BBH")
+REPLY_HEADER    = struct.Struct("!BBBH")
+STREAM_REQUEST  = struct.Struct("!Q")
+STREAM_REPLY    = struct.Struct("!H")
+FLAG_MESSAGE    = 0x01
+
+STATE_IDLE     = 0
+STATE_RUNNING  = 1
+STATE_FAILED   = 2
+STATE_FINISHED = 3
+
+
+class FakeUpdater:
+    def __init__(self, host: str, port: int, rate: float, json_only: bool = False):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.json_only = json_only
+        self.lock = threading.Lock()
+        self.state = STATE_IDLE
+        self.message = ""
+
+
+    def set_state(self, state: int, message: str) -> None:
+        with self.lock:
+            self.state = state
+            self.message = message
+        logging.info("state=%s %s", state, message)
+
+
+    def consume(self, reader, size: int) -> None:
+        """Read `size` bytes from `reader` at the configured rate, reporting progress."""
+        digest = hashlib.sha256()
+        received = 0
+        started = time.monotonic()
+        last_pct = -1
+        while received < size:
+            chunk = reader(min(64 * 1024, size - received))
+            if not chunk:
+                break
+            digest.update(chunk)
+            received += len(chunk)
+
+            pct = 100 * received // size
+            if pct != last_pct:
+                last_pct = pct
+                self.set_state(STATE_RUNNING, f"Installing image: {pct}%")
+
+            if self.rate > 0:
+                ahead = received / self.rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        if received != size:
+            self.set_state(STATE_FAILED, f"Image truncated at {received}/{size} bytes")
+            return
+        self.set_state(STATE_FINISHED, f"Update finished (sha256 {digest.hexdigest()[:16]})")
+
+
+    def staged_install(self, file_path: str) -> None:
+        try:
+            size = os.path.getsize(file_path)
+            with open(file_path, "rb") as f:
+                self.consume(f.read, size)
+        except OSError as e:
+            self.set_state(STATE_FAILED, f"Cannot read image: {e}")
+
+
+    def streamed_install(self, listener: socket.socket, size: int) -> None:
+        listener.settimeout(30.0)
+        try:
+            conn, _ = listener.accept()
+        except OSError:
+            self.set_state(STATE_FAILED, "No image received on data channel")
+            return
+        finally:
+            listener.close()
+
+        with conn:
+            # Small receive buffer so backpressure reaches the web server quickly.
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 64 * 1024)
+            self.consume(conn.recv, size)
+
+
+    def start_staged(self, file_path: str) -> None:
+        self.set_state(STATE_RUNNING, "Starting update")
+        threading.Thread(target=self.staged_install, args=(file_path,), daemon=True).start()
+
+
+    def start_streamed(self, size: int) -> int:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind((self.host, 0))
+        listener.listen(1)
+        self.set_state(STATE_RUNNING, "Waiting for image stream")
+        threading.Thread(target=self.streamed_install, args=(listener, size), daemon=True).start()
+        return listener.getsockname()[1]
+
+
+    def handle(self, msg: dict) -> dict:
+        command = msg.get("command")
+
+        if command == INIT_UPDATE:
+            self.start_staged(msg.get("file_path", ""))
+            return {"status": True}
+
+        if command == INIT_STREAM_UPDATE:
+            return {"status": True, "data_port": self.start_streamed(int(msg.get("size", 0)))}
+
+        if command == READ_PROGRESS:
+            with self.lock:
+                return {"status": True, "update_status": self.state, "message": self.message}
+
+        if command == NEGOTIATE and not self.json_only and PROTOCOL_BINARY in msg.get("protocols", []):
+            return {"status": True, "protocol": PROTOCOL_BINARY}
+
+        return {"status": False}
+
+
+    def handle_binary(self, command: int, payload: bytes, last_message: list) -> bytes:
+        """Answer one binary request; `last_message` is the per-connection message cache."""
+        if command == READ_PROGRESS:
+            with self.lock:
+                state, message = self.state, self.message
+            if message == last_message[0]:
+                return REPLY_HEADER.pack(1, state, 0, 0)
+            last_message[0] = message
+            body = message.encode("utf-8")
+            return REPLY_HEADER.pack(1, state, FLAG_MESSAGE, len(body)) + body
+
+        if command == INIT_UPDATE:
+            self.start_staged(payload.decode("utf-8"))
+            return REPLY_HEADER.pack(1, 0, 0, 0)
+
+        if command == INIT_STREAM_UPDATE:
+            (size,) = STREAM_REQUEST.unpack_from(payload)
+            body = STREAM_REPLY.pack(self.start_streamed(size))
+            return REPLY_HEADER.pack(1, 0, 0, len(body)) + body
+
+        return REPLY_HEADER.pack(0, 0, 0, 0)
+
+
+    def serve_client(self, conn: socket.socket) -> None:
+        decoder = json.JSONDecoder()
+        buf = b""
+        binary = False
+        last_message = [None]
+        with conn:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    return
+                buf += data
+
+                while buf:
+                    if binary:
+                        if len(buf) < REQUEST_HEADER.size:
+                            break
+                        _, command, length = REQUEST_HEADER.unpack_from(buf)
+                        end = REQUEST_HEADER.size + length
+                        if len(buf) < end:
+                            break
+                        payload, buf = buf[REQUEST_HEADER.size:end], buf[end:]
+                        conn.sendall(self.handle_binary(command, payload, last_message))
+                        continue
+
+                    # JSON requests are not delimited; split back-to-back objects.
+                    text = buf.decode("utf-8", errors="replace")
+                    try:
+                        msg, end = decoder.raw_decode(text)
+                    except json.JSONDecodeError:
+                        break
+                    buf = text[end:].lstrip().encode("utf-8")
+                    reply = self.handle(msg)
+                    conn.sendall(json.dumps(reply).encode("utf-8"))
+                    if msg.get("command") == NEGOTIATE and reply.get("protocol") == PROTOCOL_BINARY:
+                        binary = True
+
+
+    def serve_forever(self) -> None:
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((self.host, self.port))
+        srv.listen()
+        logging.info("Fake updater listening on %s:%s", self.host, self.port)
+        while True:
+            conn, _ = srv.accept()
+            threading.Thread(target=self.serve_client, args=(conn,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("RC_CAR_UPDATER_PORT", "5000")))
+    parser.add_argument("--rate", type=float, default=4 * 1024 * 1024, help="install speed in bytes/s (0 = unlimited)")
+    parser.add_argument("--json-only", action="store_true", help="behave like an older daemon without binary framing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    FakeUpdater(args.host, args.port, args.rate, args.json_only).serve_forever()
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Push one .swu image to many cars in parallel.
+
+For every car the usual web UI sequence is run over HTTP — upload then
+/api/swu/apply (or a streamed install with --stream) — and the job's
+progress stream is followed until the updater reports the result. At most
+--concurrency cars are updated at once; a car whose upload or apply fails is
+retried up to --retries times with backoff, and a dropped progress stream is
+simply re-attached. The image is mapped into memory once and every
+connection sends from that shared mapping.
+
+    python3 scripts/fleet_update.py image.swu 10.0.0.11 10.0.0.12:5000 --concurrency 4
+    python3 scripts/fleet_update.py image.swu --cars-file fleet.txt --stream --json results.json
+
+    # end to end against local fake cars (fake_updater.py + a real server each)
+    python3 scripts/fleet_update.py image.swu --spawn-local 6 --concurrency 3
+
+Only the standard library is needed on the machine running it.
+"""
+import argparse
+import hashlib
+import http.client
+import json
+import mmap
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(SCRIPTS_DIR, "..", "src")
+
+DEFAULT_WEB_PORT = 5000
+CHUNK_SIZE = 256 * 1024
+
+# Updater states as reported in job progress (see fake_updater.py)
+STATE_FAILED   = 2
+STATE_FINISHED = 3
+
+
+class FleetError(Exception):
+    """A step failed on one car; `retry` tells whether starting over could help."""
+
+    def __init__(self, message : str, retry : bool = True):
+        super().__init__(message)
+        self.retry = retry
+
+
+class Artifact:
+    """The image, mapped read-only once and sliced for every connection."""
+
+    def __init__(self, path : str):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = os.path.getsize(path)
+        if self.size == 0:
+            raise ValueError(f"{path} is empty")
+        with open(path, "rb") as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__view = memoryview(self.__map)
+        self.digest = hashlib.sha256(self.__map).hexdigest()
+
+
+    def chunks(self, on_sent=None):
+        """Yield zero-copy slices of the image, calling `on_sent(n)` after each."""
+        for offset in range(0, self.size, CHUNK_SIZE):
+            chunk = self.__view[offset:offset + CHUNK_SIZE]
+            yield chunk
+            if on_sent is not None:
+                on_sent(len(chunk))
+
+
+class Car:
+    """One target web server and what is known about its update."""
+
+    def __init__(self, spec : str):
+        host, _, port = spec.strip().rpartition(":")
+        if not host or not port.isdigit():
+            host, port = spec.strip(), str(DEFAULT_WEB_PORT)
+        self.name = spec.strip()
+        self.host = host
+        self.port = int(port)
+        self.phase = "queued"
+        self.attempt = 0
+        self.sent = 0
+        self.job_id : str | None = None
+        self.state : int | None = None
+        self.message = ""
+        self.error : str | None = None
+        self.started : float | None = None
+        self.finished : float | None = None
+
+
+    def connection(self, timeout : float) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+
+    def result(self) -> dict:
+        return {
+            "car": self.name,
+            "ok": self.phase == "done",
+            "phase": self.phase,
+            "attempts": self.attempt,
+            "job_id": self.job_id,
+            "state": self.state,
+            "message": self.message,
+            "error": self.error,
+            "seconds": round(self.finished - self.started, 2) if self.started and self.finished else None,
+        }
+
+
+def _json_request(car : Car, method : str, path : str, body, headers : dict, timeout : float) -> dict:
+    conn = car.connection(timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        raw = resp.read()
+    finally:
+        conn.close()
+    try:
+        data = json.loads(raw or b"{}")
+    except ValueError:
+        data = {}
+    if resp.status != 200 or not data.get("ok", False):
+        # 4xx means the car rejected the request itself; trying again will not change that
+        raise FleetError(f"{method} {path}: HTTP {resp.status} {data.get('error', '')}".strip(),
+                         retry=not 400 <= resp.status < 500)
+    return data
+
+
+def _on_sent(car : Car):
+    def count(n):
+        car.sent += n
+    return count
+
+
+def has_artifact(car : Car, digest : str, timeout : float) -> bool:
+    """HEAD lookup in the car's artifact store (older servers just answer 404)."""
+    conn = car.connection(timeout)
+    try:
+        conn.request("HEAD", f"/api/swu/artifacts/{digest}")
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status == 200
+    finally:
+        conn.close()
+
+
+def start_staged(car : Car, artifact : Artifact, timeout : float) -> str:
+    """Upload into the car's artifact store unless it is already there, then apply. Returns the job id."""
+    car.phase = "checking"
+    if has_artifact(car, artifact.digest, timeout):
+        car.sent = artifact.size
+        car.message = "image already on the car"
+        return _apply(car, {"digest": artifact.digest}, timeout)
+
+    car.phase = "uploading"
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{artifact.name}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+
+    def body():
+        yield head
+        yield from artifact.chunks(_on_sent(car))
+        yield tail
+
+    uploaded = _json_request(car, "POST", "/api/swu/upload", body(), {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + artifact.size + len(tail)),
+    }, timeout)
+
+    if "digest" not in uploaded:
+        return _apply(car, {"path": uploaded["path"], "filename": uploaded["filename"]}, timeout)
+    if uploaded["digest"] != artifact.digest:
+        raise FleetError(f"upload corrupted: car stored sha256 {uploaded['digest'][:16]}")
+    return _apply(car, {"digest": artifact.digest}, timeout)
+
+
+def _apply(car : Car, target : dict, timeout : float) -> str:
+    car.phase = "applying"
+    applied = _json_request(car, "POST", "/api/swu/apply", json.dumps(target),
+                            {"Content-Type": "application/json"}, timeout)
+    if applied.get("message") == "ERROR":
+        raise FleetError("updater refused the image")
+    return applied["job_id"]
+
+
+def start_streamed(car : Car, artifact : Artifact, timeout : float) -> str:
+    """Streamed install: the image goes straight to the car's updater. Returns the job id."""
+    car.phase = "streaming"
+    started = _json_request(car, "POST", "/api/swu/stream",
+                            json.dumps({"filename": artifact.name, "size": artifact.size}),
+                            {"Content-Type": "application/json"}, timeout)
+    job_id = started["job_id"]
+    _json_request(car, "POST", f"/api/swu/stream/{job_id}", artifact.chunks(_on_sent(car)), {
+        "Content-Type": "application/octet-stream",
+        "Content-Length": str(artifact.size),
+    }, timeout)
+    return job_id
+
+
+def follow(car : Car, stall_timeout : float) -> None:
+    """Read the job's SSE progress stream until the update finishes or fails."""
+    car.phase = "installing"
+    conn = car.connection(stall_timeout)
+    try:
+        conn.request("GET", f"/api/swu/progress/{car.job_id}/stream")
+        resp = conn.getresponse()
+        if resp.status != 200:
+            raise FleetError(f"progress stream: HTTP {resp.status}")
+        while True:
+            line = resp.readline()
+            if not line:
+                raise FleetError("progress stream closed before the update finished")
+            if not line.startswith(b"data:"):
+                continue
+            st = json.loads(line[5:])
+            if "error" in st:
+                raise FleetError(f"progress stream: {st['error']}", retry=False)
+            car.state = st.get("state")
+            car.message = st.get("msg") or car.message
+            if car.state == STATE_FAILED:
+                raise FleetError(f"update failed: {car.message}", retry=False)
+            if st.get("done"):
+                if car.state != STATE_FINISHED:
+                    raise FleetError(f"job ended in state {car.state}: {car.message}", retry=False)
+                return
+    finally:
+        conn.close()
+
+
+def update_car(car : Car, artifact : Artifact, args) -> Car:
+    car.started = time.monotonic()
+    start = start_streamed if args.stream else start_staged
+    while True:
+        car.attempt += 1
+        try:
+            if car.job_id is None:
+                car.sent = 0
+                car.job_id = start(car, artifact, args.timeout)
+            follow(car, args.stall_timeout)
+            car.phase = "done"
+            car.error = None
+            break
+        except (OSError, http.client.HTTPException, ValueError, FleetError) as e:
+            car.error = str(e) or type(e).__name__
+            # Once a job is running the install itself is never restarted, only re-followed
+            retry = getattr(e, "retry", True)
+            if not retry or car.attempt > args.retries:
+                car.phase = "failed"
+                break
+            car.phase = "retrying"
+            time.sleep(min(30.0, args.backoff * 2 ** (car.attempt - 1)))
+    car.finished = time.monotonic()
+    return car
+
+
+class ProgressView(threading.Thread):
+    """Aggregated table of every car, redrawn in place on a terminal."""
+
+    def __init__(self, cars : list, artifact : Artifact, interval : float = 0.5):
+        super().__init__(name="fleet-progress", daemon=True)
+        self.cars = cars
+        self.artifact = artifact
+        self.interval = interval
+        self.tty = sys.stdout.isatty()
+        self.started = time.monotonic()
+        self.__stop = threading.Event()
+        self.__drawn = 0
+        self.__last_phases : dict = {}
+
+
+    def render(self) -> list:
+        width = max(len("car"), *(len(c.name) for c in self.cars))
+        counts = {}
+        for c in self.cars:
+            counts[c.phase] = counts.get(c.phase, 0) + 1
+        sent = sum(c.sent for c in self.cars)
+        elapsed = time.monotonic() - self.started
+        lines = [
+            f"{self.artifact.name} ({self.artifact.size / 1e6:.1f} MB) -> {len(self.cars)} cars | "
+            + ", ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+            + f" | sent {sent / 1e6:.1f} MB at {sent / 1e6 / elapsed if elapsed else 0:.1f} MB/s",
+            f"{'car':<{width}}  {'phase':<10} {'try':>3} {'image':>6}  updater",
+        ]
+        for c in self.cars:
+            pct = f"{100 * c.sent // self.artifact.size}%"
+            detail = c.error if c.phase in ("failed", "retrying") else c.message
+            lines.append(f"{c.name:<{width}}  {c.phase:<10} {c.attempt:>3} {pct:>6}  {(detail or '')[:60]}")
+        return lines
+
+
+    def draw(self) -> None:
+        if self.tty:
+            lines = self.render()
+            if self.__drawn:
+                sys.stdout.write(f"\x1b[{self.__drawn}F")
+            sys.stdout.write("".join(f"\x1b[2K{line}\n" for line in lines))
+            sys.stdout.flush()
+            self.__drawn = len(lines)
+            return
+        # Not a terminal: one line per phase change
+        for c in self.cars:
+            if self.__last_phases.get(c.name) != c.phase:
+                self.__last_phases[c.name] = c.phase
+                detail = c.error if c.phase in ("failed", "retrying") else c.message
+                print(f"[{time.monotonic() - self.started:7.1f}s] {c.name}: {c.phase} {detail or ''}".rstrip(), flush=True)
+
+
+    def run(self) -> None:
+        while not self.__stop.wait(self.interval):
+            self.draw()
+
+
+    def stop(self) -> None:
+        self.__stop.set()
+        self.join()
+        self.draw()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalFleet:
+    """N fake cars on localhost, each a fake updater plus a real web server."""
+
+    def __init__(self, count : int, rate : float):
+        self.dir = tempfile.mkdtemp(prefix="rc-fleet-")
+        self.procs : list = []
+        self.specs : list = []
+        envs = []
+        for i in range(count):
+            updater_port, web_port = free_port(), free_port()
+            car_dir = os.path.join(self.dir, f"car{i}")
+            os.makedirs(os.path.join(car_dir, "images"))
+            self.procs.append(subprocess.Popen(
+                [sys.executable, os.path.join(SCRIPTS_DIR, "fake_updater.py"), "--port", str(updater_port), "--rate", str(rate)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            ))
+            envs.append(dict(
+                os.environ,
+                RC_CAR_BIND_HOST="127.0.0.1",
+                RC_CAR_WEB_PORT=str(web_port),
+                RC_CAR_UPDATER_PORT=str(updater_port),
+                RC_CAR_UPLOAD_DIR=os.path.join(car_dir, "images"),
+                RC_CAR_WIFI_CREDENTIALS_DIR=os.path.join(car_dir, "wifi"),
+                RC_CAR_WIFI_RESTORE_ON_BOOT="0",
+                RC_CAR_WIFI_BACKEND="nmcli",
+                RC_CAR_REBOOT_AFTER_UPDATE="0",
+                RC_CAR_LOG_PATH=os.path.join(car_dir, "server.log"),
+            ))
+            self.specs.append(f"127.0.0.1:{web_port}")
+
+        # Updaters first: the server exits if it cannot reach its updater at start-up
+        time.sleep(0.5)
+        for env in envs:
+            self.procs.append(subprocess.Popen(
+                [sys.executable, os.path.join(SRC_DIR, "rc-config-server.py")],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            ))
+        for spec in self.specs:
+            self.__wait_ready(Car(spec))
+
+
+    @staticmethod
+    def __wait_ready(car : Car) -> None:
+        for _ in range(100):
+            try:
+                conn = car.connection(1.0)
+                conn.request("GET", "/api/swu/progress/none")
+                conn.getresponse().read()
+                conn.close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f"local car {car.name} did not start")
+
+
+    def close(self) -> None:
+        for proc in self.procs:
+            proc.terminate()
+        for proc in self.procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def read_cars_file(path : str) -> list:
+    with open(path) as f:
+        return [line.split("#", 1)[0].strip() for line in f if line.split("#", 1)[0].strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image", help=".swu image to install")
+    parser.add_argument("cars", nargs="*", help="car web servers as host[:port]")
+    parser.add_argument("--cars-file", help="file with one host[:port] per line (# comments allowed)")
+    parser.add_argument("--concurrency", type=int, default=4, help="cars updated at the same time")
+    parser.add_argument("--retries", type=int, default=2, help="extra attempts per car after a failure")
+    parser.add_argument("--backoff", type=float, default=2.0, help="first retry delay in seconds, doubled per attempt")
+    parser.add_argument("--stream", action="store_true", help="streamed install instead of upload + apply")
+    parser.add_argument("--timeout", type=float, default=60.0, help="socket timeout for upload/apply requests")
+    parser.add_argument("--stall-timeout", type=float, default=120.0, help="give up on a progress stream silent this long")
+    parser.add_argument("--json", help="write per-car results to this file")
+    parser.add_argument("--spawn-local", type=int, default=0, metavar="N", help="start N fake cars on localhost and add them")
+    parser.add_argument("--local-rate", type=float, default=8 * 1024 * 1024, help="install speed of the fake cars in bytes/s")
+    args = parser.parse_intermixed_args()
+
+    if not args.image.lower().endswith(".swu"):
+        parser.error("image must be a .swu file")
+
+    specs = list(args.cars)
+    if args.cars_file:
+        specs += read_cars_file(args.cars_file)
+
+    local = LocalFleet(args.spawn_local, args.local_rate) if args.spawn_local else None
+    try:
+        if local:
+            specs += local.specs
+        if not specs:
+            parser.error("no cars given")
+
+        artifact = Artifact(args.image)
+        cars = [Car(spec) for spec in dict.fromkeys(specs)]
+        view = ProgressView(cars, artifact)
+        view.start()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency), thread_name_prefix="fleet") as pool:
+            list(pool.map(lambda car: update_car(car, artifact, args), cars))
+        view.stop()
+    finally:
+        if local:
+            local.close()
+
+    results = [car.result() for car in cars]
+    failed = [r for r in results if not r["ok"]]
+    print(f"\n{len(results) - len(failed)}/{len(results)} cars updated")
+    for r in failed:
+        print(f"  {r['car']}: {r['error']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,282 @@
+from threading import Lock
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ArtifactStoreFull(Exception):
+    """Not enough room for an artifact even after evicting everything unpinned."""
+
+
+class Ingest(io.FileIO):
+    """
+    Writable temp file inside the store that hashes everything written to it.
+
+    Returned from the upload stream factory, so multipart file data goes
+    straight from the socket into the store and is hashed on the way; it is
+    also readable and seekable as Werkzeug expects of an upload container.
+    """
+
+    def __init__(self, store, path : str, filename : str):
+        super().__init__(path, "w+")
+        self.store = store
+        self.filename = filename
+        self.size = 0
+        self.__sha256 = hashlib.sha256()
+
+
+    def write(self, data) -> int:
+        view = memoryview(data)
+        self.__sha256.update(view)
+        written = 0
+        while written < len(view):
+            written += super().write(view[written:])
+        self.size += written
+        return written
+
+
+    def hexdigest(self) -> str:
+        return self.__sha256.hexdigest()
+
+
+    def commit(self) -> tuple:
+        """Move into the store. Returns (artifact metadata, True if it was already there)."""
+        return self.store._commit(self)
+
+
+    def abort(self) -> None:
+        self.close()
+        try:
+            os.remove(self.name)
+        except FileNotFoundError:
+            pass
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for .swu images, keyed by SHA-256.
+
+    Artifacts live in `root` as `<digest>.swu` next to a small JSON index
+    (original file name, size, added / last used time). The store is bounded by
+    `max_bytes` and by keeping at least `min_free_bytes` free on the filesystem;
+    least recently used artifacts are evicted to make room, except pinned ones
+    (an install in progress).
+    """
+
+    INDEX_NAME = ".index.json"
+    INCOMING_DIR = ".incoming"
+
+    def __init__(self, root : str, max_bytes : int, min_free_bytes : int):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.min_free_bytes = int(min_free_bytes)
+        self.__lock = Lock()
+        self.__index : dict = {}
+        self.__pins : dict = {}
+        self.__index_path = os.path.join(root, ArtifactStore.INDEX_NAME)
+        self.__incoming = os.path.join(root, ArtifactStore.INCOMING_DIR)
+
+
+    def open(self) -> None:
+        """Load the index and drop anything in `root` it does not account for."""
+        os.makedirs(self.__incoming, exist_ok=True)
+        try:
+            with open(self.__index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.__index = data.get("artifacts", {}) if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            self.__index = {}
+        except Exception:
+            logger.exception("Artifact index %s unreadable, starting empty", self.__index_path)
+            self.__index = {}
+
+        for digest in list(self.__index):
+            if not os.path.isfile(self.path(digest)):
+                del self.__index[digest]
+
+        # Half-written uploads and pre-store images (the old upload flow kept one loose file)
+        for name in os.listdir(self.__incoming):
+            os.remove(os.path.join(self.__incoming, name))
+        for name in os.listdir(self.root):
+            full = os.path.join(self.root, name)
+            if name == ArtifactStore.INDEX_NAME or not os.path.isfile(full):
+                continue
+            if not (name.endswith(".swu") and name[:-4] in self.__index):
+                logger.info("Removing untracked file from artifact store: %s", full)
+                os.remove(full)
+
+        with self.__lock:
+            self.__save_index()
+        logger.info("Artifact store %s: %s artifacts, %s bytes", self.root, len(self.__index), self.__total())
+
+
+    def path(self, digest : str) -> str:
+        return os.path.join(self.root, f"{digest}.swu")
+
+
+    def lookup(self, digest : str) -> dict | None:
+        digest = (digest or "").lower()
+        if not DIGEST_RE.match(digest):
+            return None
+        with self.__lock:
+            meta = self.__index.get(digest)
+            return {"digest": digest, **meta} if meta else None
+
+
+    def list(self) -> list:
+        with self.__lock:
+            items = [{"digest": d, **m, "pinned": d in self.__pins} for d, m in self.__index.items()]
+        return sorted(items, key=lambda m: m["last_used"], reverse=True)
+
+
+    def usage(self) -> dict:
+        with self.__lock:
+            return {
+                "count": len(self.__index),
+                "bytes": self.__total(),
+                "max_bytes": self.max_bytes,
+                "free_bytes": self.__free(),
+                "min_free_bytes": self.min_free_bytes,
+            }
+
+
+    def check_fits(self, size : int) -> None:
+        """
+        Make sure an artifact of `size` bytes could be stored, without evicting anything yet;
+        eviction waits until the upload is accepted and its digest is known (see `_commit`)
+
+        Raises:
+            ArtifactStoreFull: Even an empty (unpinned) store has no room
+        """
+        with self.__lock:
+            self.__evictable(max(0, int(size or 0)))
+
+
+    def begin(self, filename : str) -> Ingest:
+        return Ingest(self, os.path.join(self.__incoming, uuid.uuid4().hex), filename)
+
+
+    def touch(self, digest : str) -> None:
+        with self.__lock:
+            if digest in self.__index:
+                self.__index[digest]["last_used"] = time.time()
+                self.__save_index()
+
+
+    def pin(self, digest : str) -> None:
+        with self.__lock:
+            self.__pins[digest] = self.__pins.get(digest, 0) + 1
+
+
+    def unpin(self, digest : str) -> None:
+        with self.__lock:
+            count = self.__pins.get(digest, 0) - 1
+            if count > 0:
+                self.__pins[digest] = count
+            else:
+                self.__pins.pop(digest, None)
+
+
+    def remove(self, digest : str) -> bool:
+        with self.__lock:
+            if digest not in self.__index or digest in self.__pins:
+                return False
+            self.__drop(digest)
+            self.__save_index()
+            return True
+
+
+    def _commit(self, ingest : Ingest) -> tuple:
+        ingest.flush()
+        os.fsync(ingest.fileno())
+        ingest.close()
+        digest = ingest.hexdigest()
+        now = time.time()
+
+        with self.__lock:
+            if digest in self.__index:
+                # Nothing new is stored, so nothing else has to make room
+                os.remove(ingest.name)
+                self.__index[digest]["last_used"] = now
+                self.__save_index()
+                return {"digest": digest, **self.__index[digest]}, True
+
+            os.replace(ingest.name, self.path(digest))
+            self.__index[digest] = {
+                "filename": ingest.filename,
+                "size": ingest.size,
+                "added": now,
+                "last_used": now,
+            }
+            try:
+                self.__evict(0, keep=digest)
+            except ArtifactStoreFull:
+                pass    # over budget only because of pins; trimmed on the next upload
+            self.__save_index()
+            return {"digest": digest, **self.__index[digest]}, False
+
+
+    # -- internals (caller holds __lock) ----------------------------------------
+
+    def __total(self) -> int:
+        return sum(m["size"] for m in self.__index.values())
+
+
+    def __free(self) -> int:
+        st = os.statvfs(self.root)
+        return st.f_bavail * st.f_frsize
+
+
+    def __evictable(self, needed : int, keep : str | None = None) -> list:
+        """Unpinned artifacts, least recently used first; raises ArtifactStoreFull if evicting them all would not make room."""
+        candidates = sorted(
+            (d for d in self.__index if d not in self.__pins and d != keep),
+            key=lambda d: self.__index[d]["last_used"],
+        )
+        reclaimable = sum(self.__index[d]["size"] for d in candidates)
+        total, free = self.__total(), self.__free()
+        if total - reclaimable + needed > self.max_bytes or free + reclaimable - needed < self.min_free_bytes:
+            raise ArtifactStoreFull(
+                f"need {needed} bytes: store holds {total}/{self.max_bytes}, "
+                f"{free} free (keeping {self.min_free_bytes})"
+            )
+        return candidates
+
+
+    def __evict(self, needed : int, keep : str | None = None) -> None:
+        # Refuse up front rather than evict everything and still not fit
+        candidates = self.__evictable(needed, keep)
+        evicted = False
+        while self.__total() + needed > self.max_bytes or self.__free() - needed < self.min_free_bytes:
+            digest = candidates.pop(0)
+            logger.info("Evicting artifact %s (%s)", digest[:12], self.__index[digest]["filename"])
+            self.__drop(digest)
+            evicted = True
+        if evicted:
+            self.__save_index()
+
+
+    def __drop(self, digest : str) -> None:
+        self.__index.pop(digest, None)
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+
+    def __save_index(self) -> None:
+        tmp = f"{self.__index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format_version": 1, "artifacts": self.__index}, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.__index_path)
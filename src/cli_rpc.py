@@ -0,0 +1,289 @@
+from threading import Lock
+from queue import Queue, Empty
+import codecs
+import itertools
+import logging
+import os
+import re
+import time
+import uuid
+
+from connection_manager import TcpClient
+
+logger = logging.getLogger(__name__)
+
+# A response ends when the CLI prints its prompt again...
+PROMPT_RE = os.environ.get("RC_CAR_CLI_PROMPT", r"^[\w.\-@:/~\[\]]{0,32}[>#$] ")
+# ...or, if set, when the output of this command (with {token} filled in) appears on its own line
+SENTINEL_CMD = os.environ.get("RC_CAR_CLI_SENTINEL", "")
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]|\x1b[()][A-Za-z0-9]|\x1b[=>]")
+ANSI_PARTIAL_RE = re.compile(r"\x1b(\[[0-9;?]*[ -/]*|[()])?$")
+
+
+class CliError(Exception):
+    """Base class for CLI RPC failures."""
+
+
+class CliUnavailable(CliError):
+    """No connection to the CLI could be made or borrowed."""
+
+
+class CliTimeout(CliError):
+    """The CLI did not finish answering in time; `results` holds what did complete."""
+
+    def __init__(self, message : str, results : list):
+        super().__init__(message)
+        self.results = results
+
+
+class CliConnection:
+    """
+    One persistent connection to the CLI that runs pipelined command batches.
+
+    The whole batch is written in a single send and the replies are split
+    apart as they stream back, so N commands cost one round trip plus the
+    CLI's own processing time instead of N round trips.
+    """
+
+    ids = itertools.count(1)
+
+    def __init__(self, host : str, port : int, prompt : re.Pattern, sentinel_cmd : str, max_output : int):
+        self.id = next(CliConnection.ids)
+        self.prompt = prompt
+        self.sentinel_cmd = sentinel_cmd
+        self.max_output = max_output
+        self.batches = 0
+        self.__tcp = TcpClient(port=port, host=host, timeout=1.0)
+        self.__host = host
+        self.__port = port
+
+
+    def open(self, timeout : float) -> None:
+        # Short socket timeout: reads poll so batch deadlines are kept to within ~0.1 s
+        if not self.__tcp.open(timeout=min(timeout, 0.1)):
+            raise CliUnavailable(f"cannot connect to CLI at {self.__host}:{self.__port}")
+        # Swallow the banner and first prompt so the first reply starts clean
+        if self.sentinel_cmd:
+            self.run([], timeout)
+        else:
+            self.__read_until(lambda text: self.prompt.search(text) is not None, timeout)
+
+
+    def close(self) -> None:
+        self.__tcp.close()
+
+
+    def alive(self) -> bool:
+        """Drop stray output (e.g. log lines printed while idle); False if the CLI hung up."""
+        return self.__tcp.drain() >= 0
+
+
+    def __read(self) -> bytes | None:
+        try:
+            chunk = self.__tcp.read(16 * 1024)
+        except OSError as e:
+            raise CliUnavailable(f"CLI connection failed: {e}") from None
+        if chunk == b"":
+            raise CliUnavailable("CLI closed the connection")
+        return chunk
+
+
+    def __read_until(self, done, timeout : float) -> str:
+        deadline = time.monotonic() + timeout
+        text = ""
+        while not done(text):
+            if time.monotonic() > deadline:
+                raise CliTimeout("CLI did not show a prompt", [])
+            chunk = self.__read()
+            if chunk:
+                text += ANSI_RE.sub("", chunk.decode("utf-8", "replace"))
+        return text
+
+
+    def run(self, commands : list, timeout : float) -> list:
+        """
+        Run `commands` pipelined on this connection
+
+        Args:
+            commands (list): Command lines, without newlines
+            timeout (float): Seconds for the whole batch
+
+        Returns:
+            list: One dict per command: command, output, elapsed_ms, duration_ms
+        """
+        if self.sentinel_cmd:
+            tokens = [f"__rc_{uuid.uuid4().hex[:12]}__" for _ in range(len(commands) + 1)]
+            payload = "".join(f"{c}\n{self.sentinel_cmd.format(token=t)}\n" for c, t in zip(commands, tokens))
+            # A leading sentinel flushes anything the CLI still had queued
+            payload = f"{self.sentinel_cmd.format(token=tokens[-1])}\n" + payload
+            ends = [re.compile(rf"(?m)^{t}\r?\n") for t in [tokens[-1]] + tokens[:-1]]
+            skip = 1
+        else:
+            payload = "".join(f"{c}\n" for c in commands)
+            ends = None
+            skip = 0
+        expected = len(commands) + skip
+
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        buf = ""
+        carry = ""
+        pos = 0
+        outputs : list = []
+        stamps : list = []
+        deadline = time.monotonic() + timeout
+
+        started = time.perf_counter()
+        if payload and not self.__tcp.send(payload.encode("utf-8")):
+            raise CliUnavailable("failed to send to CLI")
+        self.batches += 1
+
+        while len(outputs) < expected:
+            # Split off every reply whose terminator has arrived
+            while len(outputs) < expected:
+                end = ends[len(outputs)] if ends else self.prompt
+                match = end.search(buf, pos)
+                if match is None:
+                    break
+                outputs.append(buf[pos:match.start()])
+                stamps.append(time.perf_counter())
+                pos = match.end()
+            if len(outputs) == expected:
+                break
+
+            if time.monotonic() > deadline:
+                raise CliTimeout(f"CLI answered {max(0, len(outputs) - skip)} of {len(commands)} commands in time",
+                                 self.__results(commands, outputs[skip:], stamps[skip:], started))
+            if len(buf) - pos > self.max_output:
+                raise CliTimeout("CLI output too large", self.__results(commands, outputs[skip:], stamps[skip:], started))
+
+            chunk = self.__read()
+            if not chunk:
+                continue
+            text = carry + decoder.decode(chunk)
+            partial = ANSI_PARTIAL_RE.search(text)
+            carry = text[partial.start():] if partial else ""
+            buf += ANSI_RE.sub("", text[:partial.start()] if partial else text)
+
+        return self.__results(commands, outputs[skip:], stamps[skip:], started)
+
+
+    def __results(self, commands : list, outputs : list, stamps : list, started : float) -> list:
+        results = []
+        prev = started
+        for command, output, stamp in zip(commands, outputs, stamps):
+            lines = output.replace("\r\n", "\n").split("\n")
+            if self.sentinel_cmd:
+                # Prompts are not delimiters here, just noise around the output
+                lines = [self.prompt.sub("", ln) for ln in lines]
+            # Drop the CLI's echo of the command (and of the sentinel, which follows the output)
+            if lines and lines[0].strip() == command.strip():
+                lines = lines[1:]
+            if self.sentinel_cmd:
+                lines = [ln for ln in lines if "__rc_" not in ln]
+            results.append({
+                "command": command,
+                "output": "\n".join(lines).strip("\n"),
+                "elapsed_ms": round((stamp - started) * 1000, 3),
+                "duration_ms": round((stamp - prev) * 1000, 3),
+            })
+            prev = stamp
+        return results
+
+
+class CliPool:
+    """
+    Small pool of persistent CLI connections for /api/cli/exec.
+
+    Connections are opened lazily up to `size`, reused across requests, and
+    dropped (not returned) after any error, since their stream may be out of
+    step with the commands sent.
+    """
+
+    def __init__(self, host : str, port : int, size : int = 2, prompt : str = PROMPT_RE,
+                 sentinel_cmd : str = SENTINEL_CMD, max_output : int = 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.size = max(1, int(size))
+        self.prompt = re.compile(prompt, re.MULTILINE)
+        self.sentinel_cmd = sentinel_cmd
+        self.max_output = max_output
+        self.__lock = Lock()
+        self.__idle : Queue = Queue()
+        self.__open = 0
+        self.__stats = {"batches": 0, "commands": 0, "opened": 0, "discarded": 0, "errors": 0}
+
+
+    def __checkout(self, timeout : float) -> CliConnection:
+        # Reuse an idle connection unless the CLI has hung up on it meanwhile
+        while True:
+            try:
+                conn = self.__idle.get_nowait()
+            except Empty:
+                break
+            if conn.alive():
+                return conn
+            self.__discard(conn)
+        with self.__lock:
+            grow = self.__open < self.size
+            if grow:
+                self.__open += 1
+        if grow:
+            conn = CliConnection(self.host, self.port, self.prompt, self.sentinel_cmd, self.max_output)
+            try:
+                conn.open(timeout)
+            except Exception:
+                conn.close()
+                with self.__lock:
+                    self.__open -= 1
+                raise
+            with self.__lock:
+                self.__stats["opened"] += 1
+            return conn
+        try:
+            conn = self.__idle.get(timeout=timeout)
+        except Empty:
+            raise CliUnavailable(f"all {self.size} CLI connections busy") from None
+        if conn.alive():
+            return conn
+        self.__discard(conn)
+        return self.__checkout(timeout)
+
+
+    def __discard(self, conn : CliConnection) -> None:
+        conn.close()
+        with self.__lock:
+            self.__open -= 1
+            self.__stats["discarded"] += 1
+
+
+    def execute(self, commands : list, timeout : float) -> tuple:
+        """
+        Run a batch on a pooled connection
+
+        Returns:
+            tuple: (results, connection id)
+
+        Raises:
+            CliUnavailable: No connection could be made or borrowed
+            CliTimeout: Not every command finished in time (partial results attached)
+        """
+        conn = self.__checkout(timeout)
+        try:
+            results = conn.run(commands, timeout)
+        except Exception:
+            self.__discard(conn)
+            with self.__lock:
+                self.__stats["errors"] += 1
+            raise
+
+        with self.__lock:
+            self.__stats["batches"] += 1
+            self.__stats["commands"] += len(commands)
+        self.__idle.put(conn)
+        return results, conn.id
+
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {**self.__stats, "size": self.size, "open": self.__open, "idle": self.__idle.qsize()}
@@ -4,6 +4,7 @@ import time
 import ctypes
 import logging
 import os
+import struct
 
 from enum import Enum, auto
 import json
@@ -89,25 +90,90 @@ class TcpClient:
         return True
     
 
-    def read(self) -> bytes:
+    def read(self, size : int = 1024) -> bytes:
         data : bytes
         try:
-            data = self.__socket.recv(1024)
+            data = self.__socket.recv(size)
         except socket.timeout:
             return None
         
         return data
-        
+
+
+    def read_exact(self, size : int) -> bytes:
+        """
+        Read exactly `size` bytes
+
+        Args:
+            size (int): Number of bytes expected
+
+        Returns:
+            bytes: The data, None on timeout or if the peer closed early
+        """
+        buf = bytearray()
+        while len(buf) < size:
+            try:
+                chunk = self.__socket.recv(size - len(buf))
+            except socket.timeout:
+                return None
+            if not chunk:
+                return None
+            buf += chunk
+
+        return bytes(buf)
+
+
+    def drain(self) -> int:
+        """
+        Discard whatever the peer has already sent without waiting for more
+
+        Returns:
+            int: Number of bytes discarded, -1 if the peer has closed the connection
+        """
+        if self.__socket is None:
+            return -1
+        discarded = 0
+        self.__socket.setblocking(False)
+        try:
+            while True:
+                chunk = self.__socket.recv(64 * 1024)
+                if not chunk:
+                    return -1
+                discarded += len(chunk)
+        except (BlockingIOError, InterruptedError):
+            return discarded
+        except OSError:
+            return -1
+        finally:
+            self.__socket.settimeout(self.__timeout)
+
 
 class UpdatePipe(TcpClient):
     # Port where the updater daemon listens for commands/progress polling.
     UPDATER_PORT = int(os.environ.get("RC_CAR_UPDATER_PORT", "5000"))
-    HOST = '127.0.0.1' 
+    HOST = os.environ.get("RC_CAR_UPDATER_HOST", "127.0.0.1")
+
+    # Wire protocol: "auto" negotiates binary framing and falls back to JSON for older daemons
+    PROTOCOL_MODE   = os.environ.get("RC_CAR_UPDATER_PROTOCOL", "auto")
+    PROTOCOL_JSON   = 1
+    PROTOCOL_BINARY = 2
+
+    # Binary framing (protocol 2), network byte order:
+    #   request : version u8 | command u8 | payload length u16 | payload
+    #   reply   : status u8 | update_status u8 | flags u8 | payload length u16 | payload
+    # Progress replies only carry the message text when it changed (FLAG_MESSAGE).
+    REQUEST_HEADER = struct.Struct("!BBH")
+    REPLY_HEADER   = struct.Struct("!BBBH")
+    STREAM_REQUEST = struct.Struct("!Q")    # image size, followed by the UTF-8 file name
+    STREAM_REPLY   = struct.Struct("!H")    # data channel port
+    FLAG_MESSAGE   = 0x01
 
     class commands(Enum):
-        INIT_UPDATE   = 0
-        READ_PROGRESS = auto()
-        END_PROGRESS  = auto()
+        INIT_UPDATE        = 0
+        READ_PROGRESS      = auto()
+        END_PROGRESS       = auto()
+        INIT_STREAM_UPDATE = auto()
+        NEGOTIATE          = auto()
 
     def __init__(self, timeout: float = 5.0, updater_port: int | None = None, web_port: int | None = None):
         """Create an UpdatePipe.
@@ -123,20 +189,165 @@ class UpdatePipe(TcpClient):
         super().__init__(host=UpdatePipe.HOST, port=self.updater_port, timeout=timeout)
         
         self.__socket = None
+        self.__lock = Lock()
+        self.__last_message : str = ""
         self.timeout = float(timeout)
+        self.protocol : int = UpdatePipe.PROTOCOL_JSON
+        # Cleared whenever a new connection is made: the daemon starts every connection in JSON mode
+        self.__negotiated : bool = False
+
+        # Requests that never change are serialised once
+        self.__json_progress_request : bytes = json.dumps({
+            "port"    : self.web_port,
+            "command" : UpdatePipe.commands.READ_PROGRESS.value
+        }).encode('utf-8')
+        self.__binary_progress_request : bytes = UpdatePipe.encode_request(UpdatePipe.commands.READ_PROGRESS)
 
 
     def init_connection(self) -> bool:
         logging.log(logging.INFO, "Opening socket port")
-        self.__connection_status = self.open(5) # Open the socket
+        self.__connection_status = self.open(self.timeout) # Open the socket
+        if self.__connection_status:
+            with self.__lock:
+                self.__sync_protocol()
         return self.__connection_status
 
+
+    def open(self, timeout : float) -> bool:
+        # Also reached from TcpClient.send when it reconnects after a broken pipe
+        self.__negotiated = False
+        return super().open(timeout)
+
+
+    def __sync_protocol(self) -> int:
+        """
+        Negotiate again if the connection was replaced since the last negotiation. Caller holds the lock.
+
+        Returns:
+            int: Protocol to use on the current connection
+        """
+        if not self.__negotiated:
+            self.protocol = self.__negotiate()
+            self.__negotiated = True
+        return self.protocol
+
+
+    def __current_protocol(self) -> int:
+        with self.__lock:
+            # A daemon that restarted since the last request has closed this connection;
+            # reconnect now rather than lose the next request on it
+            if self.drain() < 0:
+                self.__resync()
+            return self.__sync_protocol()
+
+
+    def __resync(self) -> None:
+        """
+        Start over on a fresh connection after the daemon hung up or the stream got out
+        of step (a frame cut short, or a binary frame sent on a connection still in JSON mode).
+        Caller holds the lock; the next request negotiates again.
+        """
+        logging.log(logging.WARNING, "Updater connection lost or out of sync, reconnecting")
+        self.close()
+        self.open(self.timeout)
+
+
+    @staticmethod
+    def encode_request(command : "UpdatePipe.commands", payload : bytes = b"") -> bytes:
+        """
+        Build a binary (protocol 2) request frame
+
+        Args:
+            command (UpdatePipe.commands): Command to send
+            payload (bytes): Command-specific payload
+
+        Returns:
+            bytes: Frame ready to send
+        """
+        return UpdatePipe.REQUEST_HEADER.pack(UpdatePipe.PROTOCOL_BINARY, command.value, len(payload)) + payload
+
+
+    def __negotiate(self) -> int:
+        """
+        Offer binary framing to the daemon; anything but an explicit yes means JSON. Caller holds the lock.
+
+        Returns:
+            int: Protocol to use on this connection
+        """
+        if UpdatePipe.PROTOCOL_MODE == "json":
+            return UpdatePipe.PROTOCOL_JSON
+
+        payload = json.dumps({
+            "port"      : self.web_port,
+            "command"   : UpdatePipe.commands.NEGOTIATE.value,
+            "protocols" : [UpdatePipe.PROTOCOL_JSON, UpdatePipe.PROTOCOL_BINARY]
+        }).encode('utf-8')
+
+        if not self.send(payload):
+            return UpdatePipe.PROTOCOL_JSON
+        data : bytes = self.read()
+
+        try:
+            reply = json.loads(data.decode('utf-8')) if data else {}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            reply = {}
+
+        if reply.get("status") and reply.get("protocol") == UpdatePipe.PROTOCOL_BINARY:
+            logging.log(logging.INFO, "Updater supports binary protocol")
+            return UpdatePipe.PROTOCOL_BINARY
+
+        logging.log(logging.INFO, "Updater does not support binary protocol, using JSON")
+        return UpdatePipe.PROTOCOL_JSON
+
+
+    def __transact_binary(self, command : "UpdatePipe.commands", payload : bytes = b"",
+                          frame : bytes | None = None) -> tuple:
+        """
+        Send one binary request and read its reply. Caller holds the lock.
+
+        Returns:
+            tuple: (status, update_status, flags, payload), None on I/O failure
+        """
+        frame = frame if frame is not None else UpdatePipe.encode_request(command, payload)
+        for attempt in range(2):
+            if self.__sync_protocol() != UpdatePipe.PROTOCOL_BINARY:
+                # The connection was replaced and the daemon no longer offers binary framing
+                return None
+            if not self.send(frame):
+                return None
+            if self.__negotiated:
+                break
+            # send() reconnected, so the frame went to a connection still in JSON mode and was
+            # refused there; start clean and send it once more
+            self.__resync()
+        else:
+            return None
+
+        header : bytes = self.read_exact(UpdatePipe.REPLY_HEADER.size)
+        if header == None:
+            self.__resync()
+            return None
+
+        status, update_status, flags, length = UpdatePipe.REPLY_HEADER.unpack(header)
+        body : bytes = self.read_exact(length) if length else b""
+        if body == None:
+            self.__resync()
+            return None
+
+        return status, update_status, flags, body
+
     
     def start_update(self, file_path : str) -> bool:
         if not self.__connection_status:
             return False
 
         logging.log(logging.INFO,"Starting update with file at %s", file_path)        
+
+        if self.__current_protocol() == UpdatePipe.PROTOCOL_BINARY:
+            with self.__lock:
+                result = self.__transact_binary(UpdatePipe.commands.INIT_UPDATE, file_path.encode('utf-8'))
+            return bool(result and result[0])
+
         msg_out : dict = {
             "port"      : self.web_port,
             "command"   : UpdatePipe.commands.INIT_UPDATE.value,
@@ -151,11 +362,12 @@ class UpdatePipe(TcpClient):
             logging.exception("Failed to serialize update message")
             return False
         
-        ret : bool = self.send(payload)
-        if not ret:
-            return False
-        
-        data : bytes = self.read()
+        with self.__lock:
+            ret : bool = self.send(payload)
+            if not ret:
+                return False
+            
+            data : bytes = self.read()
         if data == None:
             return False
         
@@ -173,28 +385,91 @@ class UpdatePipe(TcpClient):
         return True
     
 
-    def read_state(self) -> tuple:
+    def start_stream_update(self, size : int, filename : str) -> int | None:
+        """
+        Ask the updater daemon to open a data channel for a streamed image.
+
+        Args:
+            size (int): Total image size in bytes
+            filename (str): Original image file name (informational)
+
+        Returns:
+            int | None: Port of the daemon's data channel, None on failure
+        """
         if not self.__connection_status:
             return None
-        
+
+        logging.log(logging.INFO, "Starting streamed update of %s (%s bytes)", filename, size)
+
+        if self.__current_protocol() == UpdatePipe.PROTOCOL_BINARY:
+            request = UpdatePipe.STREAM_REQUEST.pack(int(size)) + filename.encode('utf-8')
+            with self.__lock:
+                result = self.__transact_binary(UpdatePipe.commands.INIT_STREAM_UPDATE, request)
+            if not result or not result[0] or len(result[3]) != UpdatePipe.STREAM_REPLY.size:
+                return None
+            return UpdatePipe.STREAM_REPLY.unpack(result[3])[0]
+
         msg_out : dict = {
-            "port"    : self.web_port,
-            "command" : UpdatePipe.commands.READ_PROGRESS.value
+            "port"     : self.web_port,
+            "command"  : UpdatePipe.commands.INIT_STREAM_UPDATE.value,
+            "size"     : int(size),
+            "filename" : filename
         }
 
-        payload : bytes
-
         try:
             payload = json.dumps(msg_out).encode('utf-8')
         except Exception as e:
-            logging.exception("Failed to serialize update message")
+            logging.exception("Failed to serialize stream update message")
             return None
-        
-        ret : bool = self.send(payload)
-        if not ret:
+
+        with self.__lock:
+            if not self.send(payload):
+                return None
+
+            data : bytes = self.read()
+        if data == None:
             return None
+
+        try:
+            reply = json.loads(data.decode('utf-8'))
+        except json.JSONDecodeError:
+            logging.log(logging.ERROR, "Invalid reply")
+            return None
+
+        if not reply.get("status") or not reply.get("data_port"):
+            return None
+
+        return int(reply["data_port"])
+
+
+    def read_state(self) -> tuple:
+        if not self.__connection_status:
+            return None
+
+        if self.__current_protocol() == UpdatePipe.PROTOCOL_BINARY:
+            with self.__lock:
+                result = self.__transact_binary(UpdatePipe.commands.READ_PROGRESS,
+                                                frame=self.__binary_progress_request)
+                if not result or not result[0]:
+                    return None
+
+                status, update_status, flags, body = result
+                if flags & UpdatePipe.FLAG_MESSAGE:
+                    self.__last_message = body.decode('utf-8', errors='replace')
+                    if self.__last_message != "":
+                        logging.log(logging.INFO, "%s", self.__last_message)
+                return update_status, self.__last_message
+
+        payload : bytes = self.__json_progress_request
         
-        data : bytes = self.read()
+        with self.__lock:
+            ret : bool = self.send(payload)
+            if not ret:
+                return None
+            
+            data : bytes = self.read()
+        if data == None:
+            return None
 
         try:
             reply = json.loads(data.decode('utf-8'))
@@ -205,9 +480,86 @@ class UpdatePipe(TcpClient):
         if not reply["status"]:
             return None
 
-        # Print reply 
-        if reply["message"] != "":
+        # Print reply (only when it changes; this is polled at high frequency)
+        if reply["message"] != "" and reply["message"] != self.__last_message:
             logging.log(logging.INFO, "%s", reply["message"])
+        self.__last_message = reply["message"]
 
         return reply["update_status"], reply["message"]
         
+
+
+
+class UpdateStream:
+    """
+    One-shot data channel that feeds a .swu image straight into the updater daemon.
+
+    The image is written in chunks as it arrives from the HTTP client, so nothing is
+    staged on flash. `write` blocks while the daemon's receive window is full, which
+    propagates backpressure all the way back to the uploading browser.
+    """
+    CHUNK_SIZE = int(os.environ.get("RC_CAR_SWU_STREAM_CHUNK", str(64 * 1024)))
+
+    def __init__(self, port : int, host : str = UpdatePipe.HOST, timeout : float = 30.0):
+        self.__host = host
+        self.__port = int(port)
+        self.__timeout = float(timeout)
+        self.__socket = None
+        self.bytes_sent : int = 0
+
+
+    def open(self) -> bool:
+        """
+        Connect to the daemon's data channel
+
+        Returns:
+            bool: True if the channel is open
+        """
+        try:
+            self.__socket = socket.create_connection((self.__host, self.__port), timeout=self.__timeout)
+            # Keep the kernel buffer small so the daemon, not the socket, paces the upload
+            self.__socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, UpdateStream.CHUNK_SIZE)
+        except OSError:
+            logging.exception("Failed to open update stream at port %s", self.__port)
+            self.__socket = None
+            return False
+
+        return True
+
+
+    def write(self, data : bytes) -> bool:
+        """
+        Forward a chunk of image data
+
+        Args:
+            data (bytes): Image chunk
+
+        Returns:
+            bool: False if the daemon went away
+        """
+        if self.__socket == None:
+            return False
+
+        try:
+            self.__socket.sendall(data)
+        except OSError:
+            logging.exception("Update stream write failed after %s bytes", self.bytes_sent)
+            return False
+
+        self.bytes_sent += len(data)
+        return True
+
+
+    def close(self) -> None:
+        """
+        Signal end of image to the daemon and close the channel
+        """
+        if self.__socket == None:
+            return
+
+        try:
+            self.__socket.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        self.__socket.close()
+        self.__socket = None
@@ -0,0 +1,208 @@
+from threading import Lock
+import queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One event consumer (typically a browser on /ws/events).
+
+    Messages are queued per subscriber so a slow client never blocks publishers.
+    If the queue overflows, pending diffs are discarded and the subscriber is
+    resynchronised with full snapshots of every topic it follows.
+    """
+
+    def __init__(self, hub, max_queue : int):
+        self.__hub = hub
+        self.__queue = queue.Queue(maxsize=max_queue)
+        self.__lock = Lock()
+        self.__resync = False
+        # Replaced, never mutated: publishers iterate it on other threads without the lock
+        self.topics : frozenset = frozenset()
+        self.closed : bool = False
+
+
+    def matches(self, topic : str) -> bool:
+        topics = self.topics
+        if topic in topics:
+            return True
+        return any(t.endswith("/*") and topic.startswith(t[:-1]) for t in topics)
+
+
+    def add(self, topic : str) -> None:
+        """
+        Follow a topic and queue a snapshot of its current state(s)
+
+        Args:
+            topic (str): Exact topic name, or a prefix ending in "/*"
+        """
+        with self.__lock:
+            self.topics = self.topics | {topic}
+        for name, state in self.__hub.snapshot(topic):
+            self.push({"t": name, "s": state})
+
+
+    def remove(self, topic : str) -> None:
+        with self.__lock:
+            self.topics = self.topics - {topic}
+
+
+    def push(self, msg : dict) -> None:
+        if self.closed:
+            return
+        try:
+            self.__queue.put_nowait(msg)
+        except queue.Full:
+            with self.__lock:
+                self.__resync = True
+
+
+    def get(self, timeout : float | None = None) -> list | None:
+        """
+        Wait for pending messages
+
+        Args:
+            timeout (float | None): Seconds to wait, None to wait forever
+
+        Returns:
+            list | None: Batch of messages (possibly empty on timeout), None once closed
+        """
+        if self.closed:
+            return None
+
+        with self.__lock:
+            resync = self.__resync
+            self.__resync = False
+
+        if resync:
+            self.__drain()
+            batch = []
+            for topic in self.topics:
+                batch += [{"t": name, "s": state} for name, state in self.__hub.snapshot(topic)]
+            return batch
+
+        try:
+            msg = self.__queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        if msg is None:
+            return None
+
+        batch = [msg]
+        batch += [m for m in self.__drain() if m is not None]
+        return batch
+
+
+    def close(self) -> None:
+        self.closed = True
+        self.__hub.unsubscribe(self)
+        try:
+            self.__queue.put_nowait(None)
+        except queue.Full:
+            self.__drain()
+            self.__queue.put_nowait(None)
+
+
+    def __drain(self) -> list:
+        msgs = []
+        while True:
+            try:
+                msgs.append(self.__queue.get_nowait())
+            except queue.Empty:
+                return msgs
+
+
+class EventHub:
+    """
+    Topic-based state fan-out for the dashboard.
+
+    Publishers hand over the full current state of a topic (e.g. "wifi",
+    "swu/<job_id>", "system"); subscribers receive only the keys that changed.
+    Keys listed in `quiet_keys` never trigger a push on their own, they just ride
+    along with the next real change.
+    """
+
+    def __init__(self, max_queue : int = 256, quiet_keys : tuple = ("updated",)):
+        self.__lock = Lock()
+        self.__states : dict = {}
+        self.__subscribers : list = []
+        self.__max_queue = max_queue
+        self.__quiet_keys = frozenset(quiet_keys)
+
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self, self.__max_queue)
+        with self.__lock:
+            self.__subscribers.append(sub)
+        return sub
+
+
+    def unsubscribe(self, sub : Subscription) -> None:
+        with self.__lock:
+            if sub in self.__subscribers:
+                self.__subscribers.remove(sub)
+
+
+    def has_subscribers(self, topic : str) -> bool:
+        with self.__lock:
+            return any(sub.matches(topic) for sub in self.__subscribers)
+
+
+    def snapshot(self, topic : str) -> list:
+        """
+        Current state(s) for a topic or "prefix/*" pattern
+
+        Returns:
+            list: (topic, state) pairs
+        """
+        with self.__lock:
+            if topic.endswith("/*"):
+                prefix = topic[:-1]
+                return [(name, dict(st)) for name, st in self.__states.items() if name.startswith(prefix)]
+            if topic in self.__states:
+                return [(topic, dict(self.__states[topic]))]
+            return []
+
+
+    def publish(self, topic : str, state : dict) -> bool:
+        """
+        Record the latest state of a topic and push the difference to subscribers
+
+        Args:
+            topic (str): Topic name
+            state (dict): Full current state (copied)
+
+        Returns:
+            bool: True if anything subscribers care about changed
+        """
+        state = dict(state)
+        with self.__lock:
+            prev = self.__states.get(topic)
+            self.__states[topic] = state
+
+            if prev is None:
+                msg = {"t": topic, "s": state}
+            else:
+                changed = {k: v for k, v in state.items() if k not in prev or prev[k] != v}
+                removed = [k for k in prev if k not in state]
+                if not removed and all(k in self.__quiet_keys for k in changed):
+                    # Keep the previous snapshot so quiet keys are reported with the next diff
+                    self.__states[topic] = prev
+                    return False
+                msg = {"t": topic, "d": changed}
+                if removed:
+                    msg["x"] = removed
+
+            targets = [sub for sub in self.__subscribers if sub.matches(topic)]
+
+        for sub in targets:
+            sub.push(msg)
+        return True
+
+
+    def discard(self, topic : str) -> None:
+        """Forget a topic (e.g. a finished job) so it is not replayed to new subscribers."""
+        with self.__lock:
+            self.__states.pop(topic, None)
@@ -0,0 +1,241 @@
+from collections import deque
+from concurrent.futures import Future
+from threading import Thread, Lock, Condition, current_thread
+import math
+import socket
+import time
+
+from werkzeug.serving import ThreadedWSGIServer
+
+
+class Saturated(Exception):
+    """A pool or the HTTP server is at its limit; `retry_after` is a hint in whole seconds."""
+
+    def __init__(self, message : str, retry_after : int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Fixed set of worker threads in front of a queue of limited depth.
+
+    Workers are started on demand up to `workers` and then kept; at most
+    `queue` further jobs wait for a free worker. Anything beyond that is
+    refused with Saturated at once instead of piling up threads or memory,
+    so callers can answer 503 while the work already admitted finishes.
+    With `queue=0` a job either starts right away or is refused, which suits
+    long-running loops that must not sit behind each other.
+
+    Workers are daemon threads, unlike concurrent.futures', so a job that
+    never returns (a reader blocked on a socket) cannot hold up shutdown.
+    """
+    TIMING_SMOOTHING = 0.2      # EWMA weight of the newest job
+    MAX_RETRY_AFTER_S = 60
+
+    def __init__(self, name : str, workers : int, queue : int = 0, wrap=None):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(queue))
+        # Applied to each job on the submitting thread, e.g. to carry per-request context over
+        self.wrap = wrap
+        self.__lock = Lock()
+        self.__ready = Condition(self.__lock)
+        self.__jobs : deque = deque()
+        self.__running : dict = {}          # worker thread id -> start of its current job
+        self.__threads = 0
+        self.__idle = 0
+        self.__busy = 0
+        self.__peak_queued = 0
+        self.__peak_busy = 0
+        self.__wait_s = 0.0
+        self.__run_s = 0.0
+        self.__stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+
+    def __retry_after(self) -> int:
+        # Time for the jobs ahead of a retry to drain through the workers. Caller holds the lock.
+        # Jobs still running count for at least as long as they have been running, so a pool
+        # held by long jobs is not advertised as free again in a second.
+        now = time.monotonic()
+        running = [now - started for started in self.__running.values()]
+        per_job = max([self.__run_s] + running)
+        backlog = self.__busy + len(self.__jobs)
+        return max(1, min(self.MAX_RETRY_AFTER_S, math.ceil(per_job * backlog / self.workers)))
+
+
+    def ensure_capacity(self, n : int = 1) -> None:
+        """
+        Refuse early, before starting work that would need `n` jobs admitted later
+
+        Raises:
+            Saturated: Fewer than `n` slots are free right now
+        """
+        with self.__lock:
+            if self.__busy + len(self.__jobs) + n > self.workers + self.max_queue:
+                self.__stats["rejected"] += 1
+                raise Saturated(f"{self.name} pool is busy", self.__retry_after())
+
+
+    def submit(self, fn, *args, name : str | None = None) -> Future:
+        """
+        Queue `fn(*args)` for a worker
+
+        Args:
+            fn: Callable to run
+            name (str): Thread name while the job runs (shows up in thread dumps)
+
+        Returns:
+            Future: Resolves to the job's result or exception
+
+        Raises:
+            Saturated: Every worker is busy and the queue is full
+        """
+        future = Future()
+        with self.__lock:
+            if self.__busy + len(self.__jobs) >= self.workers + self.max_queue:
+                self.__stats["rejected"] += 1
+                raise Saturated(f"{self.name} pool is busy", self.__retry_after())
+            self.__jobs.append((future, self.wrap(fn) if self.wrap else fn, args, name, time.monotonic()))
+            self.__stats["submitted"] += 1
+            self.__peak_queued = max(self.__peak_queued, len(self.__jobs))
+            if len(self.__jobs) > self.__idle and self.__threads < self.workers:
+                self.__threads += 1
+                Thread(target=self.__worker, name=f"{self.name}-{self.__threads}", daemon=True).start()
+            else:
+                self.__ready.notify()
+        return future
+
+
+    def call(self, fn, *args, name : str | None = None):
+        """Run `fn(*args)` on the pool and wait for it; its exception, if any, is raised here."""
+        return self.submit(fn, *args, name=name).result()
+
+
+    def __worker(self) -> None:
+        thread = current_thread()
+        own_name = thread.name
+        while True:
+            with self.__lock:
+                self.__idle += 1
+                while not self.__jobs:
+                    self.__ready.wait()
+                self.__idle -= 1
+                future, fn, args, name, queued_at = self.__jobs.popleft()
+                self.__busy += 1
+                self.__peak_busy = max(self.__peak_busy, self.__busy)
+                started = time.monotonic()
+                self.__running[thread.ident] = started
+
+            failed = False
+            if future.set_running_or_notify_cancel():
+                if name:
+                    thread.name = name
+                try:
+                    result = fn(*args)
+                except BaseException as e:
+                    failed = True
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+                finally:
+                    thread.name = own_name
+            finished = time.monotonic()
+
+            with self.__lock:
+                self.__busy -= 1
+                self.__running.pop(thread.ident, None)
+                self.__stats["failed" if failed else "completed"] += 1
+                a = self.TIMING_SMOOTHING
+                self.__wait_s += a * ((started - queued_at) - self.__wait_s)
+                self.__run_s += a * ((finished - started) - self.__run_s)
+
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "threads": self.__threads,
+                "busy": self.__busy,
+                "queued": len(self.__jobs),
+                "peak_busy": self.__peak_busy,
+                "peak_queued": self.__peak_queued,
+                "avg_wait_ms": round(self.__wait_s * 1000, 3),
+                "avg_run_ms": round(self.__run_s * 1000, 3),
+                **self.__stats,
+            }
+
+
+class BoundedWSGIServer(ThreadedWSGIServer):
+    """
+    Werkzeug's thread-per-connection server with a cap on open connections.
+
+    A connection over `max_connections` gets a canned 503 from the accept
+    loop and is closed, so a burst of clients costs no thread at all.
+    WebSockets and SSE streams hold their connection for as long as they
+    are open and count against the cap like any other connection.
+    """
+    REJECT = (b"HTTP/1.1 503 Service Unavailable\r\n"
+              b"Retry-After: 1\r\n"
+              b"Content-Type: application/json\r\n"
+              b"Content-Length: 47\r\n"
+              b"Connection: close\r\n\r\n"
+              b'{"ok": false, "error": "Too many connections"}\n')
+
+    def __init__(self, host : str, port : int, app, max_connections : int = 64, **kwargs):
+        super().__init__(host, port, app, **kwargs)
+        self.max_connections = max(1, int(max_connections))
+        self.__lock = Lock()
+        self.__stats = {"open": 0, "peak": 0, "accepted": 0, "rejected": 0}
+
+
+    def process_request(self, request, client_address) -> None:
+        with self.__lock:
+            admit = self.__stats["open"] < self.max_connections
+            if admit:
+                self.__stats["open"] += 1
+                self.__stats["accepted"] += 1
+                self.__stats["peak"] = max(self.__stats["peak"], self.__stats["open"])
+            else:
+                self.__stats["rejected"] += 1
+
+        if not admit:
+            self.__reject(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            with self.__lock:
+                self.__stats["open"] -= 1
+            raise
+
+
+    def process_request_thread(self, request, client_address) -> None:
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self.__lock:
+                self.__stats["open"] -= 1
+
+
+    def __reject(self, request : socket.socket) -> None:
+        # Never block the accept loop: read whatever request bytes already arrived
+        # (closing with unread data would reset the connection before the 503 lands)
+        try:
+            request.setblocking(False)
+            while request.recv(64 * 1024):
+                pass
+        except OSError:
+            pass
+        try:
+            request.sendall(self.REJECT)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {"max_connections": self.max_connections, **self.__stats}
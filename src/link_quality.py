@@ -0,0 +1,357 @@
+from collections import OrderedDict, deque
+from threading import Thread, Lock
+import bisect
+import logging
+import os
+import time
+
+from executors import Saturated
+from telemetry import Resolution
+from wifi_backend import WifiBackendError
+
+logger = logging.getLogger(__name__)
+
+
+class LinkQualitySampler(Thread):
+    """
+    Background sampler of the Wi-Fi link: signal, bitrate and retries per BSSID.
+
+    Every `interval` it asks the Wi-Fi backend for the current association (two
+    property reads on D-Bus) and reads the driver's dBm level and retry counter
+    from /proc/net/wireless, and appends them to a fixed-size ring history for
+    that BSSID. Time spent below `min_signal` / `min_bitrate_mbps` is totalled;
+    pass `min_bitrate_mbps=None` when the backend cannot report the current
+    bitrate, and the bitrate threshold is left out of the metrics.
+
+    With `roam` enabled, a link whose smoothed signal stays below `min_signal`
+    is moved to a saved network's access point that is at least `roam_margin`
+    points stronger, but never sooner than `roam_min_dwell_s` after the last
+    change of access point, so two similar APs cannot make the car flap.
+
+    Every backend call goes through `call(fn, *args)` (a pool's `call`, so nmcli
+    runs are bounded with the server's others); a sample or roam the pool
+    refuses is skipped.
+    """
+    MAX_BSSIDS = 16
+    SIGNAL_SMOOTHING = 0.3      # EWMA weight of the newest sample
+    KNOWN_NETWORKS_TTL_S = 60.0
+
+    def __init__(self, backend, interval : float = 2.0, history : int = 900, min_signal : int = 40,
+                 min_bitrate_mbps : float | None = 12.0, roam : bool = False, roam_margin : int = 15,
+                 roam_min_dwell_s : float = 60.0, roam_scan_interval_s : float = 30.0,
+                 on_sample=None, on_roam=None, call=None):
+        super().__init__(name="wifi-link-sampler", daemon=True)
+        self.backend = backend
+        self.interval = float(interval)
+        self.history_size = int(history)
+        self.min_signal = int(min_signal)
+        self.min_bitrate_mbps = float(min_bitrate_mbps) if min_bitrate_mbps is not None else None
+        self.roam = bool(roam)
+        self.roam_margin = int(roam_margin)
+        self.roam_min_dwell_s = float(roam_min_dwell_s)
+        self.roam_scan_interval_s = float(roam_scan_interval_s)
+        self.on_sample = on_sample
+        self.on_roam = on_roam
+        self.__call = call or (lambda fn, *args: fn(*args))
+        self.latest : dict = {"connected": False}
+        self.__lock = Lock()
+        self.__bssids : OrderedDict = OrderedDict()
+        self.__totals = {
+            "samples": 0, "connected_s": 0.0, "disconnected_s": 0.0,
+            "below_signal_s": 0.0, "below_bitrate_s": 0.0, "below_any_s": 0.0,
+            "roams": 0, "roam_failures": 0,
+        }
+        if self.min_bitrate_mbps is None:
+            del self.__totals["below_bitrate_s"]
+        self.__roams : deque = deque(maxlen=20)
+        self.__prev : tuple | None = None           # (monotonic time, connected, below signal, below bitrate)
+        self.__below_since : float | None = None
+        self.__bssid : str | None = None
+        self.__associated_at = time.monotonic()
+        self.__signal_avg : float | None = None
+        self.__prev_retries : int | None = None
+        self.__last_scan = 0.0
+        self.__known : tuple = (0.0, {})
+        self.__wireless_fd : int | None = None
+
+
+    def run(self) -> None:
+        logger.info("Wi-Fi link sampler running every %s s (roaming %s)", self.interval, "on" if self.roam else "off")
+        next_ts = time.monotonic()
+        while True:
+            try:
+                self.sample()
+            except Saturated as e:
+                logger.debug("Wi-Fi link sample skipped: %s", e)
+            except Exception:
+                logger.exception("Wi-Fi link sample failed")
+            next_ts += self.interval
+            delay = next_ts - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_ts = time.monotonic()
+
+
+    def sample(self) -> dict:
+        now = time.time()
+        mono = time.monotonic()
+        link = self.__call(self.backend.get_link)
+
+        with self.__lock:
+            self.__account(mono)
+            if link is None or not link.get("bssid"):
+                self.__bssid = None
+                self.__signal_avg = None
+                self.__prev_retries = None
+                self.__prev = (mono, False, False, False)
+                self.__below_since = None
+                self.latest = {"t": now, "connected": False}
+            else:
+                self.__record(now, mono, link)
+
+        if self.on_sample is not None:
+            self.on_sample(self.latest)
+        if link is not None and link.get("bssid"):
+            self.__maybe_roam(link, mono)
+        return self.latest
+
+
+    def history(self, window_s : float, bssid : str | None = None) -> dict:
+        """
+        Per-BSSID samples from the last `window_s` seconds
+
+        Returns:
+            dict: {bssid: {"ssid", "first_seen", "last_seen", "t": [...], "series": {name: [...]}}}
+        """
+        cutoff = time.time() - window_s
+        out = {}
+        with self.__lock:
+            for key, entry in self.__bssids.items():
+                if bssid and key != bssid.upper():
+                    continue
+                hist = entry["level"].history()
+                start = bisect.bisect_left(hist["t"], cutoff)
+                if start >= len(hist["t"]):
+                    continue
+                out[key] = {
+                    "ssid": entry["ssid"],
+                    "first_seen": entry["first_seen"],
+                    "last_seen": entry["last_seen"],
+                    "t": hist["t"][start:],
+                    "series": {name: values[start:] for name, values in hist["series"].items()},
+                }
+        return out
+
+
+    def stats(self) -> dict:
+        with self.__lock:
+            totals = dict(self.__totals)
+            if self.__below_since is not None:
+                totals["below_current_s"] = round(time.monotonic() - self.__below_since, 3)
+            for key in ("connected_s", "disconnected_s", "below_signal_s", "below_bitrate_s", "below_any_s"):
+                if key in totals:
+                    totals[key] = round(totals[key], 3)
+            thresholds = {"min_signal": self.min_signal}
+            if self.min_bitrate_mbps is not None:
+                thresholds["min_bitrate_mbps"] = self.min_bitrate_mbps
+            return {
+                "link": dict(self.latest),
+                "thresholds": thresholds,
+                "metrics": totals,
+                "bssids": [
+                    {"bssid": key, "ssid": e["ssid"], "samples": e["samples"], "last_seen": e["last_seen"],
+                     "below_signal_s": round(e["below_signal_s"], 3)}
+                    for key, e in reversed(self.__bssids.items())
+                ],
+                "roaming": {
+                    "enabled": self.roam,
+                    "margin": self.roam_margin,
+                    "min_dwell_s": self.roam_min_dwell_s,
+                    "recent": list(self.__roams),
+                },
+            }
+
+
+    # -- internals ----------------------------------------------------------------
+
+    def __account(self, mono : float) -> None:
+        """Credit the time since the last sample to the state observed then. Caller holds __lock."""
+        if self.__prev is None:
+            return
+        prev_mono, connected, below_signal, below_bitrate = self.__prev
+        dt = max(0.0, mono - prev_mono)
+        totals = self.__totals
+        if not connected:
+            totals["disconnected_s"] += dt
+            return
+        totals["connected_s"] += dt
+        if below_signal:
+            totals["below_signal_s"] += dt
+            entry = self.__bssids.get(self.__bssid)
+            if entry is not None:
+                entry["below_signal_s"] += dt
+        if below_bitrate:
+            totals["below_bitrate_s"] += dt
+        if below_signal or below_bitrate:
+            totals["below_any_s"] += dt
+
+
+    def __record(self, now : float, mono : float, link : dict) -> None:
+        """Caller holds __lock."""
+        bssid = link["bssid"]
+        if bssid != self.__bssid:
+            self.__bssid = bssid
+            self.__associated_at = mono
+            self.__signal_avg = None
+            self.__prev_retries = None
+
+        signal = link.get("signal")
+        if signal is not None:
+            a = LinkQualitySampler.SIGNAL_SMOOTHING
+            self.__signal_avg = signal if self.__signal_avg is None else a * signal + (1 - a) * self.__signal_avg
+
+        sample = {}
+        if signal is not None:
+            sample["signal"] = float(signal)
+        if link.get("bitrate_mbps") is not None:
+            sample["bitrate_mbps"] = float(link["bitrate_mbps"])
+        dbm, retries = self.__read_wireless(link.get("device"))
+        if dbm is not None:
+            sample["dbm"] = dbm
+        if retries is not None:
+            if self.__prev_retries is not None and retries >= self.__prev_retries:
+                sample["tx_retries"] = float(retries - self.__prev_retries)
+            self.__prev_retries = retries
+
+        entry = self.__bssids.get(bssid)
+        if entry is None:
+            if len(self.__bssids) >= LinkQualitySampler.MAX_BSSIDS:
+                self.__bssids.popitem(last=False)
+            entry = self.__bssids[bssid] = {
+                "ssid": link.get("ssid"), "first_seen": now, "last_seen": now, "samples": 0,
+                "below_signal_s": 0.0, "level": Resolution("raw", 1, self.history_size),
+            }
+        self.__bssids.move_to_end(bssid)
+        entry["ssid"] = link.get("ssid") or entry["ssid"]
+        entry["last_seen"] = now
+        entry["samples"] += 1
+        entry["level"].add(now, sample)
+
+        below_signal = self.__signal_avg is not None and self.__signal_avg < self.min_signal
+        below_bitrate = (self.min_bitrate_mbps is not None and link.get("bitrate_mbps") is not None
+                         and link["bitrate_mbps"] < self.min_bitrate_mbps)
+        if below_signal or below_bitrate:
+            if self.__below_since is None:
+                self.__below_since = mono
+        else:
+            self.__below_since = None
+        self.__prev = (mono, True, below_signal, below_bitrate)
+        self.__totals["samples"] += 1
+
+        self.latest = {
+            "t": now,
+            "connected": True,
+            **link,
+            "signal_avg": round(self.__signal_avg, 1) if self.__signal_avg is not None else None,
+            **{k: sample[k] for k in ("dbm", "tx_retries") if k in sample},
+            "below_signal": below_signal,
+        }
+        if self.min_bitrate_mbps is not None:
+            self.latest["below_bitrate"] = below_bitrate
+
+
+    def __known_networks(self, mono : float) -> dict:
+        fetched, known = self.__known
+        if mono - fetched > LinkQualitySampler.KNOWN_NETWORKS_TTL_S:
+            known = self.__call(self.backend.known_networks)
+            self.__known = (mono, known)
+        return known
+
+
+    def __maybe_roam(self, link : dict, mono : float) -> None:
+        if not self.roam:
+            return
+        with self.__lock:
+            current = self.__signal_avg
+            dwell = mono - self.__associated_at
+        if current is None or current >= self.min_signal or dwell < self.roam_min_dwell_s:
+            return
+
+        # Fresh scans disturb the link, so only ask for one every roam_scan_interval_s
+        rescan = mono - self.__last_scan >= self.roam_scan_interval_s
+        if rescan:
+            self.__last_scan = mono
+        try:
+            known = self.__known_networks(mono)
+            candidates = self.__call(self.backend.scan, rescan)
+        except (WifiBackendError, OSError, Saturated) as e:
+            logger.warning("Roaming scan failed: %s", e)
+            return
+
+        best = None
+        for ap in candidates:
+            if not ap.get("bssid") or ap["bssid"] == link["bssid"] or ap.get("ssid") not in known:
+                continue
+            if ap.get("signal", 0) < max(self.min_signal, current + self.roam_margin):
+                continue
+            if best is None or ap["signal"] > best["signal"]:
+                best = ap
+        if best is None:
+            return
+
+        logger.info("Roaming from %s (%s, signal %.0f) to %s (%s, signal %s)",
+                    link["bssid"], link.get("ssid"), current, best["bssid"], best["ssid"], best["signal"])
+        roam = {
+            "t": time.time(),
+            "from": {"bssid": link["bssid"], "ssid": link.get("ssid"), "signal": round(current, 1)},
+            "to": {"bssid": best["bssid"], "ssid": best["ssid"], "signal": best["signal"]},
+            "ok": True,
+        }
+        try:
+            self.__call(self.backend.activate_connection, known[best["ssid"]], link.get("device"), best["bssid"])
+        except (WifiBackendError, Saturated) as e:
+            logger.warning("Roam to %s failed: %s", best["bssid"], e)
+            roam["ok"] = False
+            roam["error"] = str(e)
+
+        with self.__lock:
+            # A failed attempt also waits out the dwell time before the next one
+            self.__associated_at = time.monotonic()
+            self.__totals["roams" if roam["ok"] else "roam_failures"] += 1
+            self.__roams.append(roam)
+        if self.on_roam is not None:
+            self.on_roam(roam)
+
+
+    def __read_wireless(self, device : str | None) -> tuple:
+        """(signal dBm, tx retry counter) for `device` from /proc/net/wireless, None where unavailable"""
+        if not device:
+            return None, None
+        if self.__wireless_fd is None:
+            try:
+                self.__wireless_fd = os.open("/proc/net/wireless", os.O_RDONLY)
+            except OSError:
+                self.__wireless_fd = -1     # no wireless extensions; do not retry every sample
+        if self.__wireless_fd < 0:
+            return None, None
+        try:
+            text = os.pread(self.__wireless_fd, 8192, 0).decode("ascii", errors="replace")
+        except OSError:
+            return None, None
+        # Skip the two header lines; columns: status, link, level, noise, nwid, crypt, frag, retry, misc, beacon
+        for line in text.splitlines()[2:]:
+            iface, _, rest = line.partition(":")
+            if iface.strip() != device:
+                continue
+            cols = rest.split()
+            if len(cols) < 8:
+                break
+            try:
+                level = float(cols[2].rstrip("."))
+                retries = int(cols[7])
+            except ValueError:
+                break
+            # Some drivers report the level as an unsigned byte
+            return (level - 256 if level > 0 else level), retries
+        return None, None
@@ -0,0 +1,161 @@
+from threading import Condition
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import logging
+import queue
+import time
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '[%(levelname)s] %(message)s'
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the logging thread.
+
+    When the queue is full the record is dropped and counted instead of
+    stalling a request, poll or terminal thread behind disk I/O.
+    """
+
+    def __init__(self, log_queue : queue.Queue):
+        super().__init__(log_queue)
+        self.dropped : int = 0
+
+
+    def enqueue(self, record : logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogRing(logging.Handler):
+    """
+    Bounded in-memory tail of recent log records.
+
+    Records get a monotonically increasing sequence number so followers can ask
+    for "everything after N" and wait for new entries.
+    """
+
+    def __init__(self, capacity : int = 2000):
+        super().__init__()
+        self.capacity = capacity
+        self.__records = deque(maxlen=capacity)
+        self.__cond = Condition()
+        self.__seq = 0
+
+
+    def emit(self, record : logging.LogRecord) -> None:
+        try:
+            entry = {
+                "seq": 0,
+                "time": record.created,
+                "level": record.levelname,
+                "levelno": record.levelno,
+                "logger": record.name,
+                "thread": record.threadName,
+                # QueueHandler has already folded any traceback into the message
+                "message": record.getMessage(),
+            }
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self.__cond:
+            self.__seq += 1
+            entry["seq"] = self.__seq
+            self.__records.append(entry)
+            self.__cond.notify_all()
+
+
+    def tail(self, since : int = 0, level : int = logging.NOTSET, contains : str | None = None,
+             name : str | None = None, limit : int = 200) -> list:
+        """
+        Most recent matching records, oldest first
+
+        Args:
+            since (int): Only records with a sequence number above this
+            level (int): Minimum level
+            contains (str | None): Case-insensitive substring of the message
+            name (str | None): Logger name prefix
+            limit (int): Maximum number of records returned
+
+        Returns:
+            list: Record dicts
+        """
+        needle = contains.lower() if contains else None
+        with self.__cond:
+            records = list(self.__records)
+
+        out = []
+        for entry in reversed(records):
+            if entry["seq"] <= since or len(out) >= limit:
+                break
+            if entry["levelno"] < level:
+                continue
+            if name and not entry["logger"].startswith(name):
+                continue
+            if needle and needle not in entry["message"].lower():
+                continue
+            out.append(entry)
+        out.reverse()
+        return out
+
+
+    def wait(self, since : int, timeout : float) -> int:
+        """
+        Block until a record newer than `since` arrives or `timeout` expires
+
+        Returns:
+            int: Latest sequence number
+        """
+        deadline = time.monotonic() + timeout
+        with self.__cond:
+            while self.__seq <= since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.__cond.wait(remaining)
+            return self.__seq
+
+
+def start_logging(path : str, ring : LogRing, max_bytes : int = 1024 * 1024, backup_count : int = 3,
+                  queue_size : int = 10000, level : int = logging.INFO) -> QueueListener:
+    """
+    Route the root logger through a queue to a rotating file, the console and `ring`
+
+    Callers only pay for a queue put; formatting and disk writes happen on the
+    listener thread.
+
+    Returns:
+        QueueListener: Running listener (stopped automatically at exit)
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+
+    # File handler (size-based rotation so /var/log never fills up)
+    try:
+        file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    except OSError as e:
+        print(f"Cannot open log file {path}: {e}")
+
+    # Console (stdout) handler
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    handlers.append(console_handler)
+
+    handlers.append(ring)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    return listener
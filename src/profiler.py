@@ -0,0 +1,209 @@
+from threading import Lock
+from collections import Counter
+import functools
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Nothing in this module is wired into the server unless profiling is enabled.
+PROFILING_ENABLED = os.environ.get("RC_CAR_PROFILING", "0").strip().lower() in ("1", "true", "yes", "on")
+
+MAX_PROFILE_SECONDS = 60.0
+
+
+def sample_stacks(seconds : float, interval : float = 0.005) -> tuple:
+    """
+    Statistical profile of every Python thread
+
+    Snapshots all thread stacks every `interval` seconds via sys._current_frames(),
+    so it costs nothing when not running and needs no tracing hooks.
+
+    Args:
+        seconds (float): How long to sample
+        interval (float): Delay between snapshots
+
+    Returns:
+        tuple: (Counter of collapsed stack -> samples, number of snapshots taken)
+    """
+    me = threading.get_ident()
+    stacks : Counter = Counter()
+    snapshots = 0
+    deadline = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            parts.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(parts))] += 1
+        snapshots += 1
+        time.sleep(interval)
+
+    return stacks, snapshots
+
+
+def collapsed(stacks : Counter) -> str:
+    """Brendan Gregg collapsed-stack format, ready for flamegraph.pl / speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def top_functions(stacks : Counter, snapshots : int, limit : int = 50) -> list:
+    """
+    pstats-style summary: self and cumulative sample share per function
+
+    Returns:
+        list: Dicts sorted by self samples
+    """
+    self_counts : Counter = Counter()
+    total_counts : Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        self_counts[frames[-1]] += count
+        for func in set(frames):
+            total_counts[func] += count
+
+    scale = 100.0 / snapshots if snapshots else 0.0
+    return [
+        {
+            "function": func,
+            "self_samples": self_counts[func],
+            "total_samples": total_counts[func],
+            "self_pct": round(self_counts[func] * scale, 2),
+            "total_pct": round(total_counts[func] * scale, 2),
+        }
+        for func, _ in self_counts.most_common(limit)
+    ]
+
+
+def thread_dump(name_filter : str | None = None) -> list:
+    """
+    Name, state and current stack of every live thread
+
+    Args:
+        name_filter (str | None): Only threads whose name contains this
+
+    Returns:
+        list: Dicts with name, ident, daemon, stack
+    """
+    frames = sys._current_frames()
+    out = []
+    for t in threading.enumerate():
+        if name_filter and name_filter not in t.name:
+            continue
+        frame = frames.get(t.ident)
+        out.append({
+            "name": t.name,
+            "ident": t.ident,
+            "daemon": t.daemon,
+            "stack": traceback.format_stack(frame) if frame is not None else [],
+        })
+    return out
+
+
+class RouteTimer:
+    """
+    Per-route wall time, split into time spent blocked in subprocess calls.
+
+    `install_subprocess_hooks` wraps Popen creation, wait() and communicate()
+    so fork/exec plus the wait for nmcli & co. are charged to the request that
+    caused them, also when it hands the work to a pool wrapped with `bind`.
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__local = threading.local()
+        self.__routes : dict = {}
+
+
+    def begin(self) -> None:
+        self.__local.acct = {"start": time.perf_counter(), "subprocess_s": 0.0, "subprocess_calls": 0}
+
+
+    def bind(self, fn):
+        """Wrap `fn` so subprocess calls it makes on another thread count towards the current request."""
+        acct = getattr(self.__local, "acct", None)
+        if acct is None:
+            return fn
+        local = self.__local
+
+        @functools.wraps(fn)
+        def bound(*args):
+            local.acct = acct
+            try:
+                return fn(*args)
+            finally:
+                local.acct = None
+        return bound
+
+
+    def end(self, route : str) -> None:
+        acct = getattr(self.__local, "acct", None)
+        if acct is None:
+            return
+        wall = time.perf_counter() - acct["start"]
+        self.__local.acct = None
+
+        with self.__lock:
+            st = self.__routes.setdefault(route, {
+                "count": 0, "total_s": 0.0, "max_s": 0.0, "subprocess_s": 0.0, "subprocess_calls": 0,
+            })
+            st["count"] += 1
+            st["total_s"] += wall
+            st["max_s"] = max(st["max_s"], wall)
+            st["subprocess_s"] += acct["subprocess_s"]
+            st["subprocess_calls"] += acct["subprocess_calls"]
+
+
+    def stats(self, reset : bool = False) -> dict:
+        with self.__lock:
+            out = {}
+            for route, st in self.__routes.items():
+                out[route] = {
+                    **st,
+                    "mean_s": st["total_s"] / st["count"] if st["count"] else 0.0,
+                    "subprocess_pct": 100.0 * st["subprocess_s"] / st["total_s"] if st["total_s"] else 0.0,
+                }
+            if reset:
+                self.__routes = {}
+            return out
+
+
+    def install_subprocess_hooks(self) -> None:
+        local = self.__local
+
+        def timed(func, counts_call):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                depth = getattr(local, "depth", 0)
+                acct = getattr(local, "acct", None)
+                if depth or acct is None:
+                    return func(*args, **kwargs)
+                local.depth = 1
+                t0 = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    local.depth = 0
+                    acct["subprocess_s"] += time.perf_counter() - t0
+                    if counts_call:
+                        acct["subprocess_calls"] += 1
+            return wrapper
+
+        subprocess.Popen.__init__ = timed(subprocess.Popen.__init__, True)
+        subprocess.Popen.wait = timed(subprocess.Popen.wait, False)
+        subprocess.Popen.communicate = timed(subprocess.Popen.communicate, False)
+        logger.info("Subprocess timing hooks installed")
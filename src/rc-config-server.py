@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Request, render_template, request, jsonify
 from flask_sock import Sock
 import subprocess
 import sys
@@ -11,21 +11,40 @@ import uuid
 import threading
 import logging
 import json
+import math
+from collections import deque
 
-try:
-    import debugpy
-    debugpy.listen(("0.0.0.0", 5678))
-    logging.getLogger().info("debugpy listening on port 5678")
-except ImportError:
-    pass
+# Remote debugger is opt-in: an always-open listener costs CPU and exposes the process
+if os.environ.get("RC_CAR_DEBUGPY", "0").strip().lower() in ("1", "true", "yes", "on"):
+    try:
+        import debugpy
+        debugpy.listen(("0.0.0.0", int(os.environ.get("RC_CAR_DEBUGPY_PORT", "5678"))))
+        logging.getLogger().info("debugpy listening on port %s", os.environ.get("RC_CAR_DEBUGPY_PORT", "5678"))
+    except ImportError:
+        pass
 
-from connection_manager import UpdatePipe, TcpClient
+from connection_manager import UpdatePipe, UpdateStream, TcpClient
+from event_hub import EventHub
+from telemetry import SystemSampler, parse_window
+from log_pipeline import LogRing, start_logging
+from terminal_session import TerminalSession
+from wifi_backend import make_backend, WifiBackendError
+from artifact_store import ArtifactStore, ArtifactStoreFull
+from cli_rpc import CliPool, CliUnavailable, CliTimeout
+from link_quality import LinkQualitySampler
+from executors import BoundedExecutor, BoundedWSGIServer, Saturated
+import profiler
 import time
 
 
 WEB_UI_VERSION = "1.00.0005"
 
 WEB_PORT = int(os.environ.get("RC_CAR_WEB_PORT", "5000"))
+# The UI binds to this interface only; RC_CAR_BIND_HOST overrides it (e.g. 127.0.0.1 for local test fleets)
+BIND_INTERFACE = os.environ.get("RC_CAR_BIND_INTERFACE", "enP8p1s0")
+BIND_HOST = os.environ.get("RC_CAR_BIND_HOST", "")
+# Reboot once an update finishes; disabled when running several fake cars on one workstation
+REBOOT_AFTER_UPDATE = os.environ.get("RC_CAR_REBOOT_AFTER_UPDATE", "1").strip().lower() not in ("0", "false", "no", "off")
 CLI_PORT = int(os.environ.get("RC_CAR_CLI_PORT", "8001"))
 
 # Persistent Wi-Fi credentials/state storage (survives swupdate via /data)
@@ -40,11 +59,38 @@ WIFI_STATE_PATH = os.environ.get(
 LEGACY_WIFI_STATE_PATH = "/var/lib/rc-car-webserver/wifi.json"
 
 
+# Logging: queued, rotated on disk, and a bounded in-memory tail for /api/logs
+LOG_PATH = os.environ.get("RC_CAR_LOG_PATH", "/var/log/rc-car-webserver.log")
+LOG_MAX_BYTES = int(os.environ.get("RC_CAR_LOG_MAX_BYTES", str(1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get("RC_CAR_LOG_BACKUP_COUNT", "3"))
+log_ring = LogRing(int(os.environ.get("RC_CAR_LOG_RING_SIZE", "2000")))
+
+
 # Defines
-UPLOAD_DIR = "/home/images"
+UPLOAD_DIR = os.environ.get("RC_CAR_UPLOAD_DIR", "/home/images")
 updater = UpdatePipe(web_port=WEB_PORT)
 tcp_client = TcpClient(port=CLI_PORT, host="127.0.0.1", timeout=5)
 
+# Persistent CLI connections for /api/cli/exec (separate from the xterm bridge's)
+cli_pool = CliPool("127.0.0.1", CLI_PORT, size=int(os.environ.get("RC_CAR_CLI_POOL_SIZE", "2")))
+CLI_TIMEOUT_S = float(os.environ.get("RC_CAR_CLI_TIMEOUT_S", "5.0"))
+CLI_MAX_BATCH = int(os.environ.get("RC_CAR_CLI_MAX_BATCH", "50"))
+
+# Bounded worker pools: a full pool answers 503 instead of starting yet another thread.
+# nmcli / D-Bus calls made on behalf of requests and dashboards
+subprocess_pool = BoundedExecutor("subprocess",
+                                  workers=int(os.environ.get("RC_CAR_EXEC_SUBPROCESS_WORKERS", "2")),
+                                  queue=int(os.environ.get("RC_CAR_EXEC_SUBPROCESS_QUEUE", "8")))
+# Long-running background jobs: update pollers, Wi-Fi restore
+job_pool = BoundedExecutor("jobs",
+                           workers=int(os.environ.get("RC_CAR_EXEC_JOB_WORKERS", "4")),
+                           queue=int(os.environ.get("RC_CAR_EXEC_JOB_QUEUE", "4")))
+# Reader loops of open WebSockets (two per terminal, one per dashboard); they never queue
+session_pool = BoundedExecutor("session", workers=int(os.environ.get("RC_CAR_EXEC_SESSION_WORKERS", "24")))
+# Open HTTP connections, WebSockets and SSE streams included
+HTTP_MAX_CONNECTIONS = int(os.environ.get("RC_CAR_HTTP_MAX_CONNECTIONS", "64"))
+http_server = None
+
 status_lock  = threading.Lock()
 thread_can_run : bool = False
 progress : float = 0.0
@@ -53,14 +99,83 @@ save_path : str = ""
 
 # Per-job state storage: map job_id -> state dict
 job_states: dict = {}
-# Per-job stop events and threads
+# Per-job stop events and poller futures
 job_events: dict = {}
-job_threads: dict = {}
+job_futures: dict = {}
+# Finished jobs' event topics, oldest first: (monotonic time, topic)
+finished_job_topics: deque = deque()
+# Live terminal bridges: map session id -> TerminalSession
+terminal_sessions: dict = {}
+# Streamed-install jobs waiting for their image: map job_id -> {"port", "size", "filename"}
+stream_jobs: dict = {}
+
+# Uploaded images, content-addressed by SHA-256 with LRU eviction
+artifacts = ArtifactStore(
+    UPLOAD_DIR,
+    max_bytes=int(os.environ.get("RC_CAR_ARTIFACT_MAX_BYTES", str(2 * 1024 ** 3))),
+    min_free_bytes=int(os.environ.get("RC_CAR_ARTIFACT_MIN_FREE_BYTES", str(256 * 1024 ** 2))),
+)
+
+
+class UploadRequest(Request):
+    """Streams .swu upload file parts straight into the artifact store (hashed on the way) instead of /tmp."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.path != "/api/swu/upload":
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        ingest = artifacts.begin(os.path.basename(filename or ""))
+        self.__dict__.setdefault("ingests", []).append(ingest)
+        return ingest
+
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 sock = Sock(app)
 
+# Dashboard state fan-out for /ws/events (topics: "wifi", "wifi/link", "system", "swu/<job_id>")
+events = EventHub()
+WIFI_EVENT_INTERVAL_S = float(os.environ.get("RC_CAR_WIFI_EVENT_INTERVAL_S", "3.0"))
+# Safety-net refresh when the backend pushes NetworkManager changes itself
+WIFI_EVENT_RESYNC_S = float(os.environ.get("RC_CAR_WIFI_EVENT_RESYNC_S", "60.0"))
+
+# NetworkManager access: D-Bus when available, nmcli otherwise (RC_CAR_WIFI_BACKEND)
+wifi = make_backend()
+wifi_changed = threading.Event()
+wifi.on_change(wifi_changed.set)
+
+# Signal / bitrate history per BSSID, optional roaming to a stronger saved network.
+# On nmcli every sample is a fork/exec of `nmcli dev wifi list`, so sample far less often there;
+# nmcli only knows the AP's advertised rate, so there is no bitrate threshold either.
+link_quality = LinkQualitySampler(
+    wifi,
+    interval=float(os.environ.get("RC_CAR_WIFI_LINK_INTERVAL_S", "2.0" if wifi.pushes_changes else "30.0")),
+    history=int(os.environ.get("RC_CAR_WIFI_LINK_HISTORY", "900")),
+    min_signal=int(os.environ.get("RC_CAR_WIFI_MIN_SIGNAL", "40")),
+    min_bitrate_mbps=float(os.environ.get("RC_CAR_WIFI_MIN_BITRATE_MBPS", "12")) if wifi.reports_bitrate else None,
+    roam=os.environ.get("RC_CAR_WIFI_ROAM", "0").strip().lower() in ("1", "true", "yes", "on"),
+    roam_margin=int(os.environ.get("RC_CAR_WIFI_ROAM_MARGIN", "15")),
+    roam_min_dwell_s=float(os.environ.get("RC_CAR_WIFI_ROAM_MIN_DWELL_S", "60")),
+    roam_scan_interval_s=float(os.environ.get("RC_CAR_WIFI_ROAM_SCAN_INTERVAL_S", "30")),
+    # Without the timestamp, a steady link produces no event traffic
+    on_sample=lambda latest: events.publish("wifi/link", {k: v for k, v in latest.items() if k != "t"}),
+    on_roam=lambda roam: wifi_changed.set(),
+    call=subprocess_pool.call,
+)
+
+# On-device telemetry (CPU, memory, temperature, disk, network) with downsampled history
+telemetry = SystemSampler(
+    interval=float(os.environ.get("RC_CAR_TELEMETRY_INTERVAL_S", "1.0")),
+    disks=[d for d in os.environ.get("RC_CAR_TELEMETRY_DISKS", f"/data,{UPLOAD_DIR}").split(",") if d],
+    on_sample=lambda latest: events.publish("system/metrics", latest),
+)
+
+UPDATE_FAILED = 2
 UPDATE_FINISHED = 3
+# How often a job poller asks the updater for progress, and when it gives up on a job
+SWU_POLL_INTERVAL_S = float(os.environ.get("RC_CAR_SWU_POLL_INTERVAL_S", "0.1"))
+SWU_JOB_TIMEOUT_S = float(os.environ.get("RC_CAR_SWU_JOB_TIMEOUT_S", "3600"))
+# A finished job's topic is still replayed for a while: the UI subscribes only once its request returned
+SWU_JOB_TOPIC_RETENTION_S = 60.0
 
 
 def _load_wifi_state() -> dict:
@@ -138,26 +253,8 @@ def _snapshot_wifi_credentials() -> dict:
     password = None
 
     if connection:
-        try:
-            out = subprocess.check_output(
-                [
-                    "nmcli",
-                    "--show-secrets",
-                    "-g",
-                    "802-11-wireless.ssid,802-11-wireless-security.psk",
-                    "con",
-                    "show",
-                    connection,
-                ],
-                text=True,
-            )
-            lines = [ln.strip() for ln in out.splitlines() if ln.strip() != ""]
-            if lines:
-                ssid = lines[0] or ssid
-            if len(lines) >= 2:
-                password = lines[1] or None
-        except Exception:
-            pass
+        secret_ssid, password = wifi.get_secrets(connection)
+        ssid = secret_ssid or ssid
 
     return {
         "format_version": 1,
@@ -206,26 +303,6 @@ def _load_wifi_credentials() -> dict:
         return {}
 
 
-def _get_wifi_device() -> str | None:
-    try:
-        out = subprocess.check_output(
-            ["nmcli", "-t", "-f", "DEVICE,TYPE,STATE,CONNECTION", "dev", "status"],
-            text=True,
-        )
-        for line in out.splitlines():
-            if not line:
-                continue
-            parts = _split_nmcli_t_line(line)
-            if len(parts) < 2:
-                continue
-            device, dev_type = parts[0], parts[1]
-            if dev_type == "wifi":
-                return device or None
-    except Exception:
-        return None
-    return None
-
-
 def _restore_wifi_if_needed() -> bool:
     """
     If not currently connected, try to restore Wi-Fi using persisted /data credentials.
@@ -241,58 +318,31 @@ def _restore_wifi_if_needed() -> bool:
     ssid = creds.get("ssid") or saved.get("ssid")
     password = creds.get("password")
     connection = creds.get("connection")
-    device = creds.get("device") or _get_wifi_device()
+    device = creds.get("device") or wifi.get_device()
 
     if not ssid:
         return False
 
-    subprocess.run(["nmcli", "radio", "wifi", "on"], check=False)
+    wifi.radio_on()
 
     # First try bringing up an existing connection profile (fast path).
     if connection:
-        cmd = ["nmcli", "con", "up", "id", str(connection)]
-        if device:
-            cmd += ["ifname", str(device)]
-        res = subprocess.run(cmd, check=False, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if res.returncode == 0:
+        try:
+            wifi.activate_connection(connection, device)
             time.sleep(1.0)
             return bool(_get_wifi_status().get("connected"))
-        logging.warning(
-            "Wi-Fi restore: failed to bring up connection '%s' (rc=%s): %s",
-            connection,
-            res.returncode,
-            (res.stderr or res.stdout or "").strip(),
-        )
+        except WifiBackendError as e:
+            logging.warning("Wi-Fi restore: failed to bring up connection '%s': %s", connection, e)
 
     # Otherwise connect by SSID (will create/refresh a connection profile).
-    cmd = ["nmcli", "dev", "wifi", "connect", str(ssid)]
-    if password:
-        cmd += ["password", str(password)]
-    if device:
-        cmd += ["ifname", str(device)]
-    res = subprocess.run(cmd, check=False, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if res.returncode != 0:
-        logging.warning(
-            "Wi-Fi restore: nmcli connect failed for ssid '%s' (rc=%s): %s",
-            ssid,
-            res.returncode,
-            (res.stderr or res.stdout or "").strip(),
-        )
+    try:
+        wifi.connect(ssid, password, device)
+    except WifiBackendError as e:
+        logging.warning("Wi-Fi restore: connect failed for ssid '%s': %s", ssid, e)
         return False
 
     # Make sure active connection autoconnects
-    try:
-        active_cons = subprocess.check_output(
-            ["nmcli", "-t", "--separator", "\t", "-f", "NAME,TYPE", "con", "show", "--active"],
-            text=True,
-        )
-        for line in active_cons.splitlines():
-            parts = line.split("\t")
-            if len(parts) >= 2 and parts[1] == "802-11-wireless":
-                subprocess.run(["nmcli", "con", "modify", parts[0], "connection.autoconnect", "yes"], check=False)
-                break
-    except Exception:
-        pass
+    wifi.ensure_autoconnect()
 
     _save_wifi_state({"ssid": ssid, "updated": time.time()})
     _persist_wifi_credentials_snapshot(source="restore_wifi_if_needed")
@@ -323,34 +373,6 @@ def _wifi_restore_worker() -> None:
         delay_s = min(max_delay_s, delay_s * 1.5)
 
 
-def _get_ipv4_for_device(device: str) -> str | None:
-    if not device:
-        return None
-    try:
-        out = subprocess.check_output(
-            ["ip", "-4", "-o", "addr", "show", "dev", device],
-            text=True,
-            stderr=subprocess.DEVNULL,
-        )
-        # Example: "3: wlan0    inet 192.168.1.20/24 brd ..."
-        for line in out.splitlines():
-            parts = line.split()
-            if "inet" in parts:
-                idx = parts.index("inet")
-                if idx + 1 < len(parts):
-                    return parts[idx + 1].split("/", 1)[0]
-    except Exception:
-        return None
-    return None
-
-
-def _split_nmcli_t_line(line: str) -> list[str]:
-    """Split an nmcli -t line that may use ':' (default) or a custom separator."""
-    if "\t" in line:
-        return line.split("\t")
-    return line.split(":")
-
-
 def _get_wifi_status() -> dict:
     saved = _load_wifi_state()
     status = {
@@ -362,68 +384,59 @@ def _get_wifi_status() -> dict:
         "saved_ssid": saved.get("ssid"),
         "saved_updated": saved.get("updated"),
     }
+    status.update(wifi.get_status())
+
+    # Last sampled link quality; no extra backend round trip
+    link = link_quality.latest
+    if status.get("connected") and link.get("connected"):
+        status.update({k: link.get(k) for k in ("bssid", "signal", "bitrate_mbps", "frequency_mhz")})
+    return status
 
+
+def _publish_job(job_id: str) -> None:
+    """Push a job's state to /ws/events subscribers. Caller holds `status_lock`."""
+    events.publish(f"swu/{job_id}", job_states[job_id])
+
+
+def _retire_job_topic(job_id: str) -> None:
+    """
+    Mark a job's topic finished, and drop topics that finished more than
+    SWU_JOB_TOPIC_RETENTION_S ago so `swu/*` subscribers are not replayed every
+    job since boot. Later watchers can still read /api/swu/progress/<job_id>.
+    """
+    now = time.monotonic()
+    with status_lock:
+        finished_job_topics.append((now, f"swu/{job_id}"))
+        while finished_job_topics and now - finished_job_topics[0][0] > SWU_JOB_TOPIC_RETENTION_S:
+            events.discard(finished_job_topics.popleft()[1])
+
+
+def _publish_wifi_status() -> None:
     try:
-        # First: determine whether any Wi-Fi device is connected.
-        dev_status = subprocess.check_output(
-            ["nmcli", "-t", "-f", "DEVICE,TYPE,STATE,CONNECTION", "dev", "status"],
-            text=True,
-        )
-        wifi_device = None
-        wifi_connection = None
-        for line in dev_status.splitlines():
-            if not line:
-                continue
-            parts = _split_nmcli_t_line(line)
-            if len(parts) < 4:
-                continue
-            device, dev_type, state, connection = parts[0], parts[1], parts[2], parts[3]
-            if dev_type == "wifi" and state == "connected":
-                wifi_device = device or None
-                wifi_connection = connection or None
-                break
+        events.publish("wifi", _get_wifi_status())
+    except Exception:
+        logging.exception("Failed to refresh Wi-Fi status for event subscribers")
 
-        if wifi_device:
-            status["connected"] = True
-            status["device"] = wifi_device
-            status["connection"] = wifi_connection
-            status["ip"] = _get_ipv4_for_device(wifi_device)
 
-            # Second: best-effort SSID lookup.
+def _wifi_event_worker() -> None:
+    """
+    Keep the "wifi" topic fresh while at least one dashboard is watching it.
+
+    Backends that push NetworkManager changes wake this up via `wifi_changed`;
+    otherwise it falls back to polling every WIFI_EVENT_INTERVAL_S.
+    """
+    interval = WIFI_EVENT_RESYNC_S if wifi.pushes_changes else WIFI_EVENT_INTERVAL_S
+    while True:
+        if events.has_subscribers("wifi"):
             try:
-                wifi_list = subprocess.check_output(
-                    ["nmcli", "-t", "-f", "ACTIVE,SSID,DEVICE", "dev", "wifi", "list"],
-                    text=True,
-                )
-                for wline in wifi_list.splitlines():
-                    if not wline:
-                        continue
-                    wparts = _split_nmcli_t_line(wline)
-                    if len(wparts) < 3:
-                        continue
-                    active, ssid, device = wparts[0], wparts[1], wparts[2]
-                    if active.strip().lower() == "yes" and (not device or device == wifi_device):
-                        status["ssid"] = ssid or None
-                        break
-            except Exception:
+                subprocess_pool.call(_publish_wifi_status)
+            except Saturated:
+                # Requests are already keeping the backend busy; try again next round
                 pass
-
-            # Third: if SSID is still unknown, try reading from the active connection.
-            if not status.get("ssid") and wifi_connection:
-                try:
-                    ssid_val = subprocess.check_output(
-                        ["nmcli", "-g", "802-11-wireless.ssid", "con", "show", wifi_connection],
-                        text=True,
-                    ).strip()
-                    status["ssid"] = ssid_val or None
-                except Exception:
-                    pass
-    except FileNotFoundError:
-        status["error"] = "nmcli not found"
-    except Exception as e:
-        status["error"] = str(e)
-
-    return status
+        if wifi_changed.wait(interval):
+            # NetworkManager emits signals in bursts; coalesce them into one refresh
+            time.sleep(0.2)
+            wifi_changed.clear()
 
 
 def poll(job_id: str, stop_event: threading.Event, interval: float = 0.5) -> None:
@@ -431,14 +444,26 @@ def poll(job_id: str, stop_event: threading.Event, interval: float = 0.5) -> Non
     Monitor the updater for a specific job_id. Writes the latest message and progress
     into `job_states[job_id]` so HTTP endpoints or SSE streams can read it.
 
-    This function returns when the update finishes or when `stop_event` is set.
+    This function returns when the update finishes or fails, when `stop_event` is set
+    (the job was aborted), or after SWU_JOB_TIMEOUT_S. Only a finished update reboots.
     """
     logging.info("Starting status request thread for job %s", job_id)
 
+    deadline = time.monotonic() + SWU_JOB_TIMEOUT_S
+    update_state = None
     try:
         while not stop_event.is_set():
-            # read_state is expected to return (state, msg) where state may be None or a code
-            update_state, msg = updater.read_state()
+            if time.monotonic() > deadline:
+                with status_lock:
+                    job_states[job_id]["msg"] = "timed out waiting for the updater"
+                break
+
+            # read_state returns (state, msg), or None while the updater cannot be reached
+            reply = updater.read_state()
+            if reply is None:
+                stop_event.wait(max(interval, 1.0))
+                continue
+            update_state, msg = reply
 
             with status_lock:
                 st = job_states.get(job_id, {})
@@ -451,8 +476,9 @@ def poll(job_id: str, stop_event: threading.Event, interval: float = 0.5) -> Non
                 st['done'] = (update_state == UPDATE_FINISHED)
                 st['updated'] = time.time()
                 job_states[job_id] = st
+                _publish_job(job_id)
 
-            if update_state is not None and update_state == UPDATE_FINISHED:
+            if update_state in (UPDATE_FINISHED, UPDATE_FAILED):
                 break
 
             # wait with ability to wake early
@@ -461,15 +487,25 @@ def poll(job_id: str, stop_event: threading.Event, interval: float = 0.5) -> Non
     except Exception:
         logging.exception("Error while polling updater for job %s", job_id)
     finally:
-        # final state: if not present, ensure it's there
+        # final state: whatever ended the poll, the job is over
+        finished = update_state == UPDATE_FINISHED
         with status_lock:
             st = job_states.get(job_id, {})
-            st.setdefault('done', True)
-            st.setdefault('msg', st.get('msg', 'finished'))
+            st['done'] = True
+            st['failed'] = not finished
+            st.setdefault('msg', 'finished')
             st['updated'] = time.time()
             job_states[job_id] = st
-
-        logging.info("Update finished for job %s", job_id)
+            _publish_job(job_id)
+        _retire_job_topic(job_id)
+        job_events.pop(job_id, None)
+        job_futures.pop(job_id, None)
+
+        logging.info("Update %s for job %s", "finished" if finished else "ended without finishing", job_id)
+        if st.get("artifact"):
+            artifacts.unpin(st["artifact"])
+        if not finished or not REBOOT_AFTER_UPDATE:
+            return
         # Optional: reboot if desired
         try:
             logging.info("Rebooting in 5 seconds... ")
@@ -480,8 +516,7 @@ def poll(job_id: str, stop_event: threading.Event, interval: float = 0.5) -> Non
             logging.exception("Failed to reboot after update")
 
 
-@app.route("/")
-def index():
+def _get_image_version() -> str:
     version : str = "0.00.0000"
 
     # Open version file
@@ -493,34 +528,29 @@ def index():
     except FileNotFoundError:
         pass
 
+    return version
+
+
+@app.errorhandler(Saturated)
+def _saturated(e):
+    """A bounded pool refused the work: tell the client to come back instead of queueing it."""
+    resp = jsonify({"ok": False, "error": str(e)})
+    resp.headers["Retry-After"] = str(e.retry_after)
+    return resp, 503
+
+
+@app.route("/")
+def index():
     # will look for templates/index.html
-    return render_template("index.html", version=version, webui_version=WEB_UI_VERSION)
+    return render_template("index.html", version=_get_image_version(), webui_version=WEB_UI_VERSION)
 
 
 # keep your existing frontend endpoints; implement later:
 @app.get("/api/wifi/scan")
 def wifi_scan():
     try:
-        # Ask NetworkManager to scan + list
-        subprocess.run(["nmcli", "dev", "wifi", "rescan"], check=False)
-
-        # Parse list as lines of SSIDs
-        result = subprocess.check_output(
-            ["nmcli", "-t", "-f", "SSID,SIGNAL,SECURITY", "dev", "wifi", "list"],
-            text=True
-        )
-        networks = []
-        for line in result.strip().splitlines():
-            if not line:
-                continue
-            ssid, signal, security = (line.split(":", 2) + ["", "", ""])[:3]
-            networks.append({
-                "ssid": ssid,
-                "signal": int(signal) if signal.isdigit() else 0,
-                "security": security or "OPEN"
-            })
-        return jsonify(networks), 200
-    except subprocess.CalledProcessError as e:
+        return jsonify(subprocess_pool.call(wifi.scan)), 200
+    except WifiBackendError as e:
         return jsonify({"error": str(e)}), 500
 
 
@@ -534,142 +564,346 @@ def wifi_connect():
         return jsonify({"ok": False, "error": "Missing SSID"}), 400
 
     try:
-        # Ensure Wi-Fi radio is enabled
-        subprocess.run(["nmcli", "radio", "wifi", "on"], check=False)
+        status = subprocess_pool.call(_connect_wifi, ssid, password)
+    except WifiBackendError as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
 
-        if password:
-            cmd = ["nmcli", "dev", "wifi", "connect", ssid, "password", password]
-        else:
-            cmd = ["nmcli", "dev", "wifi", "connect", ssid]
-        subprocess.check_call(cmd)
+    events.publish("wifi", status)
+    return jsonify({"ok": True, **status}), 200
 
-        # Make sure the created/used connection is set to autoconnect
-        try:
-            active_cons = subprocess.check_output(
-                ["nmcli", "-t", "--separator", "\t", "-f", "NAME,TYPE", "con", "show", "--active"],
-                text=True,
-            )
-            wifi_con_name = None
-            for line in active_cons.splitlines():
-                parts = line.split("\t")
-                if len(parts) >= 2 and parts[1] == "802-11-wireless":
-                    wifi_con_name = parts[0]
-                    break
-            if wifi_con_name:
-                subprocess.run(["nmcli", "con", "modify", wifi_con_name, "connection.autoconnect", "yes"], check=False)
-        except Exception:
-            pass
 
-        # Persist Wi-Fi info to /data so it survives software updates.
-        _save_wifi_state({"ssid": ssid, "updated": time.time()})
-        _persist_wifi_credentials(ssid=ssid, password=password, source="wifi_connect")
+def _connect_wifi(ssid : str, password : str | None) -> dict:
+    # Ensure Wi-Fi radio is enabled
+    wifi.radio_on()
+    wifi.connect(ssid, password)
 
-        status = _get_wifi_status()
-        return jsonify({"ok": True, **status}), 200
-    except subprocess.CalledProcessError as e:
-        return jsonify({"ok": False, "error": str(e)}), 500
+    # Make sure the created/used connection is set to autoconnect
+    wifi.ensure_autoconnect()
+
+    # Persist Wi-Fi info to /data so it survives software updates.
+    _save_wifi_state({"ssid": ssid, "updated": time.time()})
+    _persist_wifi_credentials(ssid=ssid, password=password, source="wifi_connect")
+
+    return _get_wifi_status()
 
 
 @app.get("/api/wifi/status")
 def wifi_status():
-    return jsonify({"ok": True, **_get_wifi_status()}), 200
+    status = subprocess_pool.call(_get_wifi_status)
+    events.publish("wifi", status)
+    return jsonify({"ok": True, **status}), 200
 
 
-def _is_safe_dir(path, base):
-    # make sure 'path' stays within 'base'
-    return os.path.commonpath([os.path.realpath(path), os.path.realpath(base)]) == os.path.realpath(base)
+@app.get("/api/wifi/link")
+def wifi_link():
+    """Current link quality, time spent below the quality thresholds, and recent roams."""
+    return jsonify({"ok": True, **link_quality.stats()}), 200
+
+
+@app.get("/api/wifi/link/history")
+def wifi_link_history():
+    """Signal / bitrate / dBm / retry history per BSSID; `window` as for /api/system/metrics, optional `bssid`."""
+    try:
+        window_s = parse_window(request.args.get("window"))
+    except ValueError:
+        return jsonify({"ok": False, "error": "Invalid window"}), 400
+
+    return jsonify({"ok": True, "bssids": link_quality.history(window_s, request.args.get("bssid"))}), 200
 
 
 @app.post("/api/swu/upload")
 def swu_upload():
-    if "file" not in request.files:
-        return jsonify({"ok": False, "error": "No file part"}), 400
-    
-    save_path = ""
+    """
+    Store an uploaded .swu in the artifact store. The file part is hashed while it
+    streams in; uploading an image the car already has just refreshes it.
+    """
+    try:
+        # Only a fit check: nothing is evicted until the upload is accepted and known to be new
+        artifacts.check_fits(request.content_length or 0)
+    except ArtifactStoreFull as e:
+        return jsonify({"ok": False, "error": str(e)}), 507
 
-    # Clear current files in the dir
     try:
-        for filename in os.listdir(UPLOAD_DIR):
-            file_path = os.path.join(UPLOAD_DIR, filename)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-                print(f"Removed: {file_path}")
-    except OSError as e:
-        print(f"Error: {e}")
-
-    file = request.files["file"]
-    orig = (file.filename or "").strip()
-
-    if not orig.lower().endswith(".swu"):
-        return jsonify({"ok": False, "error": "Only .swu files are allowed"}), 400
+        if "file" not in request.files:
+            return jsonify({"ok": False, "error": "No file part"}), 400
 
-    import uuid, time
-    save_path = os.path.join(UPLOAD_DIR, file.filename)
+        file = request.files["file"]
+        orig = os.path.basename((file.filename or "").strip())
 
-    if not _is_safe_dir(save_path, UPLOAD_DIR):
-        return jsonify({"ok": False, "error": "Invalid path"}), 400
+        if not orig.lower().endswith(".swu"):
+            return jsonify({"ok": False, "error": "Only .swu files are allowed"}), 400
+
+        logging.info("File name: %s", orig)
+        try:
+            meta, existed = file.stream.commit()
+        except Exception as e:
+            return jsonify({"ok": False, "error": f"Failed to save file: {e}"}), 500
+    finally:
+        # Other file parts, rejected uploads and uploads cut short by the client
+        for ingest in getattr(request, "ingests", []):
+            if not ingest.closed:
+                ingest.abort()
+
+    logging.info("Stored artifact %s (%s bytes%s)", meta["digest"], meta["size"], ", already present" if existed else "")
+    return jsonify({
+        "ok": True,
+        "filename": orig,
+        "path": artifacts.path(meta["digest"]),
+        "digest": meta["digest"],
+        "size": meta["size"],
+        "deduplicated": existed,
+    }), 200
 
-    print("File name: ", file.filename)
-    try:
-        file.save(save_path)  # streamed to disk by Werkzeug
-    except Exception as e:
-        return jsonify({"ok": False, "error": f"Failed to save file: {e}"}), 500
 
-    return jsonify({"ok": True, "filename": file.filename, "path": save_path}), 200
+@app.get("/api/swu/artifacts")
+def swu_artifacts():
+    """Stored images, most recently used first, plus store usage."""
+    return jsonify({"ok": True, "artifacts": artifacts.list(), **artifacts.usage()}), 200
+
+
+@app.get("/api/swu/artifacts/<digest>")
+def swu_artifact(digest):
+    """
+    Look up an image by SHA-256. Also answers HEAD, so a client can check whether
+    the car already has an image before uploading it.
+    """
+    meta = artifacts.lookup(digest)
+    if meta is None:
+        return jsonify({"ok": False, "error": "unknown artifact"}), 404
+    resp = jsonify({"ok": True, **meta})
+    resp.headers["X-Artifact-Size"] = str(meta["size"])
+    return resp, 200
+
+
+@app.delete("/api/swu/artifacts/<digest>")
+def swu_artifact_delete(digest):
+    if artifacts.lookup(digest) is None:
+        return jsonify({"ok": False, "error": "unknown artifact"}), 404
+    if not artifacts.remove(digest.lower()):
+        return jsonify({"ok": False, "error": "artifact is being installed"}), 409
+    return jsonify({"ok": True}), 200
+
+
+def _start_job_poller(job_id: str) -> None:
+    """Callers check `job_pool.ensure_capacity()` before starting the update itself."""
+    stop_event = threading.Event()
+    job_events[job_id] = stop_event
+    job_futures[job_id] = job_pool.submit(poll, job_id, stop_event, SWU_POLL_INTERVAL_S, name=f"swu-poll-{job_id[:8]}")
+
+
+def _stop_job_poller(job_id: str) -> None:
+    """Stop an aborted job's poller and give it a moment to write its final state."""
+    stop_event, future = job_events.get(job_id), job_futures.get(job_id)
+    if stop_event is not None:
+        stop_event.set()
+    if future is not None:
+        try:
+            future.result(timeout=2.0)
+        except Exception:
+            pass
 
 
 @app.post("/api/swu/apply")
 def swu_apply():
     """
-    NO-OP stub: just validate inputs and return JSON.
-    Fill in your swupdate call here later.
+    Install a stored artifact ({"digest"}) or, for older clients, an uploaded
+    file inside UPLOAD_DIR ({"filename", "path"}).
     """
     data = request.get_json(silent=True) or {}
+    digest = (data.get("digest") or "").strip().lower()
     path = (data.get("path") or "").strip()
     filename = (data.get("filename") or "").strip()
 
-    if not path or not filename:
-        return jsonify({"ok": False, "error": "Missing filename/path"}), 400
-
-    # keep it safe: must be a file inside UPLOAD_DIR
-    real_upload = os.path.realpath(UPLOAD_DIR)
-    real_path = os.path.realpath(path)
-    if not real_path.startswith(real_upload + os.sep) or not os.path.isfile(real_path):
-        return jsonify({"ok": False, "error": "Invalid or missing file"}), 400
+    if digest:
+        meta = artifacts.lookup(digest)
+        if meta is None:
+            return jsonify({"ok": False, "error": "Unknown artifact"}), 404
+        real_path = artifacts.path(digest)
+        filename = meta["filename"]
+    else:
+        if not path or not filename:
+            return jsonify({"ok": False, "error": "Missing digest or filename/path"}), 400
+
+        # keep it safe: must be a file inside UPLOAD_DIR
+        real_upload = os.path.realpath(UPLOAD_DIR)
+        real_path = os.path.realpath(path)
+        if not real_path.startswith(real_upload + os.sep) or not os.path.isfile(real_path):
+            return jsonify({"ok": False, "error": "Invalid or missing file"}), 400
+
+        # Paths returned by older clients' uploads still point into the store
+        name = os.path.basename(real_path)
+        if name.endswith(".swu") and artifacts.lookup(name[:-4]):
+            digest = name[:-4]
+
+    # Refuse now rather than start an install that nothing would track
+    job_pool.ensure_capacity()
+
+    if digest:
+        # Keep the image out of eviction until the install is over
+        artifacts.pin(digest)
+        artifacts.touch(digest)
 
     # TODO: put your swupdate call here later
     # e.g., subprocess.Popen(["swupdate", "-i", real_path, "-e", "stable", "-v"])+
     
     # Ensure /data/wifi-credentials exists and snapshot Wi-Fi info before swupdate/reboot.
     # This is best-effort; update should still proceed even if snapshotting fails.
+    # It runs nmcli, so it goes through the subprocess pool like every other Wi-Fi call.
     try:
-        _persist_wifi_credentials_snapshot(source="swu_apply")
+        subprocess_pool.call(_persist_wifi_credentials_snapshot, "swu_apply")
+    except Saturated:
+        logging.warning("Skipped the Wi-Fi credentials snapshot: subprocess pool is busy")
     except Exception:
         pass
 
     # start the updater with the validated real path (not the module-level save_path)
-    ret: bool = updater.start_update(real_path)
-    msg = "apply started" if ret else "ERROR"
+    started = False
+    try:
+        started = updater.start_update(real_path)
+    finally:
+        # The poller unpins the image of an install that started; nothing else would for one that did not
+        if digest and not started:
+            artifacts.unpin(digest)
+    if not started:
+        # Nothing is installing, so there is no job to follow and no poller to hold a worker
+        return jsonify({"ok": False, "error": "Updater refused the install"}), 502
 
     # create a job id and start a per-job poller thread
     job_id = str(uuid.uuid4())
     with status_lock:
         job_states[job_id] = {"msg": "starting", "state": None, "done": False, "updated": time.time()}
+        if digest:
+            job_states[job_id]["artifact"] = digest
+        _publish_job(job_id)
 
-    stop_event = threading.Event()
-    job_events[job_id] = stop_event
-    t = threading.Thread(target=poll, args=(job_id, stop_event, 0.001), daemon=True)
-    job_threads[job_id] = t
-    t.start()
+    _start_job_poller(job_id)
 
     return jsonify({
         "ok": True,
-        "message": msg,
+        "message": "apply started",
         "job_id": job_id,
-        "received": {"filename": filename, "path": real_path}
+        "received": {"filename": filename, "path": real_path, "digest": digest or None}
     }), 200
 
 
+@app.post("/api/swu/stream")
+def swu_stream_start():
+    """
+    Begin a streamed install: the image bypasses UPLOAD_DIR and is piped straight
+    into the updater daemon. Returns a job id; the image body is then POSTed to
+    /api/swu/stream/<job_id> while progress is followed through the usual job endpoints.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = (data.get("filename") or "").strip()
+    try:
+        size = int(data.get("size") or 0)
+    except (TypeError, ValueError):
+        size = 0
+
+    if not filename.lower().endswith(".swu"):
+        return jsonify({"ok": False, "error": "Only .swu files are allowed"}), 400
+    if size <= 0:
+        return jsonify({"ok": False, "error": "Missing image size"}), 400
+
+    job_pool.ensure_capacity()
+
+    try:
+        subprocess_pool.call(_persist_wifi_credentials_snapshot, "swu_stream")
+    except Saturated:
+        logging.warning("Skipped the Wi-Fi credentials snapshot: subprocess pool is busy")
+    except Exception:
+        pass
+
+    data_port = updater.start_stream_update(size, filename)
+    if data_port is None:
+        return jsonify({"ok": False, "error": "Updater refused streamed install"}), 502
+
+    job_id = str(uuid.uuid4())
+    with status_lock:
+        job_states[job_id] = {
+            "msg": "waiting for image",
+            "state": None,
+            "done": False,
+            "received": 0,
+            "total": size,
+            "progress": 0,
+            "updated": time.time(),
+        }
+        stream_jobs[job_id] = {"port": data_port, "size": size, "filename": filename}
+        _publish_job(job_id)
+
+    return jsonify({"ok": True, "job_id": job_id}), 200
+
+
+@app.post("/api/swu/stream/<job_id>")
+def swu_stream_data(job_id):
+    """Forward the raw request body of a streamed install to the updater daemon."""
+    with status_lock:
+        job = stream_jobs.pop(job_id, None)
+    if job is None:
+        return jsonify({"ok": False, "error": "unknown job"}), 404
+
+    size = job["size"]
+    stream = UpdateStream(port=job["port"])
+    try:
+        job_pool.ensure_capacity()
+    except Saturated:
+        # Nothing could follow the install: give the daemon an empty image so it
+        # releases its data channel, and end the job before answering 503
+        if stream.open():
+            stream.close()
+        with status_lock:
+            job_states[job_id].update({"msg": "server busy, start the install again", "done": True,
+                                       "failed": True, "updated": time.time()})
+            _publish_job(job_id)
+        _retire_job_topic(job_id)
+        raise
+
+    if not stream.open():
+        with status_lock:
+            job_states[job_id].update({"msg": "failed to reach updater", "done": True, "failed": True,
+                                       "updated": time.time()})
+            _publish_job(job_id)
+        _retire_job_topic(job_id)
+        return jsonify({"ok": False, "error": "Failed to reach updater"}), 502
+
+    _start_job_poller(job_id)
+
+    error = None
+    try:
+        while stream.bytes_sent < size:
+            chunk = request.stream.read(min(UpdateStream.CHUNK_SIZE, size - stream.bytes_sent))
+            if not chunk:
+                error = "upload ended early"
+                break
+            if not stream.write(chunk):
+                error = "updater closed the stream"
+                break
+
+            with status_lock:
+                st = job_states[job_id]
+                st["received"] = stream.bytes_sent
+                st["progress"] = round(100 * stream.bytes_sent / size)
+                st["updated"] = time.time()
+                _publish_job(job_id)
+    except Exception as e:
+        logging.exception("Streamed install failed for job %s", job_id)
+        error = str(e)
+    finally:
+        stream.close()
+
+    logging.info("Streamed %s of %s bytes for job %s", stream.bytes_sent, size, job_id)
+    if error:
+        _stop_job_poller(job_id)
+        with status_lock:
+            job_states[job_id].update({"msg": f"stream aborted: {error}", "done": True, "failed": True,
+                                       "updated": time.time()})
+            _publish_job(job_id)
+        return jsonify({"ok": False, "error": error, "received": stream.bytes_sent}), 500
+
+    return jsonify({"ok": True, "job_id": job_id, "received": stream.bytes_sent}), 200
+
+
 def get_ip_address(ifname):
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     return socket.inet_ntoa(fcntl.ioctl(
@@ -717,12 +951,300 @@ def swu_progress_stream(job_id):
     return Response(stream_with_context(event_stream()), mimetype='text/event-stream')
 
 
+@app.get("/api/system/metrics")
+def system_metrics():
+    """Metric history; `window` is a duration such as 300, 10m, 1h or 24h (default 10m)."""
+    try:
+        window_s = parse_window(request.args.get("window"))
+    except ValueError:
+        return jsonify({"ok": False, "error": "Invalid window"}), 400
+
+    return jsonify({"ok": True, "latest": telemetry.latest, **telemetry.history(window_s)}), 200
+
+
+@app.get("/api/system/executors")
+def system_executors():
+    """Size, queue depth and admission counters of the worker pools and the HTTP server."""
+    return jsonify({
+        "ok": True,
+        "threads": threading.active_count(),
+        "pools": [pool.stats() for pool in (subprocess_pool, job_pool, session_pool)],
+        "http": http_server.stats() if http_server else None,
+    }), 200
+
+
+@app.get("/api/system/metrics/stream")
+def system_metrics_stream():
+    """SSE stream of live telemetry samples."""
+    from flask import Response, stream_with_context
+
+    def event_stream():
+        last_ts = 0
+        while True:
+            latest = telemetry.latest
+            if latest.get("t", 0) != last_ts:
+                last_ts = latest.get("t", 0)
+                yield f"data: {json.dumps(latest)}\n\n"
+
+            time.sleep(telemetry.interval / 2)
+
+    return Response(stream_with_context(event_stream()), mimetype='text/event-stream')
+
+
+@app.get("/api/logs")
+def logs_tail():
+    """
+    Filtered tail of recent log records from memory.
+
+    Query args: level (e.g. WARNING), contains, logger (name prefix), since (sequence
+    number), limit (default 200). With follow=1 the response is an SSE stream that
+    keeps delivering matching records as they are logged.
+    """
+    from flask import Response, stream_with_context
+
+    level_name = (request.args.get("level") or "NOTSET").upper()
+    level = logging.getLevelName(level_name)
+    if not isinstance(level, int):
+        return jsonify({"ok": False, "error": "Invalid level"}), 400
+
+    try:
+        since = int(request.args.get("since", "0"))
+        limit = max(1, min(int(request.args.get("limit", "200")), log_ring.capacity))
+    except ValueError:
+        return jsonify({"ok": False, "error": "Invalid since/limit"}), 400
+
+    filters = {
+        "level": level,
+        "contains": request.args.get("contains") or None,
+        "name": request.args.get("logger") or None,
+    }
+
+    if request.args.get("follow", "0") not in ("1", "true", "yes"):
+        return jsonify({"ok": True, "records": log_ring.tail(since=since, limit=limit, **filters)}), 200
+
+    def event_stream():
+        cursor = log_ring.wait(since, timeout=0)
+        records = log_ring.tail(since=since, limit=limit, **filters)
+        while True:
+            for entry in records:
+                yield f"data: {json.dumps(entry)}\n\n"
+            if records:
+                cursor = max(cursor, records[-1]["seq"])
+
+            latest = log_ring.wait(cursor, timeout=15.0)
+            if latest == cursor:
+                # Comment line keeps proxies happy and detects closed clients
+                yield ": keepalive\n\n"
+                records = []
+                continue
+            records = log_ring.tail(since=cursor, limit=log_ring.capacity, **filters)
+            cursor = latest
+
+    return Response(stream_with_context(event_stream()), mimetype='text/event-stream')
+
+
+if profiler.PROFILING_ENABLED:
+    # Only registered when RC_CAR_PROFILING=1; otherwise these routes 404 and cost nothing.
+    route_timer = profiler.RouteTimer()
+    route_timer.install_subprocess_hooks()
+    # nmcli runs on the subprocess pool now; keep charging it to the route that waits for it
+    subprocess_pool.wrap = route_timer.bind
+    profile_lock = threading.Lock()
+
+    @app.before_request
+    def _profile_begin():
+        route_timer.begin()
+
+    @app.teardown_request
+    def _profile_end(exc):
+        route_timer.end(f"{request.method} {request.url_rule.rule if request.url_rule else request.path}")
+
+    @app.get("/debug/profile")
+    def debug_profile():
+        """
+        Sample all threads for `seconds` (default 5, max 60). format=collapsed returns
+        flamegraph-ready text, format=top a pstats-style JSON summary.
+        """
+        from flask import Response
+
+        try:
+            seconds = float(request.args.get("seconds", "5"))
+            interval = float(request.args.get("interval", "0.005"))
+        except ValueError:
+            return jsonify({"ok": False, "error": "Invalid seconds/interval"}), 400
+        fmt = request.args.get("format", "collapsed")
+        if fmt not in ("collapsed", "top"):
+            return jsonify({"ok": False, "error": "format must be collapsed or top"}), 400
+
+        if not profile_lock.acquire(blocking=False):
+            return jsonify({"ok": False, "error": "A profile is already running"}), 409
+        try:
+            stacks, snapshots = profiler.sample_stacks(seconds, max(interval, 0.001))
+        finally:
+            profile_lock.release()
+
+        if fmt == "top":
+            return jsonify({"ok": True, "snapshots": snapshots, "functions": profiler.top_functions(stacks, snapshots)}), 200
+        return Response(profiler.collapsed(stacks), mimetype="text/plain")
+
+    @app.get("/debug/profile/routes")
+    def debug_profile_routes():
+        """Wall time per route, with the share spent blocked in subprocess. reset=1 clears."""
+        reset = request.args.get("reset", "0") in ("1", "true", "yes")
+        return jsonify({"ok": True, "routes": route_timer.stats(reset=reset)}), 200
+
+    @app.get("/debug/threads")
+    def debug_threads():
+        """Stack dump of live threads; name=swu-poll or name=terminal narrows it down."""
+        return jsonify({"ok": True, "threads": profiler.thread_dump(request.args.get("name") or None)}), 200
+
+
+@sock.route('/ws/events')
+def events_ws(ws):
+    """
+    Multiplexed dashboard event channel.
+
+    Client -> server: {"sub": [topics]} / {"unsub": [topics]}; a topic may be a
+    "prefix/*" pattern. Server -> client: a JSON array of messages, each either
+    {"t": topic, "s": full_state} or {"t": topic, "d": changed_keys, "x": removed_keys}.
+    """
+    sub = events.subscribe()
+
+    def _control_reader():
+        while not sub.closed:
+            try:
+                data = ws.receive()
+            except Exception:
+                break
+            if data is None:
+                break
+            try:
+                msg = json.loads(data)
+            except (TypeError, ValueError):
+                continue
+            for topic in msg.get("unsub") or []:
+                sub.remove(str(topic))
+            for topic in msg.get("sub") or []:
+                sub.add(str(topic))
+                if topic == "wifi":
+                    # First watcher should not wait for the background refresh
+                    try:
+                        subprocess_pool.submit(_publish_wifi_status)
+                    except Saturated:
+                        # Leave it to the background refresh, sooner than usual
+                        wifi_changed.set()
+        sub.close()
+
+    try:
+        session_pool.submit(_control_reader, name="events-reader")
+    except Saturated as e:
+        sub.close()
+        ws.close(1013, str(e))      # "Try Again Later"
+        return
+
+    while True:
+        batch = sub.get()
+        if batch is None:
+            break
+        if not batch:
+            continue
+        try:
+            ws.send(json.dumps(batch, separators=(",", ":")))
+        except Exception:
+            break
+
+    sub.close()
+
+
+@app.post("/api/cli/exec")
+def cli_exec():
+    """
+    Run one CLI command ({"command": "..."}) or a pipelined batch ({"commands": [...]})
+    on a pooled connection and return each command's output with timings.
+    """
+    data = request.get_json(silent=True) or {}
+    single = "command" in data
+    commands = [data.get("command")] if single else data.get("commands")
+
+    if not isinstance(commands, list) or not commands:
+        return jsonify({"ok": False, "error": "Missing command"}), 400
+    if len(commands) > CLI_MAX_BATCH:
+        return jsonify({"ok": False, "error": f"At most {CLI_MAX_BATCH} commands per batch"}), 400
+    for command in commands:
+        if not isinstance(command, str) or "\n" in command or "\r" in command:
+            return jsonify({"ok": False, "error": "Commands must be single-line strings"}), 400
+
+    try:
+        timeout = float(data.get("timeout", CLI_TIMEOUT_S))
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "error": "Invalid timeout"}), 400
+    # json parses NaN and Infinity; a NaN deadline never expires and would keep the connection forever
+    if not math.isfinite(timeout) or timeout <= 0:
+        return jsonify({"ok": False, "error": "Invalid timeout"}), 400
+    timeout = min(timeout, 60.0)
+
+    started = time.perf_counter()
+    try:
+        results, conn_id = cli_pool.execute(commands, timeout)
+    except CliUnavailable as e:
+        return jsonify({"ok": False, "error": str(e)}), 503
+    except CliTimeout as e:
+        return jsonify({"ok": False, "error": str(e), "results": e.results,
+                        "total_ms": round((time.perf_counter() - started) * 1000, 3)}), 504
+
+    body = {"ok": True, "results": results, "total_ms": round((time.perf_counter() - started) * 1000, 3),
+            "connection": conn_id}
+    if single:
+        body["output"] = results[0]["output"]
+    return jsonify(body), 200
+
+
+@app.get("/api/cli/pool")
+def cli_pool_stats():
+    """Connection and batch counters for the CLI RPC pool."""
+    return jsonify({"ok": True, **cli_pool.stats()}), 200
+
+
+@app.get("/api/terminal/sessions")
+def terminal_sessions_stats():
+    """Per-session output queue counters for the terminal bridge."""
+    return jsonify({"ok": True, "sessions": [sess.stats() for sess in list(terminal_sessions.values())]}), 200
+
+
+@app.before_request
+def _terminal_compression_handshake():
+    """
+    A terminal that asks for app-level compression must not also get the WebSocket
+    library's permessage-deflate, or every frame would be deflated twice. Hiding the
+    client's offer before flask-sock answers the handshake leaves the extension off.
+    """
+    if request.path == "/ws/terminal" and request.args.get("compress"):
+        request.environ.pop("HTTP_SEC_WEBSOCKET_EXTENSIONS", None)
+
+
 @sock.route('/ws/terminal')
 def terminal_ws(ws):
     """
     WebSocket terminal bridge
+
+    CLI output goes through a bounded TerminalSession queue so a slow viewer can
+    never stall the CLI socket; `?overflow=drop_oldest|summarize|disconnect`
+    overrides the default overflow policy for this session, and `?compress=deflate`
+    switches output to DeflateFramer's compressed binary frames.
     """
-    stop = threading.Event()
+    try:
+        session = TerminalSession(policy=request.args.get("overflow") or None,
+                                  compress=request.args.get("compress") or None)
+    except ValueError as e:
+        ws.send(f"\r\n\x1b[31m{e}\x1b[0m\r\n")
+        return
+    try:
+        session_pool.ensure_capacity(2)
+    except Saturated as e:
+        ws.send(f"\r\n\x1b[31mTerminal unavailable: {e}, try again later\x1b[0m\r\n")
+        return
+    terminal_sessions[session.id] = session
+
     tcp = TcpClient(port=CLI_PORT, host="127.0.0.1", timeout=1)
     tcp.open(timeout=1)
 
@@ -731,69 +1253,84 @@ def terminal_ws(ws):
     ws.send("\x1b[32m$\x1b[0m ")
 
     def _tcp_reader():
-        while not stop.is_set():
+        # Drain the CLI at full speed; queueing never blocks
+        while not session.closed:
             try:
-                data = tcp.read()
+                data = tcp.read(16 * 1024)
             except OSError:
                 break
             if data is None:
                 continue
-            try:
-                ws.send(data.decode('utf-8', errors='replace'))
-            except Exception:
+            if not data:
                 break
+            session.offer(data)
+        session.close("CLI connection closed")
 
     def _terminal_input_reader():
-        while not stop.is_set():
-            data = ws.receive()
+        while not session.closed:
+            try:
+                data = ws.receive()
+            except Exception:
+                # Closed by the viewer; the session must still end, or its workers stay taken
+                break
             if data is None:
                 break
             try:
                 tcp.send(data.encode('utf-8'))
             except Exception:
                 pass
+        session.close("WebSocket disconnected")
 
-    tcp_thread   = threading.Thread(target=_tcp_reader, daemon=True)
-    input_thread = threading.Thread(target=_terminal_input_reader, daemon=True)
-
-    tcp_thread.start()
-    input_thread.start()
+    try:
+        session_pool.submit(_tcp_reader, name=f"terminal-cli-{session.id}")
+        session_pool.submit(_terminal_input_reader, name=f"terminal-input-{session.id}")
+    except Saturated:
+        session.close("server busy")
+
+    # This thread is the only one that writes to the WebSocket
+    while True:
+        text = session.take()
+        if text is None:
+            break
+        if not text:
+            continue
+        try:
+            ws.send(session.framer.encode(text) if session.framer else text)
+        except Exception:
+            session.close("WebSocket send failed")
+            break
 
-    input_thread.join()   # exits when the WebSocket disconnects
-    stop.set()            # signal _tcp_reader to stop
-    
-    logging.info("WebSocket disconnected, closing TCP connection")
+    logging.info("Terminal session %s ended (%s), closing TCP connection", session.id, session.close_reason)
+    logging.info("Terminal session %s stats: %s", session.id, session.stats())
+    terminal_sessions.pop(session.id, None)
     tcp.close()
 
 
 if __name__ == "__main__":
-    # Create base logger
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-
-    # Formatter (add timestamps if you want)
-    formatter = logging.Formatter('[%(levelname)s] %(message)s')
-
-    # File handler
-    file_handler = logging.FileHandler('/var/log/rc-car-webserver.log')
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-
-    # Console (stdout) handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    # Base logger: callers only enqueue; file, console and log_ring are fed by a listener thread
+    start_logging(LOG_PATH, ring=log_ring, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT)
 
     if len(sys.argv) < 1:
         logging.log(logging.ERROR, "No command-line arguments provided.")
 
     logging.log(logging.INFO, "Web server version: %s", WEB_UI_VERSION)
+    logging.log(logging.INFO, "Wi-Fi backend: %s", wifi.name)
 
     # Start a background restore attempt so Wi-Fi can come back after swupdate.
-    threading.Thread(target=_wifi_restore_worker, daemon=True).start()
+    job_pool.submit(_wifi_restore_worker, name="wifi-restore")
+    threading.Thread(target=_wifi_event_worker, name="wifi-events", daemon=True).start()
+    telemetry.start()
+    link_quality.start()
+
+    try:
+        artifacts.open()
+    except OSError:
+        logging.exception("Failed to open artifact store in %s", UPLOAD_DIR)
+
+    events.publish("system", {"webui_version": WEB_UI_VERSION, "version": _get_image_version()})
 
     # Bind ONLY to Ethernet so the UI is never reachable over Wi‑Fi.
-    ip = get_ip_address(b'enP8p1s0')
+    ip = BIND_HOST or get_ip_address(BIND_INTERFACE.encode())
     if not ip:
         logging.log(logging.ERROR, "Could not determine the IP address of the ethernet interface")
         sys.exit(1)
@@ -804,7 +1341,13 @@ if __name__ == "__main__":
         logging.log(logging.ERROR, "ERROR: Failed to open port")
         exit(0)
         
-    logging.log(logging.INFO, "Bind host: %s:%s (ethernet)", ip, WEB_PORT)
-
-    # debug=True reloads on changes during dev
-    app.run(host=ip, port=WEB_PORT, debug=True, use_reloader=False)
+    logging.log(logging.INFO, "Bind host: %s:%s (%s)", ip, WEB_PORT, "override" if BIND_HOST else BIND_INTERFACE)
+
+    # What app.run(debug=True) set up, on a server that caps open connections
+    from werkzeug.debug import DebuggedApplication
+    app.debug = True
+    debug_app = DebuggedApplication(app, evalex=True)
+    debug_app.trusted_hosts.append(ip)
+    http_server = BoundedWSGIServer(ip, WEB_PORT, debug_app, max_connections=HTTP_MAX_CONNECTIONS)
+    http_server.log_startup()
+    http_server.serve_forever()
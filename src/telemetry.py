@@ -0,0 +1,289 @@
+from threading import Thread, Lock
+from array import array
+import glob
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+NAN = float("nan")
+
+
+class RingBuffer:
+    """
+    Fixed-size ring of floats backed by a flat `array('d')`.
+
+    Slots that were never written hold NaN. All rings of one resolution are
+    advanced together, so they share the caller's head/count bookkeeping.
+    """
+
+    def __init__(self, capacity : int):
+        self.capacity = capacity
+        self.data = array('d', [NAN]) * capacity
+
+
+    def put(self, index : int, value : float) -> None:
+        self.data[index] = value
+
+
+    def ordered(self, head : int, count : int) -> list:
+        """
+        Values oldest-first
+
+        Args:
+            head (int): Index of the next slot to be written
+            count (int): Number of valid slots
+
+        Returns:
+            list: Values, NaN mapped to None
+        """
+        start = (head - count) % self.capacity
+        if start + count <= self.capacity:
+            values = self.data[start:start + count]
+        else:
+            values = self.data[start:] + self.data[:head]
+        return [None if math.isnan(v) else v for v in values]
+
+
+class Resolution:
+    """One downsampling level: a timestamp ring plus a ring per metric."""
+
+    def __init__(self, name : str, step : int, capacity : int):
+        self.name = name
+        self.step = step            # number of base samples averaged into one slot
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+        self.times = RingBuffer(capacity)
+        self.series : dict = {}
+        self.__sums : dict = {}
+        self.__pending = 0
+
+
+    def add(self, ts : float, sample : dict) -> None:
+        for name, value in sample.items():
+            acc = self.__sums.get(name)
+            if acc is None:
+                self.__sums[name] = [value, 1]
+            else:
+                acc[0] += value
+                acc[1] += 1
+
+        self.__pending += 1
+        if self.__pending < self.step:
+            return
+
+        self.times.put(self.head, ts)
+        for name, (total, n) in self.__sums.items():
+            ring = self.series.get(name)
+            if ring is None:
+                ring = self.series[name] = RingBuffer(self.capacity)
+            ring.put(self.head, total / n)
+        # Metrics that produced no value this period keep a gap
+        for name, ring in self.series.items():
+            if name not in self.__sums:
+                ring.put(self.head, NAN)
+
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.__sums = {}
+        self.__pending = 0
+
+
+    def history(self) -> dict:
+        return {
+            "resolution": self.name,
+            "step_s": self.step,
+            "t": self.times.ordered(self.head, self.count),
+            "series": {name: ring.ordered(self.head, self.count) for name, ring in self.series.items()},
+        }
+
+
+class SystemSampler(Thread):
+    """
+    Background sampler of CPU, memory, temperature, disk and network usage.
+
+    Reads /proc and /sys once per `interval` through file descriptors that stay
+    open for the life of the process, and keeps 1 s / 10 s / 1 min history in
+    fixed-size rings, so memory use is constant no matter how long it runs.
+    """
+    RESOLUTIONS = (
+        ("1s",  1,  600),   # 10 minutes
+        ("10s", 10, 360),   # 1 hour
+        ("1m",  60, 1440),  # 24 hours
+    )
+
+    def __init__(self, interval : float = 1.0, disks : list | None = None, on_sample=None):
+        super().__init__(name="telemetry-sampler", daemon=True)
+        self.interval = float(interval)
+        self.disks = disks if disks is not None else ["/data", "/home/images"]
+        self.on_sample = on_sample
+        self.latest : dict = {}
+        self.__lock = Lock()
+        self.__levels = [Resolution(name, step, cap) for name, step, cap in SystemSampler.RESOLUTIONS]
+        self.__fds : dict = {}
+        self.__prev_cpu = None
+        self.__prev_net = None
+        self.__prev_ts = None
+        self.__thermal = sorted(glob.glob("/sys/class/thermal/thermal_zone*/temp"))
+
+
+    def run(self) -> None:
+        logger.info("Telemetry sampler running every %s s", self.interval)
+        next_ts = time.monotonic()
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Telemetry sample failed")
+            next_ts += self.interval
+            delay = next_ts - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_ts = time.monotonic()
+
+
+    def sample(self) -> dict:
+        now = time.time()
+        mono = time.monotonic()
+        sample : dict = {}
+
+        busy, total = self.__read_cpu()
+        if self.__prev_cpu is not None and total > self.__prev_cpu[1]:
+            sample["cpu_pct"] = 100.0 * (busy - self.__prev_cpu[0]) / (total - self.__prev_cpu[1])
+        self.__prev_cpu = (busy, total)
+
+        mem = self.__read_meminfo()
+        if "MemTotal" in mem and "MemAvailable" in mem:
+            sample["mem_used_pct"] = 100.0 * (1 - mem["MemAvailable"] / mem["MemTotal"])
+            sample["mem_available_mb"] = mem["MemAvailable"] / 1024.0
+
+        temp = self.__read_temperature()
+        if temp is not None:
+            sample["temp_c"] = temp
+
+        for path in self.disks:
+            try:
+                st = os.statvfs(path)
+            except OSError:
+                continue
+            sample[f"disk_free_mb:{path}"] = st.f_bavail * st.f_frsize / (1024.0 * 1024.0)
+
+        net = self.__read_net()
+        if self.__prev_net is not None:
+            dt = mono - self.__prev_ts
+            for iface, (rx, tx) in net.items():
+                prev = self.__prev_net.get(iface)
+                if prev is None or dt <= 0:
+                    continue
+                sample[f"rx_kbps:{iface}"] = (rx - prev[0]) * 8 / 1000.0 / dt
+                sample[f"tx_kbps:{iface}"] = (tx - prev[1]) * 8 / 1000.0 / dt
+        self.__prev_net = net
+        self.__prev_ts = mono
+
+        with self.__lock:
+            for level in self.__levels:
+                level.add(now, sample)
+            self.latest = {"t": now, **sample}
+
+        if self.on_sample is not None:
+            self.on_sample(self.latest)
+        return sample
+
+
+    def history(self, window_s : float) -> dict:
+        """
+        History covering at least `window_s` seconds, at the finest resolution that can
+
+        Args:
+            window_s (float): Requested window in seconds
+
+        Returns:
+            dict: {"resolution", "step_s", "t": [...], "series": {name: [...]}}
+        """
+        with self.__lock:
+            level = self.__levels[-1]
+            for candidate in self.__levels:
+                if candidate.step * self.interval * candidate.capacity >= window_s:
+                    level = candidate
+                    break
+            hist = level.history()
+
+        keep = max(1, int(math.ceil(window_s / (level.step * self.interval))))
+        hist["t"] = hist["t"][-keep:]
+        hist["series"] = {name: values[-keep:] for name, values in hist["series"].items()}
+        return hist
+
+
+    def __pread(self, path : str) -> str:
+        fd = self.__fds.get(path)
+        if fd is None:
+            fd = self.__fds[path] = os.open(path, os.O_RDONLY)
+        return os.pread(fd, 65536, 0).decode("ascii", errors="replace")
+
+
+    def __read_cpu(self) -> tuple:
+        fields = self.__pread("/proc/stat").split("\n", 1)[0].split()[1:]
+        values = [int(v) for v in fields]
+        total = sum(values[:8])
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        return total - idle, total
+
+
+    def __read_meminfo(self) -> dict:
+        mem = {}
+        for line in self.__pread("/proc/meminfo").splitlines():
+            key, _, rest = line.partition(":")
+            if key in ("MemTotal", "MemAvailable"):
+                mem[key] = int(rest.split()[0])
+        return mem
+
+
+    def __read_temperature(self) -> float | None:
+        temps = []
+        for path in self.__thermal:
+            try:
+                temps.append(int(self.__pread(path).strip()) / 1000.0)
+            except (OSError, ValueError):
+                continue
+        return max(temps) if temps else None
+
+
+    def __read_net(self) -> dict:
+        net = {}
+        # Skip the two header lines of /proc/net/dev
+        for line in self.__pread("/proc/net/dev").splitlines()[2:]:
+            iface, _, rest = line.partition(":")
+            iface = iface.strip()
+            if iface == "lo":
+                continue
+            cols = rest.split()
+            if len(cols) >= 9:
+                net[iface] = (int(cols[0]), int(cols[8]))
+        return net
+
+
+def parse_window(value : str | None, default : float = 600.0) -> float:
+    """
+    Parse a window like "300", "90s", "10m", "1h" or "24h" into seconds; a missing
+    or blank value gives `default`
+
+    Raises:
+        ValueError: If the value is not a positive, finite duration
+    """
+    value = (value or "").strip().lower()
+    if not value:
+        return default
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    scale = 1
+    if value[-1] in units:
+        scale = units[value[-1]]
+        value = value[:-1]
+    seconds = float(value) * scale
+    # float() takes "nan" and "inf" too; neither slices a history
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise ValueError("window must be a positive, finite duration")
+    return seconds
@@ -0,0 +1,255 @@
+from threading import Condition
+from collections import deque
+import codecs
+import logging
+import os
+import struct
+import time
+import uuid
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class DeflateFramer:
+    """
+    Compressed binary framing for terminal output (`/ws/terminal?compress=deflate`).
+
+    One raw-deflate stream spans the whole session and is sync-flushed after
+    every frame. Each frame therefore decodes as soon as it arrives, while the
+    escape sequences, prompts and table borders the CLI repeats still compress
+    against everything sent before. Frames shorter than `min_bytes` are not
+    worth the CPU and go out uncompressed. Every message starts with a type byte:
+
+        0x00  raw      UTF-8 text follows
+        0x01  deflate  4-byte big-endian uncompressed length, then deflate data
+    """
+    RAW = 0
+    DEFLATE = 1
+    HEADER = struct.Struct("!BI")
+
+    DEFAULT_MIN_BYTES = int(os.environ.get("RC_CAR_TERMINAL_COMPRESS_MIN_BYTES", "64"))
+    DEFAULT_LEVEL = int(os.environ.get("RC_CAR_TERMINAL_COMPRESS_LEVEL", "6"))
+
+    def __init__(self, min_bytes : int | None = None, level : int | None = None):
+        self.min_bytes = int(DeflateFramer.DEFAULT_MIN_BYTES if min_bytes is None else min_bytes)
+        self.level = int(DeflateFramer.DEFAULT_LEVEL if level is None else level)
+        self.__z = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+
+        # Counters
+        self.frames_raw : int = 0
+        self.frames_deflate : int = 0
+        self.bytes_in : int = 0
+        self.bytes_out : int = 0
+        self.deflate_in : int = 0
+        self.deflate_out : int = 0
+        self.cpu_s : float = 0.0
+
+
+    def encode(self, text : str) -> bytes:
+        """
+        Frame one chunk of terminal output
+
+        Args:
+            text (str): Output as returned by `TerminalSession.take`
+
+        Returns:
+            bytes: Binary WebSocket message
+        """
+        data = text.encode("utf-8")
+        self.bytes_in += len(data)
+        if len(data) < self.min_bytes:
+            self.frames_raw += 1
+            self.bytes_out += 1 + len(data)
+            return bytes((DeflateFramer.RAW,)) + data
+
+        started = time.thread_time()
+        body = self.__z.compress(data) + self.__z.flush(zlib.Z_SYNC_FLUSH)
+        self.cpu_s += time.thread_time() - started
+
+        self.frames_deflate += 1
+        self.deflate_in += len(data)
+        self.deflate_out += len(body)
+        self.bytes_out += DeflateFramer.HEADER.size + len(body)
+        return DeflateFramer.HEADER.pack(DeflateFramer.DEFLATE, len(data)) + body
+
+
+    def stats(self) -> dict:
+        return {
+            "codec": "deflate",
+            "level": self.level,
+            "min_bytes": self.min_bytes,
+            "frames_raw": self.frames_raw,
+            "frames_deflate": self.frames_deflate,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_in / self.bytes_out, 3) if self.bytes_out else None,
+            "deflate_ratio": round(self.deflate_in / self.deflate_out, 3) if self.deflate_out else None,
+            "cpu_ms": round(self.cpu_s * 1000, 3),
+            "cpu_us_per_kb": round(self.cpu_s * 1e6 / (self.deflate_in / 1024), 2) if self.deflate_in else None,
+        }
+
+
+class TerminalSession:
+    """
+    Bounded output queue between the CLI socket and one terminal WebSocket.
+
+    The CLI reader only ever calls `offer`, which never blocks, so the CLI's
+    socket is drained at full speed however slow the browser is. When more
+    than `max_bytes` is waiting, the overflow policy decides what gives:
+
+        drop_oldest  discard the oldest queued output to make room
+        summarize    discard the backlog and tell the viewer how much was skipped
+        disconnect   close the viewer's WebSocket
+
+    With `compress="deflate"` the output is framed by a DeflateFramer (`framer`).
+    """
+    POLICIES = ("drop_oldest", "summarize", "disconnect")
+    CODECS = ("deflate",)
+
+    DEFAULT_POLICY = os.environ.get("RC_CAR_TERMINAL_OVERFLOW", "drop_oldest")
+    DEFAULT_MAX_BYTES = int(os.environ.get("RC_CAR_TERMINAL_QUEUE_BYTES", str(256 * 1024)))
+
+    def __init__(self, policy : str | None = None, max_bytes : int | None = None, compress : str | None = None):
+        policy = policy or TerminalSession.DEFAULT_POLICY
+        if policy not in TerminalSession.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        if compress and compress not in TerminalSession.CODECS:
+            raise ValueError(f"Unknown compression: {compress}")
+
+        self.id = uuid.uuid4().hex[:12]
+        self.policy = policy
+        self.max_bytes = int(max_bytes or TerminalSession.DEFAULT_MAX_BYTES)
+        self.created = time.time()
+        self.closed : bool = False
+        self.close_reason : str | None = None
+        self.framer = DeflateFramer() if compress else None
+
+        self.__cond = Condition()
+        self.__chunks = deque()
+        self.__decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        # Counters
+        self.queued_bytes : int = 0
+        self.peak_queued_bytes : int = 0
+        self.bytes_in : int = 0
+        self.bytes_out : int = 0
+        self.frames_out : int = 0
+        self.dropped_bytes : int = 0
+        self.dropped_chunks : int = 0
+        self.overflows : int = 0
+        self.__skipped : int = 0
+
+
+    def offer(self, data : bytes) -> None:
+        """
+        Queue CLI output for the viewer without ever blocking
+
+        Args:
+            data (bytes): Raw bytes read from the CLI socket
+        """
+        with self.__cond:
+            if self.closed:
+                return
+            self.bytes_in += len(data)
+
+            if self.queued_bytes + len(data) > self.max_bytes:
+                self.overflows += 1
+                if self.policy == "disconnect":
+                    self.__close_locked("viewer too slow")
+                    return
+
+                if self.policy == "summarize":
+                    self.__skipped += self.queued_bytes + len(data)
+                    self.__drop_locked(len(self.__chunks))
+                    self.dropped_bytes += len(data)
+                    self.dropped_chunks += 1
+                    self.__cond.notify()
+                    return
+
+                # drop_oldest
+                while self.__chunks and self.queued_bytes + len(data) > self.max_bytes:
+                    self.__drop_locked(1)
+                if len(data) > self.max_bytes:
+                    self.dropped_bytes += len(data) - self.max_bytes
+                    data = data[-self.max_bytes:]
+
+            self.__chunks.append(data)
+            self.queued_bytes += len(data)
+            self.peak_queued_bytes = max(self.peak_queued_bytes, self.queued_bytes)
+            self.__cond.notify()
+
+
+    def take(self, timeout : float | None = None) -> str | None:
+        """
+        Wait for queued output and return all of it as one frame
+
+        Args:
+            timeout (float | None): Seconds to wait, None to wait forever
+
+        Returns:
+            str | None: Text to send ("" on timeout), None once the session is closed
+        """
+        with self.__cond:
+            if not self.__chunks and not self.__skipped and not self.closed:
+                self.__cond.wait(timeout)
+            if self.closed:
+                return None
+
+            data = b"".join(self.__chunks)
+            self.__chunks.clear()
+            self.queued_bytes = 0
+            skipped, self.__skipped = self.__skipped, 0
+
+        text = self.__decoder.decode(data)
+        if skipped:
+            text = f"\r\n\x1b[33m[{skipped} bytes of output skipped]\x1b[0m\r\n" + text
+        if text:
+            self.bytes_out += len(data)
+            self.frames_out += 1
+        return text
+
+
+    def close(self, reason : str = "closed") -> None:
+        with self.__cond:
+            self.__close_locked(reason)
+
+
+    def stats(self) -> dict:
+        with self.__cond:
+            return {
+                "id": self.id,
+                "policy": self.policy,
+                "max_bytes": self.max_bytes,
+                "created": self.created,
+                "closed": self.closed,
+                "close_reason": self.close_reason,
+                "queued_bytes": self.queued_bytes,
+                "peak_queued_bytes": self.peak_queued_bytes,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "frames_out": self.frames_out,
+                "dropped_bytes": self.dropped_bytes,
+                "dropped_chunks": self.dropped_chunks,
+                "overflows": self.overflows,
+                "compression": self.framer.stats() if self.framer else None,
+            }
+
+
+    def __drop_locked(self, count : int) -> None:
+        for _ in range(count):
+            chunk = self.__chunks.popleft()
+            self.queued_bytes -= len(chunk)
+            self.dropped_bytes += len(chunk)
+            self.dropped_chunks += 1
+
+
+    def __close_locked(self, reason : str) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        self.__chunks.clear()
+        self.queued_bytes = 0
+        self.__cond.notify_all()
+        logger.info("Terminal session %s closed: %s", self.id, reason)
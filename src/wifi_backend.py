@@ -0,0 +1,762 @@
+from threading import Thread, Lock
+from queue import Queue
+import subprocess
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# NetworkManager D-Bus constants
+NM_BUS_NAME          = "org.freedesktop.NetworkManager"
+NM_PATH              = "/org/freedesktop/NetworkManager"
+NM_IFACE             = "org.freedesktop.NetworkManager"
+NM_DEVICE_IFACE      = "org.freedesktop.NetworkManager.Device"
+NM_WIRELESS_IFACE    = "org.freedesktop.NetworkManager.Device.Wireless"
+NM_AP_IFACE          = "org.freedesktop.NetworkManager.AccessPoint"
+NM_ACTIVE_IFACE      = "org.freedesktop.NetworkManager.Connection.Active"
+NM_IP4_IFACE         = "org.freedesktop.NetworkManager.IP4Config"
+NM_SETTINGS_PATH     = "/org/freedesktop/NetworkManager/Settings"
+NM_SETTINGS_IFACE    = "org.freedesktop.NetworkManager.Settings"
+NM_CONNECTION_IFACE  = "org.freedesktop.NetworkManager.Settings.Connection"
+PROPERTIES_IFACE     = "org.freedesktop.DBus.Properties"
+
+NM_DEVICE_TYPE_WIFI       = 2
+NM_DEVICE_STATE_ACTIVATED = 100
+NM_DEVICE_STATE_FAILED    = 120
+NM_ACTIVE_STATE_ACTIVATED = 2
+NM_ACTIVE_STATE_DEACTIVATED = 4
+
+# AccessPoint WpaFlags/RsnFlags bits
+NM_802_11_AP_SEC_KEY_MGMT_PSK   = 0x100
+NM_802_11_AP_SEC_KEY_MGMT_802_1X = 0x200
+NM_802_11_AP_SEC_KEY_MGMT_SAE   = 0x400
+NM_802_11_AP_FLAGS_PRIVACY      = 0x1
+
+
+class WifiBackendError(Exception):
+    """A Wi-Fi operation failed; the message is safe to show to the user."""
+
+
+class WifiBackend:
+    """
+    Interface for the Wi-Fi operations the web server needs.
+
+    `get_status` returns {"connected", "ssid", "device", "connection", "ip"} and may
+    add "error". `get_link` returns the current association ({"device", "ssid",
+    "bssid", "signal" (0-100), "bitrate_mbps", "frequency_mhz"}) or None.
+    Backends that learn about changes without being asked set `pushes_changes`
+    and call every function registered with `on_change`. Backends whose
+    "bitrate_mbps" is the current TX bitrate, not an advertised maximum, set
+    `reports_bitrate`.
+    """
+    name = "base"
+    pushes_changes = False
+    reports_bitrate = False
+
+    def __init__(self):
+        self._listeners : list = []
+
+
+    def on_change(self, callback) -> None:
+        self._listeners.append(callback)
+
+
+    def _notify(self) -> None:
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Wi-Fi change listener failed")
+
+
+    def get_device(self) -> str | None:
+        raise NotImplementedError
+
+    def get_status(self) -> dict:
+        raise NotImplementedError
+
+    def get_link(self) -> dict | None:
+        raise NotImplementedError
+
+    def scan(self, rescan : bool = True) -> list:
+        raise NotImplementedError
+
+    def known_networks(self) -> dict:
+        """Saved Wi-Fi profiles as {ssid: connection id}"""
+        raise NotImplementedError
+
+    def radio_on(self) -> None:
+        raise NotImplementedError
+
+    def connect(self, ssid : str, password : str | None = None, device : str | None = None) -> None:
+        raise NotImplementedError
+
+    def activate_connection(self, connection : str, device : str | None = None, bssid : str | None = None) -> None:
+        raise NotImplementedError
+
+    def ensure_autoconnect(self) -> None:
+        raise NotImplementedError
+
+    def get_secrets(self, connection : str) -> tuple:
+        raise NotImplementedError
+
+
+def _leading_number(text : str) -> float | None:
+    """Leading number of an nmcli value such as "270 Mbit/s"; None if there is none."""
+    try:
+        return float(text.split()[0])
+    except (IndexError, ValueError):
+        return None
+
+
+class NmcliBackend(WifiBackend):
+    """Wi-Fi through the `nmcli` command line tool (one fork/exec per query)."""
+    name = "nmcli"
+
+    @staticmethod
+    def _split_nmcli_t_line(line: str) -> list[str]:
+        """Split an nmcli -t line that may use ':' (default) or a custom separator."""
+        if "\t" in line:
+            return line.split("\t")
+        return line.split(":")
+
+
+    @staticmethod
+    def _split_terse(line : str) -> list[str]:
+        """Split an nmcli -t line on unescaped ':' (values escape ':' and '\\' with a backslash)."""
+        fields, current, escaped = [], [], False
+        for ch in line:
+            if escaped:
+                current.append(ch)
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == ":":
+                fields.append("".join(current))
+                current = []
+            else:
+                current.append(ch)
+        fields.append("".join(current))
+        return fields
+
+
+    @staticmethod
+    def _get_ipv4_for_device(device: str) -> str | None:
+        if not device:
+            return None
+        try:
+            out = subprocess.check_output(
+                ["ip", "-4", "-o", "addr", "show", "dev", device],
+                text=True,
+                stderr=subprocess.DEVNULL,
+            )
+            # Example: "3: wlan0    inet 192.168.1.20/24 brd ..."
+            for line in out.splitlines():
+                parts = line.split()
+                if "inet" in parts:
+                    idx = parts.index("inet")
+                    if idx + 1 < len(parts):
+                        return parts[idx + 1].split("/", 1)[0]
+        except Exception:
+            return None
+        return None
+
+
+    def get_device(self) -> str | None:
+        try:
+            out = subprocess.check_output(
+                ["nmcli", "-t", "-f", "DEVICE,TYPE,STATE,CONNECTION", "dev", "status"],
+                text=True,
+            )
+            for line in out.splitlines():
+                if not line:
+                    continue
+                parts = self._split_nmcli_t_line(line)
+                if len(parts) < 2:
+                    continue
+                device, dev_type = parts[0], parts[1]
+                if dev_type == "wifi":
+                    return device or None
+        except Exception:
+            return None
+        return None
+
+
+    def get_status(self) -> dict:
+        status = {"connected": False, "ssid": None, "device": None, "connection": None, "ip": None}
+
+        try:
+            # First: determine whether any Wi-Fi device is connected.
+            dev_status = subprocess.check_output(
+                ["nmcli", "-t", "-f", "DEVICE,TYPE,STATE,CONNECTION", "dev", "status"],
+                text=True,
+            )
+            wifi_device = None
+            wifi_connection = None
+            for line in dev_status.splitlines():
+                if not line:
+                    continue
+                parts = self._split_nmcli_t_line(line)
+                if len(parts) < 4:
+                    continue
+                device, dev_type, state, connection = parts[0], parts[1], parts[2], parts[3]
+                if dev_type == "wifi" and state == "connected":
+                    wifi_device = device or None
+                    wifi_connection = connection or None
+                    break
+
+            if wifi_device:
+                status["connected"] = True
+                status["device"] = wifi_device
+                status["connection"] = wifi_connection
+                status["ip"] = self._get_ipv4_for_device(wifi_device)
+
+                # Second: best-effort SSID lookup.
+                try:
+                    wifi_list = subprocess.check_output(
+                        ["nmcli", "-t", "-f", "ACTIVE,SSID,DEVICE", "dev", "wifi", "list"],
+                        text=True,
+                    )
+                    for wline in wifi_list.splitlines():
+                        if not wline:
+                            continue
+                        wparts = self._split_nmcli_t_line(wline)
+                        if len(wparts) < 3:
+                            continue
+                        active, ssid, device = wparts[0], wparts[1], wparts[2]
+                        if active.strip().lower() == "yes" and (not device or device == wifi_device):
+                            status["ssid"] = ssid or None
+                            break
+                except Exception:
+                    pass
+
+                # Third: if SSID is still unknown, try reading from the active connection.
+                if not status.get("ssid") and wifi_connection:
+                    try:
+                        ssid_val = subprocess.check_output(
+                            ["nmcli", "-g", "802-11-wireless.ssid", "con", "show", wifi_connection],
+                            text=True,
+                        ).strip()
+                        status["ssid"] = ssid_val or None
+                    except Exception:
+                        pass
+        except FileNotFoundError:
+            status["error"] = "nmcli not found"
+        except Exception as e:
+            status["error"] = str(e)
+
+        return status
+
+
+    def get_link(self) -> dict | None:
+        try:
+            out = subprocess.check_output(
+                ["nmcli", "-t", "-f", "ACTIVE,BSSID,SSID,SIGNAL,RATE,FREQ,DEVICE", "dev", "wifi", "list", "--rescan", "no"],
+                text=True,
+                stderr=subprocess.DEVNULL,
+            )
+        except Exception:
+            return None
+        for line in out.splitlines():
+            parts = self._split_terse(line)
+            if len(parts) < 7 or parts[0].strip().lower() != "yes":
+                continue
+            _, bssid, ssid, signal, rate, freq, device = parts[:7]
+            # RATE is the AP's advertised maximum; nmcli has no current bitrate
+            return {
+                "device": device or None,
+                "ssid": ssid or None,
+                "bssid": bssid.upper() or None,
+                "signal": int(signal) if signal.isdigit() else None,
+                "bitrate_mbps": _leading_number(rate),
+                "frequency_mhz": _leading_number(freq),
+            }
+        return None
+
+
+    def scan(self, rescan : bool = True) -> list:
+        # Ask NetworkManager to scan + list
+        if rescan:
+            subprocess.run(["nmcli", "dev", "wifi", "rescan"], check=False)
+
+        # Parse list as lines of SSIDs
+        try:
+            result = subprocess.check_output(
+                ["nmcli", "-t", "-f", "SSID,SIGNAL,SECURITY,BSSID", "dev", "wifi", "list", "--rescan", "no"],
+                text=True
+            )
+        except subprocess.CalledProcessError as e:
+            raise WifiBackendError(str(e))
+
+        networks = []
+        for line in result.strip().splitlines():
+            if not line:
+                continue
+            ssid, signal, security, bssid = (self._split_terse(line) + ["", "", "", ""])[:4]
+            networks.append({
+                "ssid": ssid,
+                "signal": int(signal) if signal.isdigit() else 0,
+                "security": security or "OPEN",
+                "bssid": bssid.upper() or None,
+            })
+        return networks
+
+
+    def known_networks(self) -> dict:
+        known = {}
+        try:
+            out = subprocess.check_output(["nmcli", "-t", "-f", "NAME,TYPE", "con", "show"], text=True)
+            for line in out.splitlines():
+                parts = self._split_terse(line)
+                if len(parts) < 2 or parts[1] != "802-11-wireless":
+                    continue
+                ssid = subprocess.check_output(
+                    ["nmcli", "-g", "802-11-wireless.ssid", "con", "show", parts[0]],
+                    text=True,
+                ).strip()
+                if ssid:
+                    known.setdefault(self._split_terse(ssid)[0], parts[0])
+        except Exception:
+            pass
+        return known
+
+
+    def radio_on(self) -> None:
+        subprocess.run(["nmcli", "radio", "wifi", "on"], check=False)
+
+
+    def connect(self, ssid : str, password : str | None = None, device : str | None = None) -> None:
+        cmd = ["nmcli", "dev", "wifi", "connect", str(ssid)]
+        if password:
+            cmd += ["password", str(password)]
+        if device:
+            cmd += ["ifname", str(device)]
+        res = subprocess.run(cmd, check=False, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if res.returncode != 0:
+            raise WifiBackendError(
+                f"nmcli connect failed (rc={res.returncode}): {(res.stderr or res.stdout or '').strip()}"
+            )
+
+
+    def activate_connection(self, connection : str, device : str | None = None, bssid : str | None = None) -> None:
+        cmd = ["nmcli", "con", "up", "id", str(connection)]
+        if device:
+            cmd += ["ifname", str(device)]
+        if bssid:
+            cmd += ["ap", str(bssid)]
+        res = subprocess.run(cmd, check=False, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if res.returncode != 0:
+            raise WifiBackendError(
+                f"nmcli con up failed (rc={res.returncode}): {(res.stderr or res.stdout or '').strip()}"
+            )
+
+
+    def ensure_autoconnect(self) -> None:
+        try:
+            active_cons = subprocess.check_output(
+                ["nmcli", "-t", "--separator", "\t", "-f", "NAME,TYPE", "con", "show", "--active"],
+                text=True,
+            )
+            for line in active_cons.splitlines():
+                parts = line.split("\t")
+                if len(parts) >= 2 and parts[1] == "802-11-wireless":
+                    subprocess.run(["nmcli", "con", "modify", parts[0], "connection.autoconnect", "yes"], check=False)
+                    break
+        except Exception:
+            pass
+
+
+    def get_secrets(self, connection : str) -> tuple:
+        ssid, password = None, None
+        try:
+            out = subprocess.check_output(
+                [
+                    "nmcli",
+                    "--show-secrets",
+                    "-g",
+                    "802-11-wireless.ssid,802-11-wireless-security.psk",
+                    "con",
+                    "show",
+                    connection,
+                ],
+                text=True,
+            )
+            lines = [ln.strip() for ln in out.splitlines() if ln.strip() != ""]
+            if lines:
+                ssid = lines[0] or None
+            if len(lines) >= 2:
+                password = lines[1] or None
+        except Exception:
+            pass
+        return ssid, password
+
+
+class DbusBackend(WifiBackend):
+    """
+    Wi-Fi through NetworkManager's D-Bus API, in process.
+
+    Holds one long-lived bus connection (jeepney's thread-safe router) and
+    subscribes to NetworkManager's PropertiesChanged/StateChanged signals; the
+    cached status is dropped and listeners are notified when one fires on
+    NetworkManager itself, a Wi-Fi device, or the active connection or access
+    point, so status reads cost nothing while the link is stable (and the
+    strength of every nearby access point changing does not count).
+    """
+    name = "dbus"
+    pushes_changes = True
+    reports_bitrate = True
+
+    CONNECT_TIMEOUT_S = float(os.environ.get("RC_CAR_WIFI_CONNECT_TIMEOUT_S", "30"))
+
+    def __init__(self, bus : str = "SYSTEM"):
+        super().__init__()
+        from jeepney import DBusAddress, DBusErrorResponse, HeaderFields, MatchRule, message_bus, new_method_call
+        from jeepney.io.threading import DBusRouter, open_dbus_connection
+        from jeepney.wrappers import unwrap_msg
+
+        self.__DBusAddress = DBusAddress
+        self.__DBusErrorResponse = DBusErrorResponse
+        self.__new_method_call = new_method_call
+        self.__unwrap_msg = unwrap_msg
+        self.__path_field = HeaderFields.path
+
+        self.__router = DBusRouter(open_dbus_connection(bus=bus.upper()))
+        self.__lock = Lock()
+        self.__cached_status : dict | None = None
+        self.__link_device : tuple | None = None     # (interface, object path) last sampled by get_link
+        self.__watched : frozenset | None = None     # object paths whose signals matter; None until known
+
+        # Fail fast (and let the caller fall back to nmcli) if NetworkManager is not there
+        self.version = self._get(NM_PATH, NM_IFACE, "Version")
+
+        # Signals carry NetworkManager's unique bus name, so match locally on the object path
+        self.__signals = Queue(maxsize=64)
+        for rule in (
+            MatchRule(type="signal", path_namespace=NM_PATH, interface=PROPERTIES_IFACE, member="PropertiesChanged"),
+            MatchRule(type="signal", path_namespace=NM_PATH, interface=NM_IFACE, member="StateChanged"),
+        ):
+            self.__router.filter(rule, queue=self.__signals)
+            self.__router.send_and_get_reply(message_bus.AddMatch(rule), timeout=5.0)
+        Thread(target=self.__signal_worker, name="wifi-dbus-signals", daemon=True).start()
+
+        logger.info("NetworkManager %s reachable over D-Bus", self.version)
+
+
+    def close(self) -> None:
+        """Drop the bus connection; the backend is unusable afterwards."""
+        self.__router.close()
+
+
+    # -- D-Bus plumbing ---------------------------------------------------------
+
+    def _call(self, path : str, interface : str, method : str, signature : str | None = None,
+              body : tuple = (), timeout : float = 10.0) -> tuple:
+        addr = self.__DBusAddress(path, bus_name=NM_BUS_NAME, interface=interface)
+        msg = self.__new_method_call(addr, method, signature, body)
+        try:
+            return self.__unwrap_msg(self.__router.send_and_get_reply(msg, timeout=timeout))
+        except self.__DBusErrorResponse as e:
+            raise WifiBackendError(f"{e.name}: {e.data[0] if e.data else ''}") from None
+        except TimeoutError:
+            raise WifiBackendError(f"NetworkManager did not answer {method} in {timeout:.0f}s") from None
+
+
+    def _get(self, path : str, interface : str, prop : str):
+        return self._call(path, PROPERTIES_IFACE, "Get", "ss", (interface, prop))[0][1]
+
+
+    def _get_all(self, path : str, interface : str) -> dict:
+        props = self._call(path, PROPERTIES_IFACE, "GetAll", "s", (interface,))[0]
+        return {name: value for name, (_, value) in props.items()}
+
+
+    def __signal_worker(self) -> None:
+        while True:
+            path = self.__signals.get().header.fields.get(self.__path_field)
+            with self.__lock:
+                watched = self.__watched
+                if watched is not None and path != NM_PATH and path not in watched:
+                    continue
+                self.__cached_status = None
+            self._notify()
+
+
+    def __wifi_devices(self) -> list:
+        """(path, properties) for every Wi-Fi device"""
+        out = []
+        for path in self._call(NM_PATH, NM_IFACE, "GetDevices")[0]:
+            props = self._get_all(path, NM_DEVICE_IFACE)
+            if props.get("DeviceType") == NM_DEVICE_TYPE_WIFI:
+                out.append((path, props))
+        return out
+
+
+    def __device_path(self, device : str | None) -> str:
+        devices = self.__wifi_devices()
+        for path, props in devices:
+            if device is None or props.get("Interface") == device:
+                return path
+        raise WifiBackendError(f"No Wi-Fi device{' ' + device if device else ''}")
+
+
+    def __find_connection(self, ssid : str | None = None, conn_id : str | None = None) -> str | None:
+        for path in self._call(NM_SETTINGS_PATH, NM_SETTINGS_IFACE, "ListConnections")[0]:
+            settings = self._call(path, NM_CONNECTION_IFACE, "GetSettings")[0]
+            connection = {k: v for k, (_, v) in settings.get("connection", {}).items()}
+            if connection.get("type") != "802-11-wireless":
+                continue
+            if conn_id is not None and connection.get("id") == conn_id:
+                return path
+            if ssid is not None:
+                wireless = {k: v for k, (_, v) in settings.get("802-11-wireless", {}).items()}
+                if bytes(wireless.get("ssid", b"")).decode("utf-8", "replace") == ssid:
+                    return path
+        return None
+
+
+    def __wait_activated(self, device_path : str) -> None:
+        deadline = time.monotonic() + DbusBackend.CONNECT_TIMEOUT_S
+        while time.monotonic() < deadline:
+            state = self._get(device_path, NM_DEVICE_IFACE, "State")
+            if state == NM_DEVICE_STATE_ACTIVATED:
+                return
+            if state == NM_DEVICE_STATE_FAILED:
+                reason = self._get(device_path, NM_DEVICE_IFACE, "StateReason")
+                raise WifiBackendError(f"Activation failed (reason {reason[1] if reason else '?'})")
+            time.sleep(0.25)
+        raise WifiBackendError("Timed out waiting for Wi-Fi to connect")
+
+
+    # -- WifiBackend ------------------------------------------------------------
+
+    def get_device(self) -> str | None:
+        try:
+            devices = self.__wifi_devices()
+        except Exception:
+            return None
+        return devices[0][1].get("Interface") or None if devices else None
+
+
+    def get_status(self) -> dict:
+        with self.__lock:
+            if self.__cached_status is not None:
+                return dict(self.__cached_status)
+
+        status = {"connected": False, "ssid": None, "device": None, "connection": None, "ip": None}
+        watched = set()
+        try:
+            for path, props in self.__wifi_devices():
+                watched.add(path)
+                if status["connected"] or props.get("State") != NM_DEVICE_STATE_ACTIVATED:
+                    continue
+                status["connected"] = True
+                status["device"] = props.get("Interface") or None
+
+                active = props.get("ActiveConnection")
+                if active and active != "/":
+                    watched.add(active)
+                    status["connection"] = self._get(active, NM_ACTIVE_IFACE, "Id") or None
+
+                ip4 = props.get("Ip4Config")
+                if ip4 and ip4 != "/":
+                    addresses = self._get(ip4, NM_IP4_IFACE, "AddressData")
+                    if addresses:
+                        status["ip"] = addresses[0].get("address", (None, None))[1]
+
+                ap = self._get(path, NM_WIRELESS_IFACE, "ActiveAccessPoint")
+                if ap and ap != "/":
+                    watched.add(ap)
+                    status["ssid"] = bytes(self._get(ap, NM_AP_IFACE, "Ssid")).decode("utf-8", "replace") or None
+        except Exception as e:
+            status["error"] = str(e)
+            return status
+
+        with self.__lock:
+            self.__cached_status = dict(status)
+            self.__watched = frozenset(watched)
+        return status
+
+
+    def get_link(self) -> dict | None:
+        status = self.get_status()
+        if not status.get("connected"):
+            return None
+        device = status.get("device")
+        try:
+            if self.__link_device is None or self.__link_device[0] != device:
+                self.__link_device = (device, self.__device_path(device))
+            wireless = self._get_all(self.__link_device[1], NM_WIRELESS_IFACE)
+            ap = wireless.get("ActiveAccessPoint")
+            if not ap or ap == "/":
+                return None
+            props = self._get_all(ap, NM_AP_IFACE)
+        except WifiBackendError:
+            self.__link_device = None
+            return None
+        return {
+            "device": device,
+            "ssid": bytes(props.get("Ssid", b"")).decode("utf-8", "replace") or None,
+            "bssid": (props.get("HwAddress") or "").upper() or None,
+            "signal": int(props.get("Strength", 0)),
+            "bitrate_mbps": wireless.get("Bitrate", 0) / 1000.0,
+            "frequency_mhz": props.get("Frequency") or None,
+        }
+
+
+    @staticmethod
+    def _security(flags : int, wpa_flags : int, rsn_flags : int) -> str:
+        """Render AP security flags the way `nmcli -f SECURITY` does"""
+        parts = []
+        if flags & NM_802_11_AP_FLAGS_PRIVACY and not wpa_flags and not rsn_flags:
+            parts.append("WEP")
+        if wpa_flags:
+            parts.append("WPA1")
+        if rsn_flags & (NM_802_11_AP_SEC_KEY_MGMT_PSK | NM_802_11_AP_SEC_KEY_MGMT_802_1X):
+            parts.append("WPA2")
+        if rsn_flags & NM_802_11_AP_SEC_KEY_MGMT_SAE:
+            parts.append("WPA3")
+        if (wpa_flags | rsn_flags) & NM_802_11_AP_SEC_KEY_MGMT_802_1X:
+            parts.append("802.1X")
+        return " ".join(parts)
+
+
+    def scan(self, rescan : bool = True) -> list:
+        networks = []
+        for path, _ in self.__wifi_devices():
+            try:
+                if rescan:
+                    self._call(path, NM_WIRELESS_IFACE, "RequestScan", "a{sv}", ({},))
+            except WifiBackendError:
+                pass    # NM rejects scans that come too soon after the last one
+            for ap in self._call(path, NM_WIRELESS_IFACE, "GetAllAccessPoints")[0]:
+                props = self._get_all(ap, NM_AP_IFACE)
+                networks.append({
+                    "ssid": bytes(props.get("Ssid", b"")).decode("utf-8", "replace"),
+                    "signal": int(props.get("Strength", 0)),
+                    "security": self._security(props.get("Flags", 0), props.get("WpaFlags", 0),
+                                               props.get("RsnFlags", 0)) or "OPEN",
+                    "bssid": (props.get("HwAddress") or "").upper() or None,
+                    "frequency_mhz": props.get("Frequency") or None,
+                })
+        return networks
+
+
+    def known_networks(self) -> dict:
+        known = {}
+        for path in self._call(NM_SETTINGS_PATH, NM_SETTINGS_IFACE, "ListConnections")[0]:
+            settings = self._call(path, NM_CONNECTION_IFACE, "GetSettings")[0]
+            connection = {k: v for k, (_, v) in settings.get("connection", {}).items()}
+            if connection.get("type") != "802-11-wireless":
+                continue
+            raw_ssid = settings.get("802-11-wireless", {}).get("ssid", ("ay", b""))[1]
+            ssid = bytes(raw_ssid).decode("utf-8", "replace")
+            if ssid:
+                known.setdefault(ssid, connection.get("id"))
+        return known
+
+
+    def radio_on(self) -> None:
+        self._call(NM_PATH, PROPERTIES_IFACE, "Set", "ssv", (NM_IFACE, "WirelessEnabled", ("b", True)))
+
+
+    def connect(self, ssid : str, password : str | None = None, device : str | None = None) -> None:
+        device_path = self.__device_path(device)
+
+        existing = self.__find_connection(ssid=ssid)
+        if existing and not password:
+            self._call(NM_PATH, NM_IFACE, "ActivateConnection", "ooo", (existing, device_path, "/"))
+        else:
+            settings = {
+                "connection": {"id": ("s", ssid), "type": ("s", "802-11-wireless"), "autoconnect": ("b", True)},
+                "802-11-wireless": {"ssid": ("ay", ssid.encode("utf-8")), "mode": ("s", "infrastructure")},
+            }
+            if password:
+                settings["802-11-wireless-security"] = {"key-mgmt": ("s", "wpa-psk"), "psk": ("s", password)}
+            if existing:
+                # Same behaviour as `nmcli dev wifi connect`: refresh the profile for this SSID
+                self._call(existing, NM_CONNECTION_IFACE, "Delete")
+            self._call(NM_PATH, NM_IFACE, "AddAndActivateConnection", "a{sa{sv}}oo",
+                       (settings, device_path, "/"), timeout=DbusBackend.CONNECT_TIMEOUT_S)
+
+        self.__wait_activated(device_path)
+        with self.__lock:
+            self.__cached_status = None
+
+
+    def activate_connection(self, connection : str, device : str | None = None, bssid : str | None = None) -> None:
+        path = self.__find_connection(conn_id=connection)
+        if path is None:
+            raise WifiBackendError(f"Unknown connection '{connection}'")
+        device_path = self.__device_path(device)
+        # Pinning the access point (NM's "specific object") is how a roam to another BSSID is asked for
+        specific = "/"
+        if bssid:
+            for ap in self._call(device_path, NM_WIRELESS_IFACE, "GetAllAccessPoints")[0]:
+                if (self._get(ap, NM_AP_IFACE, "HwAddress") or "").upper() == bssid.upper():
+                    specific = ap
+                    break
+            else:
+                raise WifiBackendError(f"Access point {bssid} is not in range")
+        self._call(NM_PATH, NM_IFACE, "ActivateConnection", "ooo", (path, device_path, specific))
+        self.__wait_activated(device_path)
+        with self.__lock:
+            self.__cached_status = None
+
+
+    def ensure_autoconnect(self) -> None:
+        try:
+            for _, props in self.__wifi_devices():
+                active = props.get("ActiveConnection")
+                if not active or active == "/":
+                    continue
+                path = self._get(active, NM_ACTIVE_IFACE, "Connection")
+                settings = self._call(path, NM_CONNECTION_IFACE, "GetSettings")[0]
+                if settings.get("connection", {}).get("autoconnect", ("b", True))[1]:
+                    return
+                # Update() replaces the whole profile, so carry the secrets over
+                try:
+                    secrets = self._call(path, NM_CONNECTION_IFACE, "GetSecrets", "s", ("802-11-wireless-security",))[0]
+                    for section, values in secrets.items():
+                        settings.setdefault(section, {}).update(values)
+                except WifiBackendError:
+                    pass
+                settings["connection"]["autoconnect"] = ("b", True)
+                self._call(path, NM_CONNECTION_IFACE, "Update", "a{sa{sv}}", (settings,))
+                return
+        except Exception:
+            logger.exception("Failed to enable autoconnect over D-Bus")
+
+
+    def get_secrets(self, connection : str) -> tuple:
+        ssid, password = None, None
+        try:
+            path = self.__find_connection(conn_id=connection)
+            if path is None:
+                return None, None
+            settings = self._call(path, NM_CONNECTION_IFACE, "GetSettings")[0]
+            raw_ssid = settings.get("802-11-wireless", {}).get("ssid", ("ay", b""))[1]
+            ssid = bytes(raw_ssid).decode("utf-8", "replace") or None
+            secrets = self._call(path, NM_CONNECTION_IFACE, "GetSecrets", "s", ("802-11-wireless-security",))[0]
+            password = secrets.get("802-11-wireless-security", {}).get("psk", ("s", None))[1] or None
+        except Exception:
+            pass
+        return ssid, password
+
+
+def make_backend(kind : str | None = None) -> WifiBackend:
+    """
+    Pick the Wi-Fi backend: RC_CAR_WIFI_BACKEND=auto (default), dbus or nmcli
+
+    "auto" uses D-Bus when jeepney is installed and NetworkManager answers on the
+    bus, and falls back to nmcli otherwise.
+    """
+    kind = (kind or os.environ.get("RC_CAR_WIFI_BACKEND", "auto")).strip().lower()
+    if kind in ("auto", "dbus"):
+        try:
+            return DbusBackend(bus=os.environ.get("RC_CAR_WIFI_DBUS_BUS", "SYSTEM"))
+        except ImportError:
+            logger.info("jeepney not installed, using nmcli for Wi-Fi")
+        except Exception as e:
+            logger.warning("NetworkManager D-Bus unavailable (%s), using nmcli for Wi-Fi", e)
+    return NmcliBackend()
@@ -0,0 +1,40 @@
+"""scripts/fleet_update.py end to end against two local fake cars (--spawn-local)."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# The fake cars run the real web server
+pytest.importorskip("flask")
+pytest.importorskip("flask_sock")
+
+ROOT = Path(__file__).resolve().parents[1]
+FLEET_UPDATE = ROOT / "scripts" / "fleet_update.py"
+
+
+@pytest.mark.parametrize("mode", [[], ["--stream"]], ids=["staged", "stream"])
+def test_spawn_local(tmp_path, mode):
+    image = tmp_path / "image.swu"
+    image.write_bytes(os.urandom(512 * 1024))
+    results_path = tmp_path / "results.json"
+
+    proc = subprocess.run(
+        [sys.executable, str(FLEET_UPDATE), str(image), "--spawn-local", "2", "--concurrency", "2",
+         "--retries", "0", "--timeout", "20", "--stall-timeout", "20", "--json", str(results_path), *mode],
+        capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    assert "2/2 cars updated" in proc.stdout
+
+    results = json.loads(results_path.read_text())
+    assert len(results) == 2
+    assert len({r["car"] for r in results}) == 2
+    for r in results:
+        assert r["ok"] and r["phase"] == "done" and r["error"] is None
+        assert r["attempts"] == 1
+        assert r["state"] == 3
+        assert r["message"].startswith("Update finished")
+        assert r["job_id"]
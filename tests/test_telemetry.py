@@ -0,0 +1,30 @@
+"""parse_window, which backs the `window` argument of the metric and link history routes."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from telemetry import parse_window  # noqa: E402
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("300", 300.0), ("90s", 90.0), ("10m", 600.0), ("1h", 3600.0), ("24H", 86400.0), (" 2d ", 172800.0),
+    ("0.5m", 30.0),
+])
+def test_parse_window(value, seconds):
+    assert parse_window(value) == seconds
+
+
+@pytest.mark.parametrize("value", [None, "", " ", "\t"])
+def test_blank_window_is_the_default(value):
+    assert parse_window(value, default=42.0) == 42.0
+
+
+@pytest.mark.parametrize("value", [
+    "nan", "NaN", "inf", "-inf", "infm", "1e400", "1e308h", "0", "0s", "-5", "-1m", "m", "ten", "10x",
+])
+def test_invalid_window(value):
+    with pytest.raises(ValueError):
+        parse_window(value)
@@ -0,0 +1,169 @@
+"""
+UpdatePipe against scripts/fake_updater.py: protocol negotiation, binary progress
+replies and recovery from a reply cut short.
+"""
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from connection_manager import UpdatePipe  # noqa: E402
+
+FAKE_UPDATER = ROOT / "scripts" / "fake_updater.py"
+STATE_IDLE, STATE_FINISHED = 0, 3
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_fake(*args) -> tuple:
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, str(FAKE_UPDATER), "--port", str(port), "--rate", "16384", *args],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return proc, port
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    pytest.fail("fake updater did not start")
+
+
+@pytest.fixture
+def fake_updater():
+    """Port of a fake updater daemon offering binary framing"""
+    proc, port = _start_fake()
+    yield port
+    proc.kill()
+    proc.wait()
+
+
+@pytest.fixture
+def json_only_updater():
+    """Port of a fake updater daemon that refuses binary framing, like older daemons"""
+    proc, port = _start_fake("--json-only")
+    yield port
+    proc.kill()
+    proc.wait()
+
+
+class TruncatingProxy:
+    """TCP relay in front of the daemon that can cut the next reply short and then go quiet."""
+
+    def __init__(self, upstream_port : int):
+        self.upstream_port = upstream_port
+        self.connections = 0
+        self.cut = threading.Event()
+        self.srv = socket.create_server(("127.0.0.1", 0))
+        self.port = self.srv.getsockname()[1]
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+
+    def __accept(self) -> None:
+        while True:
+            try:
+                client, _ = self.srv.accept()
+            except OSError:
+                return
+            self.connections += 1
+            upstream = socket.create_connection(("127.0.0.1", self.upstream_port))
+            threading.Thread(target=self.__pump, args=(client, upstream, False), daemon=True).start()
+            threading.Thread(target=self.__pump, args=(upstream, client, True), daemon=True).start()
+
+
+    def __pump(self, src : socket.socket, dst : socket.socket, replies : bool) -> None:
+        with src, dst:
+            while True:
+                try:
+                    data = src.recv(4096)
+                except OSError:
+                    return
+                if not data:
+                    return
+                if replies and self.cut.is_set():
+                    self.cut.clear()
+                    dst.sendall(data[:2])
+                    # Hold the connection open with half a header sent, until the client gives up on it
+                    while src.recv(4096):
+                        pass
+                    return
+                dst.sendall(data)
+
+
+    def close(self) -> None:
+        self.srv.close()
+
+
+def _install(pipe : UpdatePipe, tmp_path : Path) -> list:
+    image = tmp_path / "image.swu"
+    image.write_bytes(b"\x00" * 4096)
+    assert pipe.start_update(str(image))
+    states = []
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        states.append(pipe.read_state())
+        if states[-1] and states[-1][0] == STATE_FINISHED:
+            return states
+        time.sleep(0.02)
+    pytest.fail(f"install did not finish: {states[-3:]}")
+
+
+def test_json_only_daemon_falls_back_to_json(json_only_updater, tmp_path):
+    pipe = UpdatePipe(timeout=2.0, updater_port=json_only_updater)
+    assert pipe.init_connection()
+    assert pipe.protocol == UpdatePipe.PROTOCOL_JSON
+
+    assert pipe.read_state() == (STATE_IDLE, "")
+    state, message = _install(pipe, tmp_path)[-1]
+    assert message.startswith("Update finished")
+    pipe.close()
+
+
+def test_binary_progress(fake_updater, tmp_path):
+    pipe = UpdatePipe(timeout=2.0, updater_port=fake_updater)
+    assert pipe.init_connection()
+    assert pipe.protocol == UpdatePipe.PROTOCOL_BINARY
+
+    # The first reply on a connection always carries the message, later ones only when it changed
+    assert pipe.read_state() == (STATE_IDLE, "")
+    assert pipe.read_state() == (STATE_IDLE, "")
+
+    states = _install(pipe, tmp_path)
+    assert any(message.startswith("Installing image") for _, message in filter(None, states))
+    state, message = states[-1]
+    assert message.startswith("Update finished")
+    # Unchanged message: the daemon leaves it out and the cached text is returned
+    assert pipe.read_state() == (STATE_FINISHED, message)
+    pipe.close()
+
+
+def test_resync_after_truncated_reply(fake_updater):
+    proxy = TruncatingProxy(fake_updater)
+    pipe = UpdatePipe(timeout=0.5, updater_port=proxy.port)
+    try:
+        assert pipe.init_connection()
+        assert pipe.protocol == UpdatePipe.PROTOCOL_BINARY
+        assert pipe.read_state() == (STATE_IDLE, "")
+
+        proxy.cut.set()
+        assert pipe.read_state() is None
+
+        # The half-read frame is not parsed as the next reply: a fresh connection negotiates again
+        assert pipe.read_state() == (STATE_IDLE, "")
+        assert pipe.protocol == UpdatePipe.PROTOCOL_BINARY
+        assert proxy.connections == 2
+    finally:
+        pipe.close()
+        proxy.close()
@@ -0,0 +1,135 @@
+"""
+DbusBackend against scripts/fake_networkmanager.py on a private session bus.
+
+Needs jeepney and dbus-run-session (the dbus package); skipped otherwise.
+"""
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("jeepney")
+if shutil.which("dbus-run-session") is None:
+    pytest.skip("dbus-run-session is not installed", allow_module_level=True)
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from wifi_backend import DbusBackend, WifiBackendError  # noqa: E402
+
+FAKE_NM = ROOT / "scripts" / "fake_networkmanager.py"
+NEARBY_AP = "/org/freedesktop/NetworkManager/AccessPoint/2"     # "track-side", never active here
+
+
+@pytest.fixture
+def backend():
+    """A DbusBackend talking to a fresh fake NetworkManager with "garage" connected"""
+    proc = subprocess.Popen(
+        ["dbus-run-session", "--", "sh", "-c",
+         f'echo "$DBUS_SESSION_BUS_ADDRESS"; exec "{sys.executable}" "{FAKE_NM}" --connected'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True,
+    )
+    saved = os.environ.get("DBUS_SESSION_BUS_ADDRESS")
+    try:
+        address = proc.stdout.readline().strip()
+        for line in proc.stderr:
+            if "Fake NetworkManager on" in line:
+                break
+        else:
+            pytest.fail("fake NetworkManager did not start")
+        os.environ["DBUS_SESSION_BUS_ADDRESS"] = address
+        backend = DbusBackend(bus="SESSION")
+        yield backend
+        backend.close()
+    finally:
+        if saved is None:
+            os.environ.pop("DBUS_SESSION_BUS_ADDRESS", None)
+        else:
+            os.environ["DBUS_SESSION_BUS_ADDRESS"] = saved
+        # The bus daemon and the fake outlive dbus-run-session unless the whole group goes
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=5)
+
+
+def _settings(backend : DbusBackend, conn_id : str) -> dict:
+    for path in backend._call("/org/freedesktop/NetworkManager/Settings",
+                              "org.freedesktop.NetworkManager.Settings", "ListConnections")[0]:
+        settings = backend._call(path, "org.freedesktop.NetworkManager.Settings.Connection", "GetSettings")[0]
+        if settings["connection"]["id"][1] == conn_id:
+            return settings
+    raise KeyError(conn_id)
+
+
+def test_status(backend):
+    assert backend.get_status() == {
+        "connected": True, "ssid": "garage", "device": "wlan0", "connection": "garage", "ip": "192.168.1.20",
+    }
+    assert backend.get_device() == "wlan0"
+
+
+def test_scan(backend):
+    networks = {n["bssid"]: n for n in backend.scan()}
+    assert len(networks) == 4
+    assert networks["AA:BB:CC:00:00:01"] == {
+        "ssid": "garage", "signal": 82, "security": "WPA2", "bssid": "AA:BB:CC:00:00:01", "frequency_mhz": 5180,
+    }
+    assert networks["AA:BB:CC:00:00:02"]["security"] == "WPA3"
+    assert networks["AA:BB:CC:00:00:03"]["security"] == "OPEN"
+    assert backend.known_networks() == {"garage": "garage"}
+
+
+def test_connect(backend):
+    backend.connect("track-side", "hunter22")
+    status = backend.get_status()
+    assert status["connected"] and status["ssid"] == "track-side" and status["connection"] == "track-side"
+    assert backend.get_secrets("track-side") == ("track-side", "hunter22")
+
+    with pytest.raises(WifiBackendError):
+        backend.connect("open-guest", "wrong-password")
+
+
+def test_activate_connection_with_bssid(backend):
+    assert backend.get_link()["bssid"] == "AA:BB:CC:00:00:01"
+
+    backend.activate_connection("garage", bssid="aa:bb:cc:00:00:04")
+    link = backend.get_link()
+    assert link["bssid"] == "AA:BB:CC:00:00:04"
+    assert link["signal"] == 40 and link["frequency_mhz"] == 5500
+
+    with pytest.raises(WifiBackendError, match="not in range"):
+        backend.activate_connection("garage", bssid="AA:BB:CC:00:00:99")
+    with pytest.raises(WifiBackendError, match="Unknown connection"):
+        backend.activate_connection("nowhere")
+
+
+def test_ensure_autoconnect(backend):
+    assert _settings(backend, "garage")["connection"]["autoconnect"][1] is False
+
+    backend.ensure_autoconnect()
+    assert _settings(backend, "garage")["connection"]["autoconnect"][1] is True
+    # Update() replaces the whole profile; the password must survive it
+    assert backend.get_secrets("garage") == ("garage", "hunter22")
+
+
+def test_signals_only_for_the_wifi_link(backend):
+    backend.get_status()
+    changes = []
+    changed = threading.Event()
+    backend.on_change(lambda: (changes.append(1), changed.set()))
+
+    # A nearby access point fading is ignored; signals are handled in order, so
+    # once the active access point's change is seen the first one was skipped
+    backend._call(NEARBY_AP, "org.freedesktop.DBus.Properties", "Set", "ssv",
+                  ("org.freedesktop.NetworkManager.AccessPoint", "Strength", ("y", 10)))
+    active_ap = backend._get("/org/freedesktop/NetworkManager/Devices/1",
+                             "org.freedesktop.NetworkManager.Device.Wireless", "ActiveAccessPoint")
+    backend._call(active_ap, "org.freedesktop.DBus.Properties", "Set", "ssv",
+                  ("org.freedesktop.NetworkManager.AccessPoint", "Strength", ("y", 70)))
+
+    assert changed.wait(5)
+    assert changes == [1]